@@ -1,16 +1,35 @@
 import os
+import atexit
+import hashlib
 import json
+import math
+import threading
 import time
-import requests
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List, Optional, TypedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypedDict
 from anthropic import Anthropic
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 # Import your get_token_data function from your module if needed
 # from agent import get_token_data
 from flask_cors import CORS 
+import batch_scoring
+import dex_client
+import numpy as np
+from alerts import AlertEngine, FileSink, LogSink, QueueSink, WebhookSink, create_engine, snapshot_alerts
+from batch_scoring import TokenColumns
+from caching import ResponseCache, SingleFlight, TTLCache
+from checkpoint import Checkpointer, load_checkpoint
+from feed import FeedEvent, FeedHub, FeedSink
+from metrics import Registry, SlowRequestProfiler
+from pairs import PairIndex
+from ratelimit import TokenBucket
+from scheduler import AdaptivePolicy, MonitoringScheduler
+from shared_cache import Lease, SharedCache, create_backend
+from timeseries import PriceRing, SeriesStore
+from token_data import CompactTokenData
 app = Flask(__name__)
 CORS(app)
 load_dotenv()
@@ -49,7 +68,12 @@ class MarketSentiment(TypedDict):
     breakdown: Dict[str, float]
     trends: List[str]
 
-class AnalyticsReport(TypedDict):
+class DeferredInsights(TypedDict, total=False):
+    # Set on reports built with deferred insights; insights_id only while pending
+    ai_insights_status: str
+    insights_id: str
+
+class AnalyticsReport(DeferredInsights):
     token_name: str
     token_symbol: str
     timestamp: float
@@ -73,17 +97,162 @@ ALERT_CONFIG = {
     "price_change_threshold": 10,
     "volume_change_threshold": 50,
     "liquidity_change_threshold": 20,
-    "sentiment_change_threshold": 0.3
+    "sentiment_change_threshold": 0.3,
+    "price_window_minutes": 15,
+    "liquidity_drain_window_minutes": 30,
+    "liquidity_drain_threshold": 20,
+    "imbalance_ratio": 2.0,
+    "imbalance_streak": 5,
+    "cooldown_seconds": 300,
+    "hysteresis": 0.8,
+    # Alert state for a token not observed this long is evicted
+    "idle_ttl_seconds": float(os.environ.get("ALERT_IDLE_TTL", 3600))
+}
+
+INSIGHT_CONFIG = {
+    "ttl": float(os.environ.get("INSIGHT_CACHE_TTL", 600)),
+    "max_entries": int(os.environ.get("INSIGHT_CACHE_SIZE", 4096)),
+    "price_bucket": 0.02,       # 2% log-scale price buckets
+    "liquidity_bucket": 0.05,   # 5% log-scale liquidity buckets
+    "sentiment_bucket": 0.1,
+    "llm_calls_per_minute": float(os.environ.get("LLM_CALLS_PER_MINUTE", 30)),
+    "llm_burst": float(os.environ.get("LLM_BURST", 5)),
+    "background_refresh": os.environ.get("INSIGHT_BACKGROUND_REFRESH", "1") == "1",
+    "request_wait": 2.0,        # max seconds a request waits for an LLM slot
+    "background_wait": 60.0,
+    # Reports return at once with ai_insights_status "pending"; the insights follow
+    # on /get_insights and as an "insights" event on the feed
+    "deferred": os.environ.get("INSIGHT_DEFERRED", "0") == "1",
+    "workers": int(os.environ.get("INSIGHT_WORKERS", 4))
+}
+
+ADAPTIVE_CONFIG = {
+    "enabled": os.environ.get("ADAPTIVE_POLLING", "1") == "1",
+    "min_interval": float(os.environ.get("MONITOR_MIN_INTERVAL", 5)),
+    "max_interval": float(os.environ.get("MONITOR_MAX_INTERVAL", 300)),
+    # Token polls per second across the scheduler. Ticks are spread out, so each is usually
+    # its own upstream request: by default the budget is the DexScreener rate limit itself
+    "poll_budget": float(os.environ.get("MONITOR_POLL_BUDGET", dex_client.upstream_budget.rate)),
+    "price_move_pct": 1.0,
+    "liquidity_move_pct": 2.0,
+    "txn_spike_ratio": 3.0
+}
+
+PORTFOLIO_CONFIG = {
+    "max_tokens": int(os.environ.get("PORTFOLIO_MAX_TOKENS", 100)),
+    "workers": int(os.environ.get("PORTFOLIO_WORKERS", 8))
+}
+
+PAIR_CONFIG = {
+    # "liquidity" picks the deepest pool, "volume" the one with the highest 24h volume
+    "policy": os.environ.get("PAIR_SELECTION_POLICY", "liquidity"),
+    "ttl": float(os.environ.get("PAIR_INDEX_TTL", 15)),
+    "max_entries": int(os.environ.get("PAIR_INDEX_SIZE", 4096))
+}
+
+# Ticks kept in each token's in-memory ring buffer
+PRICE_HISTORY_SIZE = 1000
+# Minimum ring samples before measured volatility is trusted over the upstream h6 figure
+MIN_VOLATILITY_SAMPLES = 30
+# Sentiment readings kept per token
+SENTIMENT_HISTORY_SIZE = 100
+
+SHARED_CACHE_CONFIG = {
+    # memory:// (per process), file:///dev/shm/liquidity (workers on one host) or redis://...
+    "url": os.environ.get("SHARED_CACHE_URL", "memory://"),
+    "state_ttl": float(os.environ.get("SHARED_STATE_TTL", 86400)),
+    "wait": float(os.environ.get("SHARED_CACHE_WAIT", 2)),
+    # The worker running the scheduler renews its lease every third of this; others take over after it
+    "lease_ttl": float(os.environ.get("SCHEDULER_LEASE_TTL", 30))
+}
+
+METRICS_CONFIG = {
+    # Requests slower than this get their sampled stacks kept; 0 disables the profiler
+    "profile_slow_ms": float(os.environ.get("PROFILE_SLOW_REQUEST_MS", 0)),
+    "profile_interval": float(os.environ.get("PROFILE_SAMPLE_INTERVAL", 0.005))
+}
+
+CHECKPOINT_CONFIG = {
+    "enabled": os.environ.get("CHECKPOINT", "1") == "1",
+    "path": Path(os.environ.get("CHECKPOINT_PATH", "data/checkpoint.bin")),
+    "interval": float(os.environ.get("CHECKPOINT_INTERVAL", 60))
+}
+
+SERIES_CONFIG = {
+    "segment_records": 65536,
+    "max_segments": 8,
+    "retention_days": float(os.environ.get("SERIES_RETENTION_DAYS", 30)),
+    "export_interval": float(os.environ.get("WEEKLY_EXPORT_INTERVAL", 3600)),
+    # Full scored snapshot per tick for backtest.py replays
+    "record_snapshots": os.environ.get("RECORD_SNAPSHOTS", "1") == "1"
 }
 
 # ---------- Data Stores ----------
 data_cache: Dict[str, TokenData] = {}
-price_history: Dict[str, List[Dict]] = {}
+price_history: Dict[str, PriceRing] = {}
 weekly_data_store: Dict[str, Dict] = {}
 sentiment_history: Dict[str, List[MarketSentiment]] = {}
+latest_reports: Dict[str, AnalyticsReport] = {}
+token_activity: Dict[str, Optional[float]] = {}
+txn_baseline: Dict[str, float] = {}
+last_weekly_export: Dict[str, float] = {}
+# Every pair from the last fetch of a token address, so other chains/DEXes/quotes need no refetch
+pair_indexes = TTLCache(PAIR_CONFIG["ttl"], PAIR_CONFIG["max_entries"])
+series_store = SeriesStore(
+    Path("data") / "series",
+    segment_records=SERIES_CONFIG["segment_records"],
+    max_segments=SERIES_CONFIG["max_segments"],
+    retention=SERIES_CONFIG["retention_days"] * 86400
+)
+snapshot_store = SeriesStore(
+    Path("data") / "snapshots",
+    segment_records=SERIES_CONFIG["segment_records"],
+    max_segments=SERIES_CONFIG["max_segments"],
+    retention=SERIES_CONFIG["retention_days"] * 86400,
+    dtype=batch_scoring.SNAPSHOT_DTYPE,
+    legacy_dtype=batch_scoring.LEGACY_SNAPSHOT_DTYPE
+)
+# AI insights keyed by quantized metrics, plus the last good insight per token
+insight_cache = TTLCache(INSIGHT_CONFIG["ttl"], INSIGHT_CONFIG["max_entries"])
+last_good_insights = TTLCache(INSIGHT_CONFIG["ttl"] * 6, INSIGHT_CONFIG["max_entries"])
+insight_flights = SingleFlight()
+insight_refresh_pool = ThreadPoolExecutor(max_workers=INSIGHT_CONFIG["workers"], thread_name_prefix="insights")
+# Deferred insight jobs by id: pending until a worker stores the insights or the failure
+insight_jobs = TTLCache(INSIGHT_CONFIG["ttl"], INSIGHT_CONFIG["max_entries"])
+# Bounded fan-out for /get_tokens; concurrent lookups still coalesce in dex_client.batcher
+portfolio_pool = ThreadPoolExecutor(max_workers=PORTFOLIO_CONFIG["workers"], thread_name_prefix="portfolio")
+llm_rate_limiter = TokenBucket(INSIGHT_CONFIG["llm_calls_per_minute"] / 60, INSIGHT_CONFIG["llm_burst"])
+# /get_token reports: served fresh for REPORT_CACHE_TTL seconds, then stale
+# for up to REPORT_STALE_TTL more while a single background refresh runs
+report_cache = ResponseCache(
+    ttl=float(os.environ.get("REPORT_CACHE_TTL", 15)),
+    stale_ttl=float(os.environ.get("REPORT_STALE_TTL", 60)),
+    max_entries=int(os.environ.get("REPORT_CACHE_SIZE", 2048))
+)
+
+# Cross-worker layer for pairs, token snapshots, price history and reports
+shared_cache = SharedCache(create_backend(SHARED_CACHE_CONFIG["url"]), wait=SHARED_CACHE_CONFIG["wait"])
+
+# ---------- Metrics ----------
+metrics_registry = Registry()
+stage_seconds = metrics_registry.histogram(
+    "liquidity_stage_seconds", "Time spent in each hot-path stage", ("stage",))
+http_request_seconds = metrics_registry.histogram(
+    "liquidity_http_request_seconds", "HTTP request latency", ("endpoint", "status"))
+cache_lookups = metrics_registry.counter(
+    "liquidity_cache_lookups_total", "Cache lookups by cache and result", ("cache", "result"))
+errors_total = metrics_registry.counter(
+    "liquidity_errors_total", "Errors swallowed on the hot path", ("stage",))
+metrics_registry.register_histogram(
+    "liquidity_upstream_attempt_seconds", "DexScreener latency per HTTP attempt", dex_client.client.latency)
+slow_request_profiler = (
+    SlowRequestProfiler(METRICS_CONFIG["profile_slow_ms"] / 1000, METRICS_CONFIG["profile_interval"])
+    if METRICS_CONFIG["profile_slow_ms"] > 0 else None
+)
 
 # ---------- Core Functions ----------
 def save_weekly_data(token_key: str, data: Dict) -> None:
+    # Export format only: the tick path appends to series_store instead
     try:
         data_dir = Path("data")
         data_dir.mkdir(exist_ok=True)
@@ -95,6 +264,9 @@ def save_weekly_data(token_key: str, data: Dict) -> None:
         print(f"Error saving weekly data: {e}")
 
 def load_weekly_data(token_key: str) -> Optional[Dict]:
+    # Latest in-memory report first; the exported JSON covers cold starts
+    if token_key in latest_reports:
+        return latest_reports[token_key]
     try:
         filename = Path("data") / f"{token_key.replace('/', '_')}.json"
         with open(filename, "r") as f:
@@ -102,53 +274,118 @@ def load_weekly_data(token_key: str) -> Optional[Dict]:
     except Exception:
         return None
 
+def export_weekly_data(token_key: str, report: AnalyticsReport) -> None:
+    week_ago = time.time() - 7 * 86400
+    save_weekly_data(token_key, {**report, "weekly": series_store.summary(token_key, start=week_ago)})
+    last_weekly_export[token_key] = time.time()
+
+@stage_seconds.time(stage="persistence")
+def record_tick(token_key: str, token_data: TokenData, report: AnalyticsReport) -> None:
+    # O(1) append of the tick; the weekly JSON is rewritten at most once per export interval
+    now = time.time()
+    series_store.append(token_key, now, float(token_data["price_usd"]),
+                        token_data["volume"]["h1"], token_data["liquidity"]["usd"])
+    series_store.maybe_compact(token_key)
+    if SERIES_CONFIG["record_snapshots"]:
+        m5 = token_data["txns"]["m5"]
+        snapshot_store.append(token_key, now, *TokenColumns.row(token_data), token_data["volume"]["h1"],
+                              m5.get("buys", 0), m5.get("sells", 0))
+        snapshot_store.maybe_compact(token_key)
+    latest_reports[token_key] = report
+    if time.time() - last_weekly_export.get(token_key, 0) >= SERIES_CONFIG["export_interval"]:
+        export_weekly_data(token_key, report)
+
 def detect_alerts(current: TokenData, previous: TokenData) -> List[str]:
-    alerts = []
-    
-    # Price alert
-    current_price = float(current["price_usd"])
-    previous_price = float(previous["price_usd"])
-    if previous_price > 0:
-        price_change = abs((current_price - previous_price) / previous_price * 100)
-        if price_change > ALERT_CONFIG["price_change_threshold"]:
-            direction = "increased" if current_price > previous_price else "decreased"
-            alerts.append(f"PRICE ALERT: {current['base_token']['symbol']} {direction} by {price_change:.2f}%")
-    
-    # Volume alert
-    current_vol = current["volume"]["h1"]
-    previous_vol = previous["volume"]["h1"]
-    if previous_vol > 0:
-        vol_change = abs((current_vol - previous_vol) / previous_vol * 100)
-        if vol_change > ALERT_CONFIG["volume_change_threshold"]:
-            direction = "increased" if current_vol > previous_vol else "decreased"
-            alerts.append(f"VOLUME ALERT: Volume {direction} by {vol_change:.2f}%")
-    
-    # Liquidity alert
-    current_liq = current["liquidity"]["usd"]
-    previous_liq = previous["liquidity"]["usd"]
-    if previous_liq > 0:
-        liq_change = abs((current_liq - previous_liq) / previous_liq * 100)
-        if liq_change > ALERT_CONFIG["liquidity_change_threshold"]:
-            direction = "increased" if current_liq > previous_liq else "decreased"
-            alerts.append(f"LIQUIDITY ALERT: Liquidity {direction} by {liq_change:.2f}%")
-    
-    return alerts
+    # Tick-over-tick threshold alerts; the alert engine's snapshot rule runs the same check
+    return snapshot_alerts(current, previous, ALERT_CONFIG)
+
+def select_pair(index: PairIndex, chain_id: str, dex_id: Optional[str] = None,
+                quote: Optional[str] = None, policy: Optional[str] = None) -> Optional[Dict]:
+    return index.select(chain_id, dex_id, quote, policy or PAIR_CONFIG["policy"])
+
+def get_pair_index(token_address: str, fresh: bool = False) -> PairIndex:
+    index = None if fresh else pair_indexes.get(token_address)
+    if not fresh:
+        cache_lookups.inc(cache="pair_index", result="hit" if index is not None else "miss")
+    if index is None:
+        # Concurrent lookups (e.g. scheduler ticks) are coalesced into one request
+        fetch = lambda: dex_client.batcher.fetch(token_address)
+        with stage_seconds.time(stage="fetch"):
+            if not shared_cache.shared:
+                pairs = fetch()
+            elif fresh:
+                pairs = fetch()
+                shared_cache.set(f"pairs:{token_address}", pairs, PAIR_CONFIG["ttl"])
+            else:
+                # One worker fetches, the others reuse its pairs
+                pairs = shared_cache.get_or_compute(f"pairs:{token_address}", PAIR_CONFIG["ttl"], fetch)
+        with stage_seconds.time(stage="transform"):
+            index = PairIndex(token_address, pairs)
+        pair_indexes.set(token_address, index)
+    return index
+
+def load_snapshot(token_key: str) -> Optional[TokenData]:
+    # Latest snapshot from whichever worker ticked this token last
+    if shared_cache.shared:
+        state = shared_cache.get(f"token:{token_key}")
+        if state is not None:
+            return CompactTokenData.from_state(state)
+    return data_cache.get(token_key)
+
+def load_price_history(token_key: str) -> PriceRing:
+    history = price_history.get(token_key)
+    if shared_cache.shared:
+        state = shared_cache.get(f"ring:{token_key}")
+        if state is not None and (history is None or state["last_timestamp"] > history.last_timestamp):
+            history = price_history[token_key] = PriceRing.from_state(state, PRICE_HISTORY_SIZE)
+    if history is None:
+        history = price_history[token_key] = PriceRing(PRICE_HISTORY_SIZE)
+    return history
+
+@stage_seconds.time(stage="persistence")
+def store_snapshot(token_key: str, token_data: TokenData, history: PriceRing) -> None:
+    data_cache[token_key] = token_data
+    if shared_cache.shared:
+        shared_cache.set(f"token:{token_key}", token_data.to_state(), SHARED_CACHE_CONFIG["state_ttl"])
+        shared_cache.set(f"ring:{token_key}", history.to_state(), SHARED_CACHE_CONFIG["state_ttl"])
 
-def get_token_data(chain_id: str, token_address: str) -> Optional[TokenData]:
+def get_token_data(chain_id: str, token_address: str, dex_id: Optional[str] = None,
+                   quote: Optional[str] = None, policy: Optional[str] = None,
+                   fresh: bool = False) -> Optional[TokenData]:
     try:
-        url = f"https://api.dexscreener.com/latest/dex/tokens/{token_address}"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        if data.get("pairs"):
-            pair = next((p for p in data["pairs"] if p["chainId"] == chain_id), None)
-            return transform_dex_response(pair) if pair else None
-        return None
+        pair = select_pair(get_pair_index(token_address, fresh), chain_id, dex_id, quote, policy)
+        if not pair:
+            return None
+        with stage_seconds.time(stage="transform"):
+            return CompactTokenData.from_pair(pair)
     except Exception as e:
+        errors_total.inc(stage="fetch")
         print(f"Error fetching token data: {e}")
         return None
 
+def get_token_data_batch(chain_id: str, token_addresses: List[str]) -> Dict[str, Optional[TokenData]]:
+    """get_token_data() for many addresses with comma-joined requests; one entry per address."""
+    try:
+        with stage_seconds.time(stage="fetch"):
+            pairs_by_address = dex_client.fetch_pairs(token_addresses)
+    except Exception as e:
+        errors_total.inc(stage="fetch")
+        print(f"Error fetching token data batch: {e}")
+        return {address: None for address in token_addresses}
+
+    results: Dict[str, Optional[TokenData]] = {}
+    for address, pairs in pairs_by_address.items():
+        index = PairIndex(address, pairs)
+        pair_indexes.set(address, index)
+        pair = select_pair(index, chain_id)
+        results[address] = CompactTokenData.from_pair(pair) if pair else None
+    return results
+
+def get_market_depth(chain_id: str, token_address: str) -> Optional[Dict]:
+    # Pools, liquidity and volume summed over every pair of the token on this chain
+    index = pair_indexes.get(token_address)
+    return index.aggregate(chain_id) if index is not None else None
+
 def transform_dex_response(pair: Dict) -> TokenData:
     return {
         "chain_id": pair.get("chainId", ""),
@@ -198,19 +435,27 @@ def transform_dex_response(pair: Dict) -> TokenData:
         "boosts": pair.get("boosts")
     }
 
-def analyze_token_risk(token_data: TokenData, previous_data: Optional[TokenData] = None) -> RiskAnalysis:
+@stage_seconds.time(stage="risk")
+def analyze_token_risk(token_data: TokenData, previous_data: Optional[TokenData] = None,
+                       price_stats: Optional[Dict] = None, market: Optional[Dict] = None,
+                       now: Optional[float] = None) -> RiskAnalysis:
     vulnerabilities = []
     recommendations = []
     risk_score = 0
 
-    # Liquidity check
-    if token_data["liquidity"]["usd"] < THRESHOLDS["liquidity_min"]:
+    # Liquidity check: depth across every pool on the chain when known, else the selected pair
+    liquidity = market["liquidity_usd"] if market and market["pools"] else token_data["liquidity"]["usd"]
+    if liquidity < THRESHOLDS["liquidity_min"]:
         vulnerabilities.append("Low liquidity")
         risk_score += 30
         recommendations.append("Increase liquidity or wait for higher liquidity levels")
 
-    # Price volatility
+    # Price volatility: upstream h6 move, or realized volatility from our own ticks if higher
     volatility = abs(token_data["price_change"]["h6"])
+    if price_stats and price_stats.get("samples", 0) >= MIN_VOLATILITY_SAMPLES:
+        realized = price_stats.get("realized_volatility_6h_pct")
+        if realized is not None:
+            volatility = max(volatility, realized)
     if volatility > THRESHOLDS["volatility_threshold"]:
         vulnerabilities.append(f"High volatility: {volatility:.2f}% over 6h")
         risk_score += 20
@@ -233,13 +478,13 @@ def analyze_token_risk(token_data: TokenData, previous_data: Optional[TokenData]
         recommendations.append("Monitor for market manipulation")
 
     # Market cap vs liquidity
-    if token_data["market_cap"] > 0 and token_data["market_cap"] < token_data["liquidity"]["usd"]:
+    if token_data["market_cap"] > 0 and token_data["market_cap"] < liquidity:
         vulnerabilities.append("Market cap < liquidity")
         risk_score += 20
         recommendations.append("Review valuation")
 
     # Token age
-    token_age = (time.time() - token_data["pair_created_at"]) / 86400
+    token_age = ((now or time.time()) - token_data["pair_created_at"]) / 86400
     if token_age < THRESHOLDS["new_token_risk_days"]:
         vulnerabilities.append(f"New token ({token_age:.1f} days old)")
         risk_score += 15
@@ -280,6 +525,7 @@ def analyze_token_risk(token_data: TokenData, previous_data: Optional[TokenData]
         "recommendations": recommendations
     }
 
+@stage_seconds.time(stage="sentiment")
 def analyze_market_sentiment(token_data: TokenData, previous_sentiment: Optional[MarketSentiment] = None) -> MarketSentiment:
     h24_buys = token_data["txns"]["h24"].get("buys", 0)
     h24_sells = token_data["txns"]["h24"].get("sells", 0)
@@ -333,130 +579,678 @@ def analyze_market_sentiment(token_data: TokenData, previous_sentiment: Optional
         "trends": trends
     }
 
-def generate_ai_insights(token_data: TokenData, weekly_data: Optional[Dict] = None, sentiment: Optional[MarketSentiment] = None) -> List[str]:
+# ---------- Batch Scoring ----------
+@stage_seconds.time(stage="batch_scoring")
+def score_token_universe(columns: TokenColumns, previous_prices: Optional[np.ndarray] = None,
+                         realized_volatility: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    # Same rules as analyze_token_risk / analyze_market_sentiment, applied as masks over N tokens
+    risk = batch_scoring.score_risk(columns, THRESHOLDS, ALERT_CONFIG, previous_prices, realized_volatility)
+    sentiment = batch_scoring.score_sentiment(columns)
+    return {
+        "risk_score": risk["risk_score"],
+        "vulnerabilities": risk["vulnerabilities"],
+        "sentiment_score": sentiment["score"]
+    }
+
+def score_tokens_batch(tokens: List[TokenData], previous: Optional[List[Optional[TokenData]]] = None,
+                       price_stats: Optional[List[Optional[Dict]]] = None,
+                       markets: Optional[List[Optional[Dict]]] = None) -> Dict[str, np.ndarray]:
+    previous_prices = None
+    if previous is not None:
+        previous_prices = np.array([float(p["price_usd"]) if p else np.nan for p in previous])
+    
+    realized_volatility = None
+    if price_stats is not None:
+        realized_volatility = np.array([
+            stats["realized_volatility_6h_pct"]
+            if stats and stats.get("samples", 0) >= MIN_VOLATILITY_SAMPLES
+            and stats.get("realized_volatility_6h_pct") is not None else np.nan
+            for stats in price_stats
+        ])
+    
+    columns = TokenColumns.from_token_data(tokens)
+    if markets is not None:
+        # Same override as analyze_token_risk: aggregated pool depth where known
+        columns.liquidity_usd = np.array([
+            market["liquidity_usd"] if market and market["pools"] else liquidity
+            for market, liquidity in zip(markets, columns.liquidity_usd)
+        ])
+    return score_token_universe(columns, previous_prices, realized_volatility)
+
+def score_pairs_batch(pairs: List[Dict]) -> Dict[str, np.ndarray]:
+    return score_token_universe(TokenColumns.from_pairs(pairs))
+
+def _bucket(value: float, step: float) -> Optional[int]:
+    # Log-scale bucket: values within ~step (e.g. 2%) of each other share a bucket
+    if value <= 0:
+        return None
+    return int(math.floor(math.log(value) / math.log1p(step)))
+
+def insight_fingerprint(token_data: TokenData, sentiment: Optional[MarketSentiment] = None) -> Tuple:
+    score = sentiment.get("score") if sentiment else None
+    return (
+        token_data["chain_id"],
+        token_data["base_token"]["address"],
+        _bucket(float(token_data["price_usd"]), INSIGHT_CONFIG["price_bucket"]),
+        _bucket(token_data["liquidity"]["usd"], INSIGHT_CONFIG["liquidity_bucket"]),
+        None if score is None else round(score / INSIGHT_CONFIG["sentiment_bucket"])
+    )
+
+def insight_request(token_data: TokenData, weekly_data: Optional[Dict] = None,
+                    sentiment: Optional[MarketSentiment] = None) -> Dict:
+    """messages.create() arguments for one token's insights (shared by the sync and ASGI paths)."""
+    data = {
+        "token": {
+            "name": token_data["base_token"]["name"],
+            "symbol": token_data["base_token"]["symbol"],
+            "price": float(token_data["price_usd"]),
+            "price_changes": token_data["price_change"],
+            "liquidity": token_data["liquidity"]["usd"],
+            "market_cap": token_data["market_cap"],
+            "age": (time.time() - token_data["pair_created_at"]) / 86400
+        },
+        "transactions": {
+            "h1": token_data["txns"]["h1"],
+            "h24": token_data["txns"]["h24"]
+        },
+        "sentiment": sentiment.get("score") if sentiment else None,
+        "weekly_data": weekly_data
+    }
+    return {
+        "model": "claude-3-7-sonnet-20250219",
+        "max_tokens": 300,
+        "temperature": 0.4,
+        "system": "You are a crypto market analysis AI. Provide 3-5 specific, actionable insights...",
+        "messages": [{"role": "user", "content": json.dumps(data)}]
+    }
+
+def parse_insights(response) -> List[str]:
+    ai_text = response.content[0].text
+    insights = [line.strip() for line in ai_text.split('\n') if line.strip()]
+    return insights[:5]
+
+@stage_seconds.time(stage="llm")
+def _request_ai_insights(token_data: TokenData, weekly_data: Optional[Dict] = None, sentiment: Optional[MarketSentiment] = None) -> List[str]:
+    return parse_insights(anthropic.messages.create(**insight_request(token_data, weekly_data, sentiment)))
+
+def _refresh_ai_insights(fingerprint: Tuple, token_data: TokenData, weekly_data: Optional[Dict] = None,
+                         sentiment: Optional[MarketSentiment] = None,
+                         wait: Optional[float] = None) -> Optional[List[str]]:
+    # Another caller may have filled this fingerprint while we queued
+    cached = insight_cache.get(fingerprint)
+    if cached is not None:
+        return cached
+    
+    # Global budget on LLM calls shared by requests and monitoring ticks
+    if not llm_rate_limiter.acquire(timeout=wait):
+        return None
+    
+    insights = _request_ai_insights(token_data, weekly_data, sentiment)
+    insight_cache.set(fingerprint, insights)
+    last_good_insights.set(fingerprint[:2], insights)
+    return insights
+
+def _refresh_in_background(fingerprint: Tuple, token_data: TokenData, weekly_data: Optional[Dict] = None,
+                           sentiment: Optional[MarketSentiment] = None) -> None:
+    if insight_flights.in_flight(fingerprint):
+        return
+    
+    def refresh():
+        try:
+            insight_flights.do(fingerprint, lambda: _refresh_ai_insights(
+                fingerprint, token_data, weekly_data, sentiment, wait=INSIGHT_CONFIG["background_wait"]))
+        except Exception as e:
+            print(f"AI insight refresh error: {e}")
+    
+    insight_refresh_pool.submit(refresh)
+
+def generate_ai_insights(token_data: TokenData, weekly_data: Optional[Dict] = None, sentiment: Optional[MarketSentiment] = None,
+                         background_refresh: Optional[bool] = None) -> List[str]:
     try:
         if not os.getenv("CLAUDE_API_KEY"):
             return ["AI insights unavailable - API key missing"]
         
-        data = {
-            "token": {
-                "name": token_data["base_token"]["name"],
-                "symbol": token_data["base_token"]["symbol"],
-                "price": float(token_data["price_usd"]),
-                "price_changes": token_data["price_change"],
-                "liquidity": token_data["liquidity"]["usd"],
-                "market_cap": token_data["market_cap"],
-                "age": (time.time() - token_data["pair_created_at"]) / 86400
-            },
-            "transactions": {
-                "h1": token_data["txns"]["h1"],
-                "h24": token_data["txns"]["h24"]
-            },
-            "sentiment": sentiment.get("score") if sentiment else None,
-            "weekly_data": weekly_data
-        }
+        fingerprint = insight_fingerprint(token_data, sentiment)
+        cached = insight_cache.get(fingerprint)
+        cache_lookups.inc(cache="insight", result="hit" if cached is not None else "miss")
+        if cached is not None:
+            return cached
         
-        response = anthropic.messages.create(
-        model="claude-3-7-sonnet-20250219",
-        max_tokens=300,
-        temperature=0.4,
-        system="You are a crypto market analysis AI. Provide 3-5 specific, actionable insights...",
-        messages=[{"role": "user", "content": json.dumps(data)}]
-)
+        if background_refresh is None:
+            background_refresh = INSIGHT_CONFIG["background_refresh"]
+        
+        # Serve the last good insight for this token now and refresh off the request path
+        last_good = last_good_insights.get(fingerprint[:2])
+        if background_refresh and last_good is not None:
+            _refresh_in_background(fingerprint, token_data, weekly_data, sentiment)
+            return last_good
         
-        ai_text = response.content[0].text
-        insights = [line.strip() for line in ai_text.split('\n') if line.strip()]
-        return insights[:5]
+        insights, _ = insight_flights.do(fingerprint, lambda: _refresh_ai_insights(
+            fingerprint, token_data, weekly_data, sentiment, wait=INSIGHT_CONFIG["request_wait"]))
+        if insights is None:
+            return last_good or ["AI insights temporarily rate limited"]
+        return insights
     
     except Exception as e:
+        errors_total.inc(stage="llm")
         print(f"AI insight error: {e}")
         return ["Failed to generate insights"]
 
+# ---------- Deferred Insights ----------
+def insight_job_id(fingerprint: Tuple) -> str:
+    return hashlib.sha1(repr(fingerprint).encode()).hexdigest()[:16]
+
+def get_insight_job(job_id: str) -> Optional[Dict]:
+    job = insight_jobs.get(job_id)
+    if job is None and shared_cache.shared:
+        # The report may have been served by another worker
+        job = shared_cache.get(f"insights:{job_id}")
+    return job
+
+def set_insight_job(job_id: str, job: Dict) -> None:
+    insight_jobs.set(job_id, job)
+    if shared_cache.shared:
+        shared_cache.set(f"insights:{job_id}", job, insight_jobs.ttl)
+
+def deferred_insights(token_data: TokenData, sentiment: Optional[MarketSentiment],
+                      start: Callable[[str, Tuple], None]) -> Dict:
+    """Non-blocking counterpart of generate_ai_insights.
+
+    Returns the report's insight fields: cached insights when there are some,
+    else status "pending" with the last good insights (or none) while
+    start(job_id, fingerprint) generates them in the background.
+    """
+    if not os.getenv("CLAUDE_API_KEY"):
+        return {"ai_insights": ["AI insights unavailable - API key missing"], "ai_insights_status": "ready"}
+    
+    fingerprint = insight_fingerprint(token_data, sentiment)
+    cached = insight_cache.get(fingerprint)
+    cache_lookups.inc(cache="insight", result="hit" if cached is not None else "miss")
+    if cached is not None:
+        return {"ai_insights": cached, "ai_insights_status": "ready"}
+    
+    job_id = insight_job_id(fingerprint)
+    job = get_insight_job(job_id)
+    # A job stuck pending past the background wait (e.g. a dead worker) is started again
+    stuck = (job is not None and job["status"] == "pending"
+             and time.time() - job["updated"] > INSIGHT_CONFIG["background_wait"] * 2)
+    if job is None or job["status"] == "failed" or stuck:
+        set_insight_job(job_id, {"status": "pending", "ai_insights": [], "updated": time.time()})
+        start(job_id, fingerprint)
+    elif job["status"] == "ready":
+        return {"ai_insights": job["ai_insights"], "ai_insights_status": "ready"}
+    return {
+        "ai_insights": last_good_insights.get(fingerprint[:2]) or [],
+        "ai_insights_status": "pending",
+        "insights_id": job_id
+    }
+
+def complete_insight_job(job_id: str, token_key: str, insights: Optional[List[str]]) -> None:
+    if insights is None:
+        job = {"status": "failed", "ai_insights": ["AI insights temporarily unavailable"], "updated": time.time()}
+    else:
+        job = {"status": "ready", "ai_insights": insights, "updated": time.time()}
+    set_insight_job(job_id, job)
+    
+    # Fill in the monitored report that is still waiting on this job
+    report = latest_reports.get(token_key)
+    if report is not None and report.get("insights_id") == job_id:
+        latest_reports[token_key] = resolve_insights(report)
+    feed.publish("insights", token_key, {"insights_id": job_id, "token_key": token_key, **job})
+
+def _run_insight_job(job_id: str, token_key: str, fingerprint: Tuple, token_data: TokenData,
+                     weekly_data: Optional[Dict], sentiment: Optional[MarketSentiment]) -> None:
+    try:
+        insights, _ = insight_flights.do(fingerprint, lambda: _refresh_ai_insights(
+            fingerprint, token_data, weekly_data, sentiment, wait=INSIGHT_CONFIG["background_wait"]))
+    except Exception as e:
+        errors_total.inc(stage="llm")
+        print(f"AI insight error: {e}")
+        insights = None
+    complete_insight_job(job_id, token_key, insights)
+
+def request_insights(token_key: str, token_data: TokenData, weekly_data: Optional[Dict] = None,
+                     sentiment: Optional[MarketSentiment] = None) -> Dict:
+    start = lambda job_id, fingerprint: insight_refresh_pool.submit(
+        _run_insight_job, job_id, token_key, fingerprint, token_data, weekly_data, sentiment)
+    return deferred_insights(token_data, sentiment, start)
+
+def resolve_insights(report: AnalyticsReport) -> AnalyticsReport:
+    """Copy of a pending report with its insights filled in once the job has finished."""
+    if report.get("ai_insights_status") != "pending":
+        return report
+    job = get_insight_job(report["insights_id"])
+    if job is None or job["status"] == "pending":
+        return report
+    resolved = {key: value for key, value in report.items() if key != "insights_id"}
+    resolved["ai_insights"] = job["ai_insights"]
+    resolved["ai_insights_status"] = job["status"]
+    return resolved
+
+def build_metrics(token_data: TokenData, market: Optional[Dict] = None) -> Dict:
+    return {
+        "price": {
+            "current": float(token_data["price_usd"]),
+            "change": {
+                "h1": token_data["price_change"]["h1"],
+                "h6": token_data["price_change"]["h6"],
+                "h24": token_data["price_change"]["h24"]
+            }
+        },
+        "volume": {
+            "h1": token_data["volume"]["h1"],
+            "h6": token_data["volume"]["h6"],
+            "h24": token_data["volume"]["h24"]
+        },
+        "liquidity": token_data["liquidity"]["usd"],
+        "market_depth": market,
+        "market_cap": token_data["market_cap"],
+        "fdv": token_data["fdv"],
+        "transactions": {
+            "h1": {
+                "buys": token_data["txns"]["h1"].get("buys", 0),
+                "sells": token_data["txns"]["h1"].get("sells", 0),
+                "ratio": (token_data["txns"]["h1"].get("buys", 0) 
+                        / max(1, token_data["txns"]["h1"].get("sells", 0)))
+            }
+        }
+    }
+
 def generate_analytics_report(token_data: TokenData, risk_analysis: RiskAnalysis, 
                              weekly_data: Optional[Dict] = None, 
-                             sentiment: Optional[MarketSentiment] = None) -> AnalyticsReport:
+                             sentiment: Optional[MarketSentiment] = None,
+                             market: Optional[Dict] = None,
+                             ai_insights: Optional[Dict] = None) -> AnalyticsReport:
+    # Deferred and ASGI callers pass the insight fields in (see deferred_insights)
+    if ai_insights is None:
+        ai_insights = {"ai_insights": generate_ai_insights(token_data, weekly_data, sentiment)}
     return {
         "token_name": token_data["base_token"]["name"],
         "token_symbol": token_data["base_token"]["symbol"],
         "timestamp": time.time(),
-        "metrics": {
-            "price": {
-                "current": float(token_data["price_usd"]),
-                "change": {
-                    "h1": token_data["price_change"]["h1"],
-                    "h6": token_data["price_change"]["h6"],
-                    "h24": token_data["price_change"]["h24"]
-                }
-            },
-            "volume": {
-                "h1": token_data["volume"]["h1"],
-                "h6": token_data["volume"]["h6"],
-                "h24": token_data["volume"]["h24"]
-            },
-            "liquidity": token_data["liquidity"]["usd"],
-            "market_cap": token_data["market_cap"],
-            "fdv": token_data["fdv"],
-            "transactions": {
-                "h1": {
-                    "buys": token_data["txns"]["h1"].get("buys", 0),
-                    "sells": token_data["txns"]["h1"].get("sells", 0),
-                    "ratio": (token_data["txns"]["h1"].get("buys", 0) 
-                            / max(1, token_data["txns"]["h1"].get("sells", 0)))
-                }
-            }
-        },
+        "metrics": build_metrics(token_data, market),
         "risk": risk_analysis,
-        "ai_insights": generate_ai_insights(token_data, weekly_data, sentiment)
+        **ai_insights
     }
 
+# ---------- Alert Engine ----------
+def create_alert_engine() -> AlertEngine:
+    engine = create_engine(ALERT_CONFIG)
+    engine.add_sink(LogSink())
+    if os.getenv("ALERT_WEBHOOK_URL"):
+        engine.add_sink(WebhookSink(os.getenv("ALERT_WEBHOOK_URL")))
+    if os.getenv("ALERT_LOG_FILE"):
+        engine.add_sink(FileSink(Path(os.getenv("ALERT_LOG_FILE"))))
+    return engine
+
+# Push feed: per-tick reports and alerts for SSE subscribers, one bounded buffer each
+feed = FeedHub(buffer=int(os.environ.get("FEED_BUFFER", 100)))
+
+alert_engine = create_alert_engine()
+# In-process consumers read alerts from alert_queue; stream clients get them via the feed
+alert_queue = alert_engine.add_sink(QueueSink())
+alert_engine.add_sink(FeedSink(feed))
+
+# ---------- Adaptive Polling ----------
+def measure_activity(token_key: str, token_data: TokenData, previous_data: Optional[TokenData]) -> Optional[float]:
+    # 1.0 means "hot": price or liquidity moved by the configured step since the last tick,
+    # or m5 transactions spiked to spike_ratio x their running baseline
+    m5 = token_data["txns"]["m5"]
+    txns = m5.get("buys", 0) + m5.get("sells", 0)
+    baseline = txn_baseline.get(token_key)
+    txn_baseline[token_key] = txns if baseline is None else baseline * 0.9 + txns * 0.1
+    if previous_data is None:
+        return None
+    
+    scores = []
+    previous_price = float(previous_data["price_usd"])
+    if previous_price > 0:
+        price_move = abs(float(token_data["price_usd"]) - previous_price) / previous_price * 100
+        scores.append(price_move / ADAPTIVE_CONFIG["price_move_pct"])
+    previous_liq = previous_data["liquidity"]["usd"]
+    if previous_liq > 0:
+        liq_move = abs(token_data["liquidity"]["usd"] - previous_liq) / previous_liq * 100
+        scores.append(liq_move / ADAPTIVE_CONFIG["liquidity_move_pct"])
+    if baseline:
+        # Excess over baseline, so a steady transaction rate scores 0
+        scores.append(max(0.0, txns / baseline - 1) / (ADAPTIVE_CONFIG["txn_spike_ratio"] - 1))
+    return max(scores) if scores else 0.0
+
+def monitor_token_tick(chain_id: str, token_address: str) -> Optional[AnalyticsReport]:
+    token_key = f"{chain_id}-{token_address}"
+    token_data = get_token_data(chain_id, token_address, fresh=True)
+    if not token_data:
+        return None
+    market = get_market_depth(chain_id, token_address)
+    
+    # Process alerts: windowed rules plus the snapshot diff, fanned out to sinks
+    previous_data = load_snapshot(token_key)
+    alert_engine.observe(token_key, token_data, previous_data)
+    token_activity[token_key] = measure_activity(token_key, token_data, previous_data)
+    
+    # Update caches
+    history = load_price_history(token_key)
+    history.append(time.time(), float(token_data["price_usd"]), token_data["volume"]["h1"])
+    store_snapshot(token_key, token_data, history)
+    
+    # Generate report
+    weekly_data = load_weekly_data(token_key)
+    sentiment = analyze_market_sentiment(token_data)
+    sentiments = sentiment_history.setdefault(token_key, [])
+    sentiments.append(sentiment)
+    del sentiments[:-SENTIMENT_HISTORY_SIZE]
+    risk_analysis = analyze_token_risk(token_data, previous_data, history.stats(), market)
+    # Deferred mode keeps the LLM off the tick; the insights follow as a feed event
+    insights = request_insights(token_key, token_data, weekly_data, sentiment) if INSIGHT_CONFIG["deferred"] else None
+    report = generate_analytics_report(token_data, risk_analysis, weekly_data, sentiment, market, insights)
+    
+    record_tick(token_key, token_data, report)
+    # Reports conflate per token, so slow subscribers only ever see the latest one
+    feed.publish("report", token_key, report, conflate=True)
+    return report
+
 def start_token_monitoring(chain_id: str, token_address: str, interval: int = 20):
     print(f"Starting monitoring for {chain_id}:{token_address}")
-    token_key = f"{chain_id}-{token_address}"
     
     while True:
         try:
-            token_data = get_token_data(chain_id, token_address)
-            if not token_data:
-                time.sleep(interval)
-                continue
-            
-            # Process alerts
-            previous_data = data_cache.get(token_key)
-            if previous_data:
-                alerts = detect_alerts(token_data, previous_data)
-                if alerts:
-                    print("\n=== ALERTS ===")
-                    for alert in alerts:
-                        print(alert)
-                    print("==============\n")
-            
-            # Update caches
-            data_cache[token_key] = token_data
-            price_point = {
-                "timestamp": time.time(),
-                "price": float(token_data["price_usd"]),
-                "volume": token_data["volume"]["h1"]
-            }
-            price_history.setdefault(token_key, []).append(price_point)
-            
-            # Trim history
-            if len(price_history[token_key]) > 1000:
-                price_history[token_key] = price_history[token_key][-1000:]
-            
-            # Generate report
-            weekly_data = load_weekly_data(token_key)
-            sentiment = analyze_market_sentiment(token_data)
-            risk_analysis = analyze_token_risk(token_data, previous_data)
-            report = generate_analytics_report(token_data, risk_analysis, weekly_data, sentiment)
-            
-            # Save weekly data (placeholder implementation)
-            save_weekly_data(token_key, report)
-            
-            time.sleep(interval)
-            
+            monitor_token_tick(chain_id, token_address)
         except Exception as e:
             print(f"Monitoring error: {e}")
-            time.sleep(interval)
+        time.sleep(interval)
+
+# ---------- Monitoring Scheduler ----------
+# One scheduler drives every monitored pair on a bounded worker pool instead
+# of one blocking start_token_monitoring loop (and process) per token.
+monitor_scheduler = MonitoringScheduler(
+    monitor_token_tick,
+    max_workers=int(os.environ.get("MONITOR_WORKERS", 16)),
+    default_interval=float(os.environ.get("MONITOR_INTERVAL", 20)),
+    jitter=float(os.environ.get("MONITOR_JITTER", 0.1)),
+    policy=AdaptivePolicy(
+        min_interval=ADAPTIVE_CONFIG["min_interval"],
+        max_interval=ADAPTIVE_CONFIG["max_interval"],
+        poll_budget=ADAPTIVE_CONFIG["poll_budget"]
+    ) if ADAPTIVE_CONFIG["enabled"] else None,
+    activity=lambda token_key, report: token_activity.pop(token_key, None)
+)
+
+def start_multi_token_monitoring(tokens: List[Dict], interval: Optional[float] = None) -> MonitoringScheduler:
+    for token in tokens:
+        monitor_scheduler.add_token(token["chain_id"], token["token_address"],
+                                    token.get("interval", interval))
+    monitor_scheduler.start()
+    return monitor_scheduler
+
+def stop_monitoring(chain_id: str, token_address: str) -> bool:
+    removed = monitor_scheduler.remove_token(chain_id, token_address)
+    if removed:
+        # Per-token alert and activity state would otherwise outlive the token
+        token_key = f"{chain_id}-{token_address}"
+        alert_engine.forget(token_key)
+        txn_baseline.pop(token_key, None)
+    return removed
+
+# ---------- Warm Start ----------
+def collect_checkpoint() -> Dict:
+    # Copies of the live dicts: ticks keep mutating them while the snapshot is written
+    return {
+        "saved_at": time.time(),
+        "data_cache": {key: token_data.to_state() for key, token_data in list(data_cache.items())
+                       if isinstance(token_data, CompactTokenData)},
+        "price_history": {key: ring.to_state() for key, ring in list(price_history.items())},
+        "sentiment_history": {key: list(history) for key, history in list(sentiment_history.items())},
+        "alerts": alert_engine.to_state(),
+        # Stream-only watchers come back on their own when clients reconnect
+        "monitored": [(token.chain_id, token.token_address, token.base_interval)
+                      for key, token in list(monitor_scheduler.tokens.items()) if key not in stream_watchers]
+    }
+
+def restore_checkpoint(state: Dict, monitored: bool = True) -> None:
+    for key, token_state in state.get("data_cache", {}).items():
+        data_cache[key] = CompactTokenData.from_state(token_state)
+    for key, ring_state in state.get("price_history", {}).items():
+        price_history[key] = PriceRing.from_state(ring_state, PRICE_HISTORY_SIZE)
+    sentiment_history.update(state.get("sentiment_history", {}))
+    alert_engine.load_state(state.get("alerts", {}))
+    if monitored:
+        for chain_id, token_address, interval in state.get("monitored", []):
+            monitor_scheduler.add_token(chain_id, token_address, interval)
+
+checkpointer = Checkpointer(CHECKPOINT_CONFIG["path"], collect_checkpoint, CHECKPOINT_CONFIG["interval"])
+# Held by the one worker that runs the scheduler and writes checkpoints
+scheduler_lease = Lease(shared_cache, "scheduler", SHARED_CACHE_CONFIG["lease_ttl"])
+
+def start_scheduling() -> None:
+    # Lease acquired: resume from the latest checkpoint, which a previous holder may have just written
+    state = load_checkpoint(CHECKPOINT_CONFIG["path"])
+    if state is not None:
+        restore_checkpoint(state)
+    print(f"Scheduler lease acquired by pid {os.getpid()}: monitoring {len(monitor_scheduler.tokens)} tokens")
+    if monitor_scheduler.tokens:
+        monitor_scheduler.start()
+    checkpointer.start()
+
+def stop_scheduling() -> None:
+    # Another worker took the lease over (this one stalled past the ttl); it resumes from the checkpoint
+    print(f"Scheduler lease lost by pid {os.getpid()}")
+    monitor_scheduler.stop(wait=False)
+    checkpointer.stop(save=False)
+
+def shutdown_scheduling() -> None:
+    if scheduler_lease.held:
+        checkpointer.stop()
+    scheduler_lease.release()
+
+def warm_start() -> None:
+    """Warm the caches from the last checkpoint and elect the worker that runs the scheduler.
+
+    Called before serving; under gunicorn every worker calls it from a
+    post_worker_init hook. Only the worker holding the scheduler lease in
+    the shared cache resumes the monitored tokens, runs the scheduler and
+    writes checkpoints; the others poll the lease and take over if that
+    worker dies. With the per-process memory:// cache there is nothing to
+    elect against, so run a single worker or set SHARED_CACHE_URL.
+    """
+    if not CHECKPOINT_CONFIG["enabled"]:
+        return
+    start = time.perf_counter()
+    try:
+        state = load_checkpoint(CHECKPOINT_CONFIG["path"])
+        if state is not None:
+            restore_checkpoint(state, monitored=False)
+            print(f"Warm start: {len(data_cache)} tokens restored from {CHECKPOINT_CONFIG['path']} "
+                  f"({(time.perf_counter() - start) * 1000:.0f}ms, "
+                  f"{time.time() - state.get('saved_at', time.time()):.0f}s old)")
+    except Exception as e:
+        print(f"Warm start failed, starting cold: {e}")
+    scheduler_lease.start(start_scheduling, stop_scheduling)
+    atexit.register(shutdown_scheduling)
+
+def build_token_report(chain_id: str, token_address: str, dex_id: Optional[str] = None,
+                       quote: Optional[str] = None, defer_insights: bool = False) -> Optional[AnalyticsReport]:
+    token_data = get_token_data(chain_id, token_address, dex_id, quote)
+    if token_data is None:
+        return None
+    market = get_market_depth(chain_id, token_address)
+    
+    # Build a unique token key to retrieve weekly data if it exists
+    token_key = f"{chain_id}-{token_address}"
+    weekly_data = load_weekly_data(token_key)
+    
+    # Generate sentiment and risk analysis
+    sentiment = analyze_market_sentiment(token_data)
+    # Here, we pass no previous data for a one-time report
+    risk_analysis = analyze_token_risk(token_data, market=market)
+    
+    # Generate a comprehensive analytics report with metrics, risk, and AI insights
+    insights = request_insights(token_key, token_data, weekly_data, sentiment) if defer_insights else None
+    return generate_analytics_report(token_data, risk_analysis, weekly_data, sentiment, market, insights)
+
+# ---------- Portfolio ----------
+def portfolio_holdings(tokens: List[TokenData], scores: List[Dict]) -> List[Dict]:
+    return [{
+        "symbol": token_data["base_token"]["symbol"],
+        "chain": token_data["chain_id"],
+        "price": float(token_data["price_usd"]),
+        "price_change_h24": token_data["price_change"]["h24"],
+        "liquidity": token_data["liquidity"]["usd"],
+        "market_cap": token_data["market_cap"],
+        "risk_score": score["risk_score"],
+        "vulnerabilities": score["vulnerabilities"],
+        "sentiment": score["sentiment_score"]
+    } for token_data, score in zip(tokens, scores)]
+
+def portfolio_insight_request(holdings: List[Dict]) -> Dict:
+    return {
+        "model": "claude-3-7-sonnet-20250219",
+        "max_tokens": 500,
+        "temperature": 0.4,
+        "system": "You are a crypto portfolio analysis AI. Provide 3-5 specific, actionable insights across these holdings...",
+        "messages": [{"role": "user", "content": json.dumps({"holdings": holdings})}]
+    }
+
+@stage_seconds.time(stage="llm")
+def _request_portfolio_insights(holdings: List[Dict]) -> List[str]:
+    return parse_insights(anthropic.messages.create(**portfolio_insight_request(holdings)))
+
+def generate_portfolio_insights(tokens: List[TokenData], scores: List[Dict]) -> List[str]:
+    # One LLM call for the whole portfolio instead of one per holding
+    try:
+        if not os.getenv("CLAUDE_API_KEY"):
+            return ["AI insights unavailable - API key missing"]
+        
+        fingerprint = ("portfolio",) + tuple(insight_fingerprint(token_data) for token_data in tokens)
+        cached = insight_cache.get(fingerprint)
+        if cached is not None:
+            return cached
+        
+        holdings = portfolio_holdings(tokens, scores)
+        
+        def refresh() -> Optional[List[str]]:
+            if not llm_rate_limiter.acquire(timeout=INSIGHT_CONFIG["request_wait"]):
+                return None
+            insights = _request_portfolio_insights(holdings)
+            insight_cache.set(fingerprint, insights)
+            return insights
+        
+        insights, _ = insight_flights.do(fingerprint, refresh)
+        return insights or ["AI insights temporarily rate limited"]
+    
+    except Exception as e:
+        print(f"Portfolio insight error: {e}")
+        return ["Failed to generate insights"]
+
+def parse_portfolio_tokens(data: object) -> Tuple[List[Tuple[str, str]], Optional[str]]:
+    """(chain_id, token_address) pairs from a /get_tokens body, or an error message."""
+    if not isinstance(data, dict) or not isinstance(data.get('tokens'), list) or not data['tokens']:
+        return [], "A list of tokens with token_address is required"
+    tokens = []
+    # Accepts [{"chain_id", "token_address"}] or [[chain_id, token_address]]
+    for item in data['tokens']:
+        if isinstance(item, dict):
+            chain_id, token_address = item.get('chain_id', 'solana'), item.get('token_address')
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            chain_id, token_address = item
+        else:
+            return [], "Each token must be {chain_id, token_address} or [chain_id, token_address]"
+        if not all(isinstance(value, str) and value for value in (chain_id, token_address)):
+            return [], "chain_id and token_address must be non-empty strings"
+        tokens.append((chain_id, token_address))
+    
+    tokens = list(dict.fromkeys(tokens))
+    if len(tokens) > PORTFOLIO_CONFIG["max_tokens"]:
+        return [], f"At most {PORTFOLIO_CONFIG['max_tokens']} tokens per request"
+    return tokens, None
+
+def portfolio_token_event(i: int, chain_id: str, token_address: str,
+                          token_data: Optional[TokenData]) -> Tuple[Dict, Optional[Dict]]:
+    """The "token" event for one holding plus its market depth."""
+    event = {"type": "token", "index": i, "chain_id": chain_id, "token_address": token_address}
+    if token_data is None:
+        event["error"] = "Token data not found"
+        return event, None
+    market = get_market_depth(chain_id, token_address)
+    event["token_name"] = token_data["base_token"]["name"]
+    event["token_symbol"] = token_data["base_token"]["symbol"]
+    event["metrics"] = build_metrics(token_data, market)
+    return event, market
+
+def score_portfolio(fetched: Dict[int, TokenData],
+                    markets: Dict[int, Optional[Dict]]) -> Tuple[List[TokenData], List[Dict]]:
+    order = sorted(fetched)
+    holdings = [fetched[i] for i in order]
+    scores: List[Dict] = []
+    if holdings:
+        batch = score_tokens_batch(holdings, markets=[markets[i] for i in order])
+        scores = [{
+            "index": i,
+            "risk_score": int(batch["risk_score"][n]),
+            "vulnerabilities": batch_scoring.vulnerability_names(int(batch["vulnerabilities"][n])),
+            "sentiment_score": float(batch["sentiment_score"][n])
+        } for n, i in enumerate(order)]
+    return holdings, scores
+
+def iter_portfolio(tokens: List[Tuple[str, str]]) -> Iterator[Dict]:
+    """Yield a "token" event per holding as its fetch completes, then one
+    "scores" event from the batch scorer and a single "summary" event."""
+    futures = {portfolio_pool.submit(get_token_data, chain_id, token_address): i
+               for i, (chain_id, token_address) in enumerate(tokens)}
+    fetched: Dict[int, TokenData] = {}
+    markets: Dict[int, Optional[Dict]] = {}
+    
+    for future in as_completed(futures):
+        i = futures[future]
+        token_data = future.result()
+        event, market = portfolio_token_event(i, *tokens[i], token_data)
+        if token_data is not None:
+            fetched[i], markets[i] = token_data, market
+        yield event
+    
+    holdings, scores = score_portfolio(fetched, markets)
+    yield {"type": "scores", "results": scores}
+    
+    insights = generate_portfolio_insights(holdings, scores) if holdings else []
+    yield {"type": "summary", "timestamp": time.time(), "ai_insights": insights}
+
+def merge_portfolio(events: Iterable[Dict], count: int) -> Dict:
+    """Fold the iter_portfolio events into the non-streaming /get_tokens response."""
+    results: Dict[int, Dict] = {}
+    summary: Dict = {}
+    for event in events:
+        if event["type"] == "token":
+            index = event.pop("index")
+            results[index] = {k: v for k, v in event.items() if k != "type"}
+        elif event["type"] == "scores":
+            for score in event["results"]:
+                results[score.pop("index")].update(score)
+        else:
+            summary = event
+    
+    return {
+        "tokens": [results[i] for i in range(count)],
+        "timestamp": summary.get("timestamp"),
+        "ai_insights": summary.get("ai_insights", [])
+    }
+
+# ---------- Request Metrics ----------
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if slow_request_profiler is not None:
+        g.profile = slow_request_profiler.begin(f"{request.method} {request.full_path}")
+
+@app.after_request
+def record_request_metrics(response):
+    # Streaming responses (SSE, NDJSON) are timed up to their first byte
+    http_request_seconds.observe(time.perf_counter() - g.request_started,
+                                 endpoint=request.endpoint or "unknown", status=response.status_code)
+    return response
+
+@app.teardown_request
+def finish_request_profile(exc=None):
+    if slow_request_profiler is not None and "profile" in g:
+        slow_request_profiler.end(g.profile)
 
 @app.route('/get_token', methods=['GET'])
 def get_token():
@@ -464,29 +1258,187 @@ def get_token():
     token_address = request.args.get('token_address')
     # Optionally, get the chain_id from the query, defaulting to 'solana'
     chain_id = request.args.get('chain_id', 'solana')
+    # Optional pool filters; the pair selection policy picks among the matches
+    dex_id = request.args.get('dex_id')
+    quote = request.args.get('quote')
+    # Return metrics and risk at once and follow up with the insights (see /get_insights)
+    defer = request.args.get('defer_insights', '1' if INSIGHT_CONFIG["deferred"] else '0') in ('1', 'true')
     
     if not token_address:
         return jsonify({"error": "Token address is required"}), 400
     
-    # Get token data using the existing function
-    token_data = get_token_data(chain_id, token_address)
-    if token_data is None:
+    # Concurrent requests for the same token share one fetch/analysis/LLM call
+    token_key = f"{chain_id}-{token_address}"
+    if dex_id or quote:
+        token_key = f"{token_key}-{dex_id or '*'}-{quote or '*'}"
+    cache_key = f"{token_key}:deferred" if defer else token_key
+    def build() -> Optional[AnalyticsReport]:
+        compute = lambda: build_token_report(chain_id, token_address, dex_id, quote, defer)
+        if not shared_cache.shared:
+            return compute()
+        # A report computed by any worker is served by all of them for the fresh TTL
+        return shared_cache.get_or_compute(f"report:{cache_key}", report_cache.ttl, compute)
+    
+    report, cache_status = report_cache.get_or_compute(cache_key, build)
+    cache_lookups.inc(cache="report", result=cache_status.lower())
+    if report is None:
         return jsonify({"error": "Token data not found"}), 404
+    report = resolve_insights(report)
     
-    # Build a unique token key to retrieve weekly data if it exists
+    response = jsonify(report)
+    response.headers["X-Cache"] = cache_status
+    return response
+
+@app.route('/get_insights', methods=['GET'])
+def get_insights():
+    # Follow-up for a report returned with ai_insights_status "pending"
+    job_id = request.args.get('id')
+    if not job_id:
+        return jsonify({"error": "id is required"}), 400
+    job = get_insight_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired insights id"}), 404
+    return jsonify({"insights_id": job_id, "status": job["status"], "ai_insights": job["ai_insights"]})
+
+@app.route('/get_tokens', methods=['POST'])
+def get_tokens():
+    data = request.get_json(silent=True) or {}
+    tokens, error = parse_portfolio_tokens(data)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    # Stream newline-delimited JSON events as holdings complete
+    if data.get('stream'):
+        return Response((json.dumps(event) + "\n" for event in iter_portfolio(tokens)),
+                        mimetype="application/x-ndjson",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    
+    return jsonify(merge_portfolio(iter_portfolio(tokens), len(tokens)))
+
+@app.route('/monitor_token', methods=['POST'])
+def monitor_token():
+    data = request.get_json(silent=True) or {}
+    token_address = data.get('token_address')
+    chain_id = data.get('chain_id', 'solana')
+    
+    if not token_address:
+        return jsonify({"error": "Token address is required"}), 400
+    
+    if data.get('stop'):
+        removed = stop_monitoring(chain_id, token_address)
+        return jsonify({"monitoring": False, "removed": removed})
+    
+    token = monitor_scheduler.add_token(chain_id, token_address, data.get('interval'))
+    with stream_watchers_lock:
+        # Explicitly monitored tokens outlive their stream subscribers
+        stream_watchers.pop(token.key, None)
+    monitor_scheduler.start()
+    return jsonify({"monitoring": True, "token_key": token.key, "interval": token.interval})
+
+@app.route('/monitor_stats', methods=['GET'])
+def monitor_stats():
+    return jsonify({**monitor_scheduler.stats(), "alerts": alert_engine.stats(), "feed": feed.stats(),
+                    "upstream": dex_client.client.stats(), "checkpoint": checkpointer.stats(),
+                    "shared_cache": shared_cache.stats()})
+
+# Tokens kept on the scheduler by stream subscribers; one upstream poll serves every watcher
+stream_watchers: Dict[str, int] = {}
+stream_watchers_lock = threading.Lock()
+
+def watch_token(chain_id: str, token_address: str) -> str:
     token_key = f"{chain_id}-{token_address}"
-    weekly_data = load_weekly_data(token_key)
+    with stream_watchers_lock:
+        if token_key not in monitor_scheduler.tokens:
+            stream_watchers[token_key] = 0
+            monitor_scheduler.add_token(chain_id, token_address)
+            monitor_scheduler.start()
+        if token_key in stream_watchers:
+            stream_watchers[token_key] += 1
+    return token_key
+
+def unwatch_token(chain_id: str, token_address: str) -> None:
+    token_key = f"{chain_id}-{token_address}"
+    with stream_watchers_lock:
+        if token_key not in stream_watchers:
+            return
+        stream_watchers[token_key] -= 1
+        # Only drop tokens the stream added; explicit /monitor_token entries stay
+        if stream_watchers[token_key] <= 0:
+            del stream_watchers[token_key]
+            stop_monitoring(chain_id, token_address)
+
+def sse_response(subscription, on_close=None) -> Response:
+    def events():
+        try:
+            while not subscription.closed:
+                batch = subscription.get(timeout=15)
+                if not batch:
+                    yield ": keep-alive\n\n"
+                for event in batch:
+                    yield event.to_sse()
+        finally:
+            feed.unsubscribe(subscription)
+            if on_close:
+                on_close()
     
-    # Generate sentiment and risk analysis
-    sentiment = analyze_market_sentiment(token_data)
-    # Here, we pass no previous data for a one-time report
-    risk_analysis = analyze_token_risk(token_data)
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/stream', methods=['GET'])
+def stream():
+    token_address = request.args.get('token_address')
+    chain_id = request.args.get('chain_id', 'solana')
     
-    # Generate a comprehensive analytics report with metrics, risk, and AI insights
-    report = generate_analytics_report(token_data, risk_analysis, weekly_data, sentiment)
+    if not token_address:
+        return jsonify({"error": "Token address is required"}), 400
     
-    return jsonify(report)
+    token_key = watch_token(chain_id, token_address)
+    subscription = feed.subscribe([token_key], buffer=request.args.get('buffer', type=int))
+    # Start the subscriber from the latest known state instead of waiting a full interval
+    if token_key in latest_reports:
+        subscription.offer(FeedEvent(0, "report", token_key, latest_reports[token_key]), conflate=True)
+    return sse_response(subscription, lambda: unwatch_token(chain_id, token_address))
+
+@metrics_registry.collector
+def collect_service_metrics():
+    upstream = dex_client.client.stats()
+    yield ("liquidity_upstream_events_total", "counter", "DexScreener client events",
+           [({"event": name}, upstream[name]) for name in
+            ("requests", "errors", "retries", "hedges", "rate_limited", "short_circuited")])
+    yield ("liquidity_upstream_breaker_open", "gauge", "1 while a host's circuit breaker is not closed",
+           [({"host": host}, int(b["state"] != "closed")) for host, b in upstream["breakers"].items()])
+    
+    scheduler = monitor_scheduler.stats()
+    yield ("liquidity_monitored_tokens", "gauge", "Tokens on the monitoring scheduler",
+           [({}, scheduler["tokens"])])
+    yield ("liquidity_scheduler_lag_seconds", "gauge", "Tick start lag behind schedule",
+           [({"quantile": q}, lag) for q, lag in scheduler["lag"].items()])
+    
+    alerts = alert_engine.stats()
+    yield ("liquidity_alerts_total", "counter", "Alerts fired and suppressed by cooldown",
+           [({"result": "fired"}, alerts["fired"]), ({"result": "suppressed"}, alerts["suppressed"])])
+    
+    shared = shared_cache.stats()
+    yield ("liquidity_shared_cache_total", "counter", "Shared cache lookups",
+           [({"backend": shared["backend"], "result": r}, shared[r]) for r in ("hits", "misses", "waited", "errors")])
+    yield ("liquidity_data_cache_tokens", "gauge", "Token snapshots held in this process",
+           [({}, len(data_cache))])
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics_registry.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/debug/slow_requests', methods=['GET'])
+def slow_requests():
+    if slow_request_profiler is None:
+        return jsonify({"error": "Profiler disabled; set PROFILE_SLOW_REQUEST_MS"}), 404
+    return jsonify(list(slow_request_profiler.reports))
+
+@app.route('/alerts_stream', methods=['GET'])
+def alerts_stream():
+    return sse_response(feed.subscribe(events=["alert"]))
 
 if __name__ == "__main__":
+    warm_start()
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port)
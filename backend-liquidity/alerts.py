@@ -0,0 +1,452 @@
+import functools
+import json
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple, TypedDict
+
+import requests
+
+
+class Alert(TypedDict):
+    token_key: str
+    rule: str
+    message: str
+    value: float
+    timestamp: float
+
+
+class Snapshot(NamedTuple):
+    timestamp: float
+    price: float
+    liquidity: float
+    buys_m5: int
+    sells_m5: int
+    volume_h1: float
+
+
+class TokenWindow:
+    """Recent snapshots for one token, bounded by the longest rule window."""
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self.snapshots: Deque[Snapshot] = deque()
+
+    def add(self, snapshot: Snapshot) -> None:
+        self.snapshots.append(snapshot)
+        cutoff = snapshot.timestamp - self.max_age
+        while self.snapshots and self.snapshots[0].timestamp < cutoff:
+            self.snapshots.popleft()
+
+    @property
+    def latest(self) -> Snapshot:
+        return self.snapshots[-1]
+
+    def start_of(self, seconds: float) -> Optional[Snapshot]:
+        """Oldest snapshot within the last `seconds`, if it is older than the latest."""
+        cutoff = self.latest.timestamp - seconds
+        for snapshot in self.snapshots:
+            if snapshot.timestamp >= cutoff:
+                return snapshot if snapshot is not self.latest else None
+        return None
+
+
+# ---------- Rules ----------
+class AlertRule(ABC):
+    """A rule measures one value per tick; the engine fires when it crosses `threshold`.
+
+    Once fired, a rule stays active until the value falls below
+    threshold * hysteresis, so a metric hovering at the limit alerts once.
+    """
+
+    name = "rule"
+    window = 0.0
+
+    def __init__(self, threshold: float, hysteresis: float = 0.8):
+        self.threshold = threshold
+        self.hysteresis = hysteresis
+
+    @abstractmethod
+    def evaluate(self, window: TokenWindow, symbol: str) -> Optional[Tuple[float, str]]:
+        ...
+
+
+class PriceChangeRule(AlertRule):
+    name = "price_change"
+
+    def __init__(self, minutes: float, threshold: float, hysteresis: float = 0.8):
+        super().__init__(threshold, hysteresis)
+        self.window = minutes * 60
+
+    def evaluate(self, window, symbol):
+        start = window.start_of(self.window)
+        if start is None or start.price <= 0:
+            return None
+        change = (window.latest.price - start.price) / start.price * 100
+        direction = "increased" if change > 0 else "decreased"
+        return abs(change), (f"PRICE ALERT: {symbol} {direction} by {abs(change):.2f}% "
+                             f"over {self.window / 60:.0f}m")
+
+
+class LiquidityDrainRule(AlertRule):
+    name = "liquidity_drain"
+
+    def __init__(self, minutes: float, threshold: float, hysteresis: float = 0.8):
+        super().__init__(threshold, hysteresis)
+        self.window = minutes * 60
+
+    def evaluate(self, window, symbol):
+        start = window.start_of(self.window)
+        if start is None or start.liquidity <= 0:
+            return None
+        drained = (start.liquidity - window.latest.liquidity) / start.liquidity * 100
+        elapsed = max(window.latest.timestamp - start.timestamp, 1) / 60
+        return max(drained, 0.0), (f"LIQUIDITY DRAIN: {symbol} lost {drained:.2f}% liquidity "
+                                   f"in {elapsed:.0f}m ({drained / elapsed:.2f}%/min)")
+
+
+class ImbalanceStreakRule(AlertRule):
+    """Fires when m5 sells/buys (or buys/sells) exceed `ratio` for `streak` ticks in a row."""
+
+    name = "imbalance_streak"
+
+    def __init__(self, ratio: float, streak: int, hysteresis: float = 0.8):
+        # Engine fires on value > threshold, i.e. once the streak reaches `streak`
+        super().__init__(streak - 1, hysteresis)
+        self.ratio = ratio
+        self.streak = streak
+
+    @staticmethod
+    def _side(snapshot: Snapshot, ratio: float) -> int:
+        if snapshot.sells_m5 > max(snapshot.buys_m5, 1) * ratio:
+            return -1
+        if snapshot.buys_m5 > max(snapshot.sells_m5, 1) * ratio:
+            return 1
+        return 0
+
+    def evaluate(self, window, symbol):
+        side = self._side(window.latest, self.ratio)
+        if side == 0:
+            return 0.0, ""
+        streak = 0
+        for snapshot in reversed(window.snapshots):
+            if self._side(snapshot, self.ratio) != side:
+                break
+            streak += 1
+        pressure = "selling" if side < 0 else "buying"
+        return float(streak), f"IMBALANCE ALERT: {symbol} one-sided {pressure} for {streak} consecutive ticks"
+
+
+# Snapshot (tick-over-tick) alert kinds, as "<kind>: ..." message prefixes
+SNAPSHOT_ALERT_KINDS = ("PRICE ALERT", "VOLUME ALERT", "LIQUIDITY ALERT")
+
+
+def snapshot_alerts(current, previous, config: Dict) -> List[str]:
+    """Tick-over-tick price, volume and liquidity changes over ALERT_CONFIG thresholds."""
+    alerts = []
+
+    # Price alert
+    current_price = float(current["price_usd"])
+    previous_price = float(previous["price_usd"])
+    if previous_price > 0:
+        price_change = abs((current_price - previous_price) / previous_price * 100)
+        if price_change > config["price_change_threshold"]:
+            direction = "increased" if current_price > previous_price else "decreased"
+            alerts.append(f"PRICE ALERT: {current['base_token']['symbol']} {direction} by {price_change:.2f}%")
+
+    # Volume alert
+    current_vol = current["volume"]["h1"]
+    previous_vol = previous["volume"]["h1"]
+    if previous_vol > 0:
+        vol_change = abs((current_vol - previous_vol) / previous_vol * 100)
+        if vol_change > config["volume_change_threshold"]:
+            direction = "increased" if current_vol > previous_vol else "decreased"
+            alerts.append(f"VOLUME ALERT: Volume {direction} by {vol_change:.2f}%")
+
+    # Liquidity alert
+    current_liq = current["liquidity"]["usd"]
+    previous_liq = previous["liquidity"]["usd"]
+    if previous_liq > 0:
+        liq_change = abs((current_liq - previous_liq) / previous_liq * 100)
+        if liq_change > config["liquidity_change_threshold"]:
+            direction = "increased" if current_liq > previous_liq else "decreased"
+            alerts.append(f"LIQUIDITY ALERT: Liquidity {direction} by {liq_change:.2f}%")
+
+    return alerts
+
+
+# ---------- Sinks ----------
+class AlertSink(ABC):
+    name = "sink"
+
+    @abstractmethod
+    def emit(self, alert: Alert) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class LogSink(AlertSink):
+    name = "log"
+
+    def emit(self, alert):
+        print(f"[{alert['token_key']}] {alert['message']}")
+
+
+class FileSink(AlertSink):
+    """Appends alerts to a JSON-lines file."""
+
+    name = "file"
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def emit(self, alert):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(alert) + "\n")
+
+
+class WebhookSink(AlertSink):
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 5, http: Optional[requests.Session] = None):
+        self.url = url
+        self.timeout = timeout
+        self.http = http or requests.Session()
+
+    def emit(self, alert):
+        self.http.post(self.url, json=alert, timeout=self.timeout).raise_for_status()
+
+
+class QueueSink(AlertSink):
+    """In-process queue for consumers in the same service; drops the oldest when full."""
+
+    name = "queue"
+
+    def __init__(self, maxsize: int = 1000):
+        self.queue: "queue.Queue[Alert]" = queue.Queue(maxsize)
+
+    def emit(self, alert):
+        while True:
+            try:
+                self.queue.put_nowait(alert)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class SinkWorker:
+    """Delivers alerts to one sink on its own thread so a slow sink never blocks polling."""
+
+    def __init__(self, sink: AlertSink, queue_size: int = 1000):
+        self.sink = sink
+        self.queue: "queue.Queue[Optional[Alert]]" = queue.Queue(queue_size)
+        self.delivered = 0
+        self.dropped = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self._run, name=f"alerts-{sink.name}", daemon=True)
+        self.thread.start()
+
+    def submit(self, alert: Alert) -> None:
+        try:
+            self.queue.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            alert = self.queue.get()
+            if alert is None:
+                return
+            try:
+                self.sink.emit(alert)
+                self.delivered += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Alert sink {self.sink.name} error: {e}")
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+        self.sink.close()
+
+
+# ---------- Engine ----------
+class AlertEngine:
+    """Evaluates windowed rules per token, dedupes with cooldown + hysteresis and fans out to sinks.
+
+    `snapshot_rules` are plain callables (current, previous) -> List[str]
+    such as snapshot_alerts; they share the cooldown keyed by alert prefix.
+
+    Per-token state is dropped by forget() when a token stops being
+    monitored, and any token not observed for `idle_ttl` seconds is evicted.
+    """
+
+    def __init__(self, rules: List[AlertRule], cooldown: float = 300,
+                 snapshot_rules: Optional[Dict[str, Callable]] = None, idle_ttl: float = 3600):
+        self.rules = rules
+        self.snapshot_rules = snapshot_rules or {}
+        self.cooldown = cooldown
+        self.idle_ttl = idle_ttl
+        self.max_window = max([rule.window for rule in rules] + [0]) + 60
+        self.windows: Dict[str, TokenWindow] = {}
+        self.workers: List[SinkWorker] = []
+        self._active: Dict[Tuple[str, str], bool] = {}
+        self._last_fired: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._pruned_at = 0.0
+        self.fired = 0
+        self.suppressed = 0
+        self.evicted = 0
+
+    def add_sink(self, sink: AlertSink, queue_size: int = 1000) -> AlertSink:
+        self.workers.append(SinkWorker(sink, queue_size))
+        return sink
+
+    def _drop(self, token_keys: Iterable[str]) -> None:
+        token_keys = set(token_keys)
+        for token_key in token_keys:
+            self.windows.pop(token_key, None)
+        for state in (self._active, self._last_fired):
+            for key in [key for key in state if key[0] in token_keys]:
+                del state[key]
+
+    def forget(self, token_key: str) -> None:
+        """Drop a token's window, active flags and cooldowns (it is no longer monitored)."""
+        with self._lock:
+            self._drop([token_key])
+
+    def _prune_idle(self, now: float) -> None:
+        # At most once a minute; a tick in flight when a token was removed can recreate its state
+        if now - self._pruned_at < 60:
+            return
+        self._pruned_at = now
+        cutoff = now - self.idle_ttl
+        idle = {key for key, window in self.windows.items()
+                if not window.snapshots or window.latest.timestamp < cutoff}
+        # Cooldowns restored for tokens that never came back
+        idle.update(key[0] for key, fired in self._last_fired.items()
+                    if key[0] not in self.windows and fired < cutoff)
+        self.evicted += len(idle)
+        self._drop(idle)
+
+    def _cooled_down(self, key: Tuple[str, str], now: float) -> bool:
+        return now - self._last_fired.get(key, 0) >= self.cooldown
+
+    def _fire(self, alerts: List[Alert], token_key: str, rule: str, message: str, value: float, now: float) -> None:
+        self._last_fired[(token_key, rule)] = now
+        alerts.append({"token_key": token_key, "rule": rule, "message": message, "value": value, "timestamp": now})
+
+    def observe(self, token_key: str, current, previous=None, now: Optional[float] = None) -> List[Alert]:
+        now = time.time() if now is None else now
+        symbol = current["base_token"]["symbol"]
+        m5 = current["txns"]["m5"]
+        snapshot = Snapshot(now, float(current["price_usd"]), current["liquidity"]["usd"],
+                            m5.get("buys", 0), m5.get("sells", 0), current["volume"]["h1"])
+        alerts: List[Alert] = []
+
+        with self._lock:
+            self._prune_idle(now)
+            window = self.windows.get(token_key)
+            if window is None:
+                window = self.windows[token_key] = TokenWindow(self.max_window)
+            window.add(snapshot)
+
+            for rule in self.rules:
+                result = rule.evaluate(window, symbol)
+                if result is None:
+                    continue
+                value, message = result
+                key = (token_key, rule.name)
+                if self._active.get(key):
+                    if value < rule.threshold * rule.hysteresis:
+                        self._active[key] = False
+                    continue
+                if value > rule.threshold:
+                    self._active[key] = True
+                    if self._cooled_down(key, now):
+                        self._fire(alerts, token_key, rule.name, message, value, now)
+                    else:
+                        self.suppressed += 1
+
+            if previous is not None:
+                for name, fn in self.snapshot_rules.items():
+                    for message in fn(current, previous):
+                        rule_name = f"{name}:{message.split(':', 1)[0]}"
+                        if self._cooled_down((token_key, rule_name), now):
+                            self._fire(alerts, token_key, rule_name, message, 0.0, now)
+                        else:
+                            self.suppressed += 1
+
+            self.fired += len(alerts)
+
+        for alert in alerts:
+            for worker in self.workers:
+                worker.submit(alert)
+        return alerts
+
+    def to_state(self) -> Dict:
+        """Rule windows, active flags and cooldowns, so a restart neither goes blind nor re-fires."""
+        with self._lock:
+            return {
+                "windows": {key: [tuple(s) for s in window.snapshots] for key, window in self.windows.items()},
+                "active": [key for key, active in self._active.items() if active],
+                "last_fired": list(self._last_fired.items())
+            }
+
+    def load_state(self, state: Dict) -> None:
+        with self._lock:
+            for token_key, snapshots in state.get("windows", {}).items():
+                window = self.windows[token_key] = TokenWindow(self.max_window)
+                for snapshot in snapshots:
+                    window.add(Snapshot(*snapshot))
+            self._active.update((tuple(key), True) for key in state.get("active", []))
+            self._last_fired.update((tuple(key), fired) for key, fired in state.get("last_fired", []))
+
+    def stats(self) -> Dict:
+        return {
+            "tokens": len(self.windows),
+            "fired": self.fired,
+            "suppressed": self.suppressed,
+            "evicted": self.evicted,
+            "sinks": {
+                worker.sink.name: {
+                    "queued": worker.queue.qsize(),
+                    "delivered": worker.delivered,
+                    "dropped": worker.dropped,
+                    "failed": worker.failed
+                }
+                for worker in self.workers
+            }
+        }
+
+    def close(self) -> None:
+        for worker in self.workers:
+            worker.close()
+
+
+def create_engine(config: Dict) -> AlertEngine:
+    """The service's rules and cooldowns from an ALERT_CONFIG dict, without sinks.
+
+    backtest.py replays recorded ticks through the same engine, so both
+    always agree on what fires.
+    """
+    return AlertEngine(
+        rules=[
+            PriceChangeRule(config["price_window_minutes"], config["price_change_threshold"], config["hysteresis"]),
+            LiquidityDrainRule(config["liquidity_drain_window_minutes"], config["liquidity_drain_threshold"],
+                               config["hysteresis"]),
+            ImbalanceStreakRule(config["imbalance_ratio"], config["imbalance_streak"], config["hysteresis"])
+        ],
+        cooldown=config["cooldown_seconds"],
+        snapshot_rules={"snapshot": functools.partial(snapshot_alerts, config=config)},
+        idle_ttl=config.get("idle_ttl_seconds", 3600)
+    )
@@ -0,0 +1,416 @@
+"""Async serving mode for the liquidity service.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+/get_token, /get_tokens and /get_insights run on the event loop with httpx and AsyncAnthropic,
+so a request waiting on DexScreener or the LLM holds a coroutine instead of a
+worker thread, and one process can keep hundreds of slow requests in flight.
+Every other route is the Flask app behind a2wsgi's thread pool. Responses
+have the same shapes as the Flask routes; the risk, sentiment and batch
+scoring code is shared with the sync path and only the I/O differs.
+
+The slow-request profiler samples per thread and so only covers the Flask
+routes here. Under a multi-worker deployment the shared cache still
+deduplicates reports and pairs, but without the cross-worker fill lock.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple, Union
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from anthropic import AsyncAnthropic
+
+import Liquidity_Monitoring_agent as agent
+from async_upstream import AsyncDexBatcher, create_dex_batcher, create_http_client
+from caching import AsyncResponseCache, AsyncSingleFlight
+from pairs import PairIndex
+from token_data import CompactTokenData
+from Liquidity_Monitoring_agent import AnalyticsReport, MarketSentiment, TokenData
+
+ASGI_CONFIG = {
+    "http_pool_size": int(os.environ.get("ASGI_HTTP_POOL_SIZE", 100)),
+    # Threads serving the routes that stay on the Flask app
+    "wsgi_workers": int(os.environ.get("ASGI_WSGI_WORKERS", 16))
+}
+
+
+class Reply(NamedTuple):
+    status: int
+    body: Union[bytes, AsyncIterator[bytes]]
+    content_type: str = "application/json"
+    headers: Tuple[Tuple[str, str], ...] = ()
+
+
+def json_reply(payload, status: int = 200, headers: Tuple[Tuple[str, str], ...] = ()) -> Reply:
+    return Reply(status, json.dumps(payload).encode(), headers=headers)
+
+
+class Clients:
+    """Event-loop-bound clients, created on lifespan startup."""
+    http = None
+    dex: Optional[AsyncDexBatcher] = None
+    llm: Optional[AsyncAnthropic] = None
+
+
+clients = Clients()
+# Shares stored reports with the Flask route's cache
+report_cache = AsyncResponseCache(agent.report_cache.ttl, agent.report_cache.stale_ttl,
+                                  entries=agent.report_cache.entries)
+insight_flights = AsyncSingleFlight()
+_background: Set[asyncio.Task] = set()
+
+
+def spawn(coro: Awaitable) -> None:
+    # Hold a reference until done; the loop only keeps weak ones
+    task = asyncio.ensure_future(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def shared_get_or_compute(key: str, ttl: float, compute: Callable[[], Awaitable]):
+    # SharedCache backends are blocking (file/redis), so they run off the loop
+    value = await asyncio.to_thread(agent.shared_cache.get, key)
+    if value is not None:
+        return value
+    value = await compute()
+    if value is not None:
+        await asyncio.to_thread(agent.shared_cache.set, key, value, ttl)
+    return value
+
+
+# ---------- Data ----------
+async def get_pair_index(token_address: str) -> PairIndex:
+    index = agent.pair_indexes.get(token_address)
+    agent.cache_lookups.inc(cache="pair_index", result="hit" if index is not None else "miss")
+    if index is None:
+        # Concurrent lookups share one batched request in AsyncDexBatcher
+        fetch = lambda: clients.dex.fetch(token_address)
+        with agent.stage_seconds.time(stage="fetch"):
+            if agent.shared_cache.shared:
+                pairs = await shared_get_or_compute(f"pairs:{token_address}", agent.PAIR_CONFIG["ttl"], fetch)
+            else:
+                pairs = await fetch()
+        with agent.stage_seconds.time(stage="transform"):
+            index = PairIndex(token_address, pairs)
+        agent.pair_indexes.set(token_address, index)
+    return index
+
+
+async def get_token_data(chain_id: str, token_address: str, dex_id: Optional[str] = None,
+                         quote: Optional[str] = None, policy: Optional[str] = None) -> Optional[TokenData]:
+    try:
+        pair = agent.select_pair(await get_pair_index(token_address), chain_id, dex_id, quote, policy)
+        if not pair:
+            return None
+        with agent.stage_seconds.time(stage="transform"):
+            return CompactTokenData.from_pair(pair)
+    except Exception as e:
+        agent.errors_total.inc(stage="fetch")
+        print(f"Error fetching token data: {e}")
+        return None
+
+
+# ---------- AI Insights ----------
+async def _request_insights(request: Dict) -> List[str]:
+    with agent.stage_seconds.time(stage="llm"):
+        return agent.parse_insights(await clients.llm.messages.create(**request))
+
+
+async def _refresh_ai_insights(fingerprint: Tuple, token_data: TokenData, weekly_data: Optional[Dict],
+                               sentiment: Optional[MarketSentiment], wait: float) -> Optional[List[str]]:
+    cached = agent.insight_cache.get(fingerprint)
+    if cached is not None:
+        return cached
+    if not await agent.llm_rate_limiter.acquire_async(timeout=wait):
+        return None
+    insights = await _request_insights(agent.insight_request(token_data, weekly_data, sentiment))
+    agent.insight_cache.set(fingerprint, insights)
+    agent.last_good_insights.set(fingerprint[:2], insights)
+    return insights
+
+
+async def _refresh_in_background(fingerprint: Tuple, token_data: TokenData, weekly_data: Optional[Dict],
+                                 sentiment: Optional[MarketSentiment]) -> None:
+    try:
+        await insight_flights.do(fingerprint, lambda: _refresh_ai_insights(
+            fingerprint, token_data, weekly_data, sentiment, agent.INSIGHT_CONFIG["background_wait"]))
+    except Exception as e:
+        print(f"AI insight refresh error: {e}")
+
+
+async def generate_ai_insights(token_data: TokenData, weekly_data: Optional[Dict] = None,
+                               sentiment: Optional[MarketSentiment] = None) -> List[str]:
+    """Same caching, background refresh and rate limiting as agent.generate_ai_insights."""
+    try:
+        if not os.getenv("CLAUDE_API_KEY"):
+            return ["AI insights unavailable - API key missing"]
+
+        fingerprint = agent.insight_fingerprint(token_data, sentiment)
+        cached = agent.insight_cache.get(fingerprint)
+        agent.cache_lookups.inc(cache="insight", result="hit" if cached is not None else "miss")
+        if cached is not None:
+            return cached
+
+        last_good = agent.last_good_insights.get(fingerprint[:2])
+        if agent.INSIGHT_CONFIG["background_refresh"] and last_good is not None:
+            if not insight_flights.in_flight(fingerprint):
+                spawn(_refresh_in_background(fingerprint, token_data, weekly_data, sentiment))
+            return last_good
+
+        insights, _ = await insight_flights.do(fingerprint, lambda: _refresh_ai_insights(
+            fingerprint, token_data, weekly_data, sentiment, agent.INSIGHT_CONFIG["request_wait"]))
+        if insights is None:
+            return last_good or ["AI insights temporarily rate limited"]
+        return insights
+
+    except Exception as e:
+        agent.errors_total.inc(stage="llm")
+        print(f"AI insight error: {e}")
+        return ["Failed to generate insights"]
+
+
+async def generate_portfolio_insights(tokens: List[TokenData], scores: List[Dict]) -> List[str]:
+    try:
+        if not os.getenv("CLAUDE_API_KEY"):
+            return ["AI insights unavailable - API key missing"]
+
+        fingerprint = ("portfolio",) + tuple(agent.insight_fingerprint(token_data) for token_data in tokens)
+        cached = agent.insight_cache.get(fingerprint)
+        if cached is not None:
+            return cached
+
+        request = agent.portfolio_insight_request(agent.portfolio_holdings(tokens, scores))
+
+        async def refresh() -> Optional[List[str]]:
+            if not await agent.llm_rate_limiter.acquire_async(timeout=agent.INSIGHT_CONFIG["request_wait"]):
+                return None
+            insights = await _request_insights(request)
+            agent.insight_cache.set(fingerprint, insights)
+            return insights
+
+        insights, _ = await insight_flights.do(fingerprint, refresh)
+        return insights or ["AI insights temporarily rate limited"]
+
+    except Exception as e:
+        print(f"Portfolio insight error: {e}")
+        return ["Failed to generate insights"]
+
+
+async def _run_insight_job(job_id: str, token_key: str, fingerprint: Tuple, token_data: TokenData,
+                           weekly_data: Optional[Dict], sentiment: Optional[MarketSentiment]) -> None:
+    try:
+        insights, _ = await insight_flights.do(fingerprint, lambda: _refresh_ai_insights(
+            fingerprint, token_data, weekly_data, sentiment, agent.INSIGHT_CONFIG["background_wait"]))
+    except Exception as e:
+        agent.errors_total.inc(stage="llm")
+        print(f"AI insight error: {e}")
+        insights = None
+    await asyncio.to_thread(agent.complete_insight_job, job_id, token_key, insights)
+
+
+async def request_insights(token_key: str, token_data: TokenData, weekly_data: Optional[Dict],
+                           sentiment: Optional[MarketSentiment]) -> Dict:
+    """agent.request_insights with the job run as a task on the loop."""
+    started: List[Tuple[str, Tuple]] = []
+    fields = await asyncio.to_thread(agent.deferred_insights, token_data, sentiment,
+                                     lambda job_id, fingerprint: started.append((job_id, fingerprint)))
+    for job_id, fingerprint in started:
+        spawn(_run_insight_job(job_id, token_key, fingerprint, token_data, weekly_data, sentiment))
+    return fields
+
+
+# ---------- Reports ----------
+async def build_token_report(chain_id: str, token_address: str, dex_id: Optional[str] = None,
+                             quote: Optional[str] = None, defer_insights: bool = False) -> Optional[AnalyticsReport]:
+    token_data = await get_token_data(chain_id, token_address, dex_id, quote)
+    if token_data is None:
+        return None
+    market = agent.get_market_depth(chain_id, token_address)
+    token_key = f"{chain_id}-{token_address}"
+    weekly_data = agent.load_weekly_data(token_key)
+
+    sentiment = agent.analyze_market_sentiment(token_data)
+    risk_analysis = agent.analyze_token_risk(token_data, market=market)
+    if defer_insights:
+        insights = await request_insights(token_key, token_data, weekly_data, sentiment)
+    else:
+        insights = {"ai_insights": await generate_ai_insights(token_data, weekly_data, sentiment)}
+    return agent.generate_analytics_report(token_data, risk_analysis, weekly_data, sentiment, market, insights)
+
+
+async def iter_portfolio(tokens: List[Tuple[str, str]]) -> AsyncIterator[Dict]:
+    """agent.iter_portfolio on the event loop: the same token, scores and summary events."""
+    async def fetch(i: int) -> Tuple[int, Optional[TokenData]]:
+        return i, await get_token_data(*tokens[i])
+
+    fetched: Dict[int, TokenData] = {}
+    markets: Dict[int, Optional[Dict]] = {}
+    for next_done in asyncio.as_completed([fetch(i) for i in range(len(tokens))]):
+        i, token_data = await next_done
+        event, market = agent.portfolio_token_event(i, *tokens[i], token_data)
+        if token_data is not None:
+            fetched[i], markets[i] = token_data, market
+        yield event
+
+    holdings, scores = agent.score_portfolio(fetched, markets)
+    yield {"type": "scores", "results": scores}
+
+    insights = await generate_portfolio_insights(holdings, scores) if holdings else []
+    yield {"type": "summary", "timestamp": time.time(), "ai_insights": insights}
+
+
+# ---------- Routes ----------
+async def get_token(query: Dict[str, str], body: bytes) -> Reply:
+    token_address = query.get('token_address')
+    chain_id = query.get('chain_id', 'solana')
+    dex_id = query.get('dex_id')
+    quote = query.get('quote')
+    defer = query.get('defer_insights', '1' if agent.INSIGHT_CONFIG["deferred"] else '0') in ('1', 'true')
+
+    if not token_address:
+        return json_reply({"error": "Token address is required"}, 400)
+
+    token_key = f"{chain_id}-{token_address}"
+    if dex_id or quote:
+        token_key = f"{token_key}-{dex_id or '*'}-{quote or '*'}"
+    cache_key = f"{token_key}:deferred" if defer else token_key
+
+    async def build() -> Optional[AnalyticsReport]:
+        compute = lambda: build_token_report(chain_id, token_address, dex_id, quote, defer)
+        if not agent.shared_cache.shared:
+            return await compute()
+        return await shared_get_or_compute(f"report:{cache_key}", report_cache.ttl, compute)
+
+    report, cache_status = await report_cache.get_or_compute(cache_key, build)
+    agent.cache_lookups.inc(cache="report", result=cache_status.lower())
+    if report is None:
+        return json_reply({"error": "Token data not found"}, 404)
+    if report.get("ai_insights_status") == "pending":
+        report = await asyncio.to_thread(agent.resolve_insights, report)
+    return json_reply(report, headers=(("X-Cache", cache_status),))
+
+
+async def get_insights(query: Dict[str, str], body: bytes) -> Reply:
+    job_id = query.get('id')
+    if not job_id:
+        return json_reply({"error": "id is required"}, 400)
+    job = await asyncio.to_thread(agent.get_insight_job, job_id)
+    if job is None:
+        return json_reply({"error": "Unknown or expired insights id"}, 404)
+    return json_reply({"insights_id": job_id, "status": job["status"], "ai_insights": job["ai_insights"]})
+
+
+async def get_tokens(query: Dict[str, str], body: bytes) -> Reply:
+    try:
+        data = json.loads(body) if body else {}
+    except ValueError:
+        data = {}
+    tokens, error = agent.parse_portfolio_tokens(data)
+    if error:
+        return json_reply({"error": error}, 400)
+
+    if data.get('stream'):
+        async def lines() -> AsyncIterator[bytes]:
+            async for event in iter_portfolio(tokens):
+                yield (json.dumps(event) + "\n").encode()
+        return Reply(200, lines(), "application/x-ndjson",
+                     (("Cache-Control", "no-cache"), ("X-Accel-Buffering", "no")))
+
+    events = [event async for event in iter_portfolio(tokens)]
+    return json_reply(agent.merge_portfolio(events, len(tokens)))
+
+
+ROUTES: Dict[Tuple[str, str], Callable[[Dict[str, str], bytes], Awaitable[Reply]]] = {
+    ("GET", "/get_token"): get_token,
+    ("GET", "/get_insights"): get_insights,
+    ("POST", "/get_tokens"): get_tokens
+}
+
+
+# ---------- ASGI ----------
+async def startup() -> None:
+    clients.http = create_http_client(ASGI_CONFIG["http_pool_size"])
+    clients.dex = create_dex_batcher(clients.http)
+    clients.llm = AsyncAnthropic(api_key=os.getenv("CLAUDE_API_KEY"))
+    agent.warm_start()
+
+
+async def shutdown() -> None:
+    await clients.http.aclose()
+    await clients.llm.close()
+
+
+async def lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await startup()
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await shutdown()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def send_reply(send, reply: Reply) -> None:
+    # flask-cors default: any origin
+    headers = [(b"content-type", reply.content_type.encode()), (b"access-control-allow-origin", b"*")]
+    headers += [(name.lower().encode(), value.encode()) for name, value in reply.headers]
+    if isinstance(reply.body, bytes):
+        headers.append((b"content-length", str(len(reply.body)).encode()))
+        await send({"type": "http.response.start", "status": reply.status, "headers": headers})
+        await send({"type": "http.response.body", "body": reply.body})
+        return
+    await send({"type": "http.response.start", "status": reply.status, "headers": headers})
+    async for chunk in reply.body:
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+flask_app = WSGIMiddleware(agent.app, workers=ASGI_CONFIG["wsgi_workers"])
+
+
+async def app(scope, receive, send) -> None:
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    handler = ROUTES.get((scope.get("method"), scope["path"])) if scope["type"] == "http" else None
+    if handler is None:
+        await flask_app(scope, receive, send)
+        return
+
+    start = time.perf_counter()
+    query: Dict[str, str] = {}
+    for name, value in parse_qsl(scope["query_string"].decode("latin-1")):
+        # First value wins, like request.args.get
+        query.setdefault(name, value)
+    try:
+        reply = await handler(query, await read_body(receive))
+    except Exception as e:
+        print(f"Unhandled error in {scope['path']}: {e}")
+        reply = json_reply({"error": "Internal server error"}, 500)
+    # Streaming replies are timed up to their first byte, as in the Flask hooks
+    agent.http_request_seconds.observe(time.perf_counter() - start,
+                                       endpoint=handler.__name__, status=reply.status)
+    await send_reply(send, reply)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
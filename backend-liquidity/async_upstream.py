@@ -0,0 +1,205 @@
+import asyncio
+import os
+import random
+import time
+from typing import Dict, List, Optional, Set
+from urllib.parse import urlsplit
+
+import httpx
+
+import dex_client
+from ratelimit import TokenBucket
+from resilience import CircuitOpenError, RateLimitedError, ResilientClient, RetryBudget, UpstreamError
+
+
+def create_http_client(pool_size: int = 100) -> httpx.AsyncClient:
+    # Timeouts are set per attempt by AsyncResilientClient
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        headers={"Accept": "application/json"}
+    )
+
+
+class AsyncResilientClient(ResilientClient):
+    """ResilientClient on an httpx.AsyncClient: same breakers, retry budget,
+    Retry-After handling, hedging and stats, but get() is a coroutine so a
+    slow upstream holds no thread."""
+
+    def __init__(self, http: httpx.AsyncClient, deadline: float = 8, connect_timeout: float = 3.05,
+                 read_timeout: float = 5, max_retries: int = 2, backoff_base: float = 0.2,
+                 backoff_cap: float = 2, hedge: bool = False, hedge_quantile: float = 0.95,
+                 hedge_min_samples: int = 20, rate_limiter: Optional[TokenBucket] = None,
+                 retry_budget: Optional[RetryBudget] = None):
+        super().__init__(None, deadline, connect_timeout, read_timeout, max_retries, backoff_base,
+                         backoff_cap, False, hedge_quantile, hedge_min_samples, rate_limiter, retry_budget)
+        self.http = http
+        self.hedge = hedge
+
+    async def _send(self, url: str, deadline: float) -> httpx.Response:
+        # Waiting for the local budget counts against the deadline too
+        if self.rate_limiter is not None and not await self.rate_limiter.acquire_async(
+                timeout=max(0.0, deadline - time.monotonic())):
+            raise RateLimitedError("local request budget exhausted")
+        timeout = min(self.read_timeout, max(self.MIN_ATTEMPT_TIMEOUT, deadline - time.monotonic()))
+        start = time.monotonic()
+        try:
+            return await self.http.get(url, timeout=httpx.Timeout(timeout,
+                                                                  connect=min(self.connect_timeout, timeout)))
+        finally:
+            self.latency.observe(time.monotonic() - start)
+
+    async def _attempt(self, url: str, deadline: float) -> httpx.Response:
+        if not self.hedge or self.latency.count < self.hedge_min_samples:
+            return await self._send(url, deadline)
+
+        # Hedge: if the first request outlives the recent p95, race a second one
+        primary = asyncio.ensure_future(self._send(url, deadline))
+        done, _ = await asyncio.wait({primary}, timeout=self.latency.quantile(self.hedge_quantile))
+        if done or not self.retry_budget.try_spend():
+            return await primary
+        self._count("hedges")
+        pending = {primary, asyncio.ensure_future(self._send(url, deadline))}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The loser's connection goes back to the pool instead of finishing a read nobody needs
+            for task in pending:
+                task.cancel()
+
+    async def get(self, url: str) -> httpx.Response:
+        host = urlsplit(url).netloc
+        breaker = self._breaker(host)
+        deadline = time.monotonic() + self.deadline
+        self.retry_budget.deposit()
+        self._count("requests")
+        attempt = 0
+
+        while True:
+            blocked = self._blocked_until.get(host, 0) - time.time()
+            if blocked > 0:
+                self._count("short_circuited")
+                raise RateLimitedError(f"{host} rate limited for another {blocked:.1f}s")
+            if not breaker.allow():
+                self._count("short_circuited")
+                raise CircuitOpenError(f"circuit open for {host}")
+
+            if self._attempt_timeout(deadline) is None:
+                breaker.release_probe()
+                self._count("errors")
+                raise httpx.TimeoutException(f"deadline of {self.deadline}s exceeded for {host}")
+            retry_after = None
+            try:
+                response = await self._attempt(url, deadline)
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                error: Exception = e
+            except BaseException:
+                # Local budget, a cancelled client, a bug: nothing learned about the host, so free a half-open probe
+                breaker.release_probe()
+                raise
+            else:
+                outcome, retry_after = self._classify(host, breaker, response.status_code,
+                                                      response.headers.get("Retry-After"))
+                if outcome == "rate_limited":
+                    error = RateLimitedError(f"{host} returned 429")
+                elif outcome == "retry":
+                    error = UpstreamError(f"{response.status_code} from {host}")
+                else:
+                    response.raise_for_status()
+                    return response
+
+            attempt += 1
+            delay = retry_after if retry_after is not None else random.uniform(
+                0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+            if (attempt > self.max_retries or time.monotonic() + delay >= deadline
+                    or not self.retry_budget.try_spend()):
+                self._count("errors")
+                raise error
+            self._count("retries")
+            if retry_after is not None:
+                self._blocked_until.pop(host, None)
+            await asyncio.sleep(delay)
+
+
+async def fetch_pairs(client: AsyncResilientClient, addresses: List[str]) -> Dict[str, List[Dict]]:
+    """dex_client.fetch_pairs with the chunks requested concurrently on the event loop."""
+    unique = list(dict.fromkeys(addresses))
+    size = dex_client.MAX_ADDRESSES_PER_REQUEST
+
+    async def fetch_chunk(chunk: List[str]) -> List[Dict]:
+        response = await client.get(dex_client.tokens_url(chunk))
+        return response.json().get("pairs") or []
+
+    responses = await asyncio.gather(*(fetch_chunk(unique[start:start + size])
+                                       for start in range(0, len(unique), size)))
+    return dex_client.group_pairs(unique, responses)
+
+
+class AsyncDexBatcher:
+    """DexBatcher for coroutines: lookups within `window` seconds share one request."""
+
+    def __init__(self, client: AsyncResilientClient, window: float = 0.02,
+                 max_batch: int = dex_client.MAX_ADDRESSES_PER_REQUEST):
+        self.client = client
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def fetch(self, address: str) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(address, []).append(future)
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if pending:
+            task = asyncio.ensure_future(self._send(pending))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _send(self, pending: Dict[str, List[asyncio.Future]]) -> None:
+        try:
+            pairs = await fetch_pairs(self.client, list(pending))
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                        # Every waiter may have been cancelled; mark the error as seen
+                        future.exception()
+            return
+
+        for address, futures in pending.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(pairs.get(address, []))
+
+
+def create_dex_batcher(http: httpx.AsyncClient) -> AsyncDexBatcher:
+    # Same env knobs and shared request budget as the sync client in dex_client
+    client = AsyncResilientClient(
+        http,
+        deadline=dex_client.REQUEST_TIMEOUT,
+        read_timeout=float(os.environ.get("DEX_READ_TIMEOUT", 5)),
+        max_retries=int(os.environ.get("DEX_MAX_RETRIES", 2)),
+        hedge=os.environ.get("DEX_HEDGE_REQUESTS", "false").lower() == "true",
+        rate_limiter=dex_client.upstream_budget
+    )
+    return AsyncDexBatcher(client, window=float(os.environ.get("DEX_BATCH_WINDOW", 0.02)))
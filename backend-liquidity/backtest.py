@@ -0,0 +1,278 @@
+"""Replay recorded snapshots through the live risk scoring, sentiment and alert engine.
+
+    python backtest.py --root data/snapshots --grid '{"price_change_threshold": [5, 10, 20]}'
+
+Every combination in the grid is scored against each token's recorded
+history (batch_scoring.SNAPSHOT_DTYPE rows written by record_tick). Tokens
+are spread over worker processes. Each recorded tick goes through the
+service's own analyze_token_risk (with realized volatility from a PriceRing
+fed the replayed prices, as monitor_token_tick does) and
+analyze_market_sentiment, under the grid point's THRESHOLDS/ALERT_CONFIG.
+Alerts come from alerts.create_engine, the same windowed rules, cooldowns
+and hysteresis as the service. Market depth across pools is not recorded,
+so risk uses the selected pair's liquidity.
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from alerts import SNAPSHOT_ALERT_KINDS, create_engine
+from batch_scoring import LEGACY_SNAPSHOT_DTYPE, SNAPSHOT_DTYPE
+from timeseries import PriceRing, SeriesStore
+
+# Knobs that are not in THRESHOLDS / ALERT_CONFIG
+EVENT_CONFIG = {
+    "drawdown_pct": 20.0,      # a "large drawdown" is a fall of this much from the running peak
+    "horizon": 6 * 3600.0,     # an alert counts if it precedes a drawdown by at most this long
+    "risk_alert_score": 50,    # risk score at which a token enters the high-risk state
+    "sentiment_shift": 0.3     # fall in analyze_market_sentiment's score, tick over tick, that counts
+}
+
+DEFAULT_GRID = {
+    "price_change_threshold": [5, 10, 20],
+    "liquidity_change_threshold": [10, 20, 40],
+    "volatility_threshold": [10, 20, 40]
+}
+
+def expand_grid(grid: Dict[str, List], thresholds: Dict, alert_config: Dict) -> List[Dict]:
+    """Cartesian product of the grid, each entry routed to thresholds, alert_config or events."""
+    names = list(grid)
+    configs = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        config = {"params": dict(zip(names, values)), "thresholds": dict(thresholds),
+                  "alert_config": dict(alert_config), "events": dict(EVENT_CONFIG)}
+        for name, value in config["params"].items():
+            for section in ("thresholds", "alert_config", "events"):
+                if name in config[section]:
+                    config[section][name] = value
+                    break
+            else:
+                raise ValueError(f"Unknown backtest parameter: {name}")
+        configs.append(config)
+    return configs
+
+
+def drawdown_onsets(timestamps: np.ndarray, prices: np.ndarray, drawdown_pct: float) -> np.ndarray:
+    """Timestamps where the fall from the running peak first crosses drawdown_pct."""
+    peak = np.maximum.accumulate(prices)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown = np.where(peak > 0, (1 - prices / peak) * 100, 0.0)
+    deep = drawdown >= drawdown_pct
+    return timestamps[deep & ~np.concatenate(([False], deep[:-1]))]
+
+
+def replay_alerts(records: np.ndarray, alert_config: Dict) -> Dict[str, np.ndarray]:
+    """Per-tick firing masks for each live alert rule, from a fresh engine fed the recorded ticks."""
+    engine = create_engine(alert_config)
+    kinds = [rule.name for rule in engine.rules] + [f"{name}:{kind}" for name in engine.snapshot_rules
+                                                    for kind in SNAPSHOT_ALERT_KINDS]
+    masks = {kind: np.zeros(len(records), dtype=bool) for kind in kinds}
+    columns = (records[name].tolist() for name in
+               ("timestamp", "price_usd", "liquidity_usd", "volume_h1", "buys_m5", "sells_m5"))
+
+    previous = None
+    for i, (timestamp, price, liquidity, volume, buys, sells) in enumerate(zip(*columns)):
+        # The fields the rules read, shaped like TokenData
+        current = {"base_token": {"symbol": ""}, "price_usd": price, "liquidity": {"usd": liquidity},
+                   "volume": {"h1": volume}, "txns": {"m5": {"buys": buys, "sells": sells}}}
+        for alert in engine.observe("replay", current, previous, now=timestamp):
+            masks[alert["rule"]][i] = True
+        previous = current
+    return masks
+
+
+def snapshot_token_data(record: np.void) -> Dict:
+    """The TokenData fields analyze_token_risk and analyze_market_sentiment read, from one record."""
+    return {
+        "base_token": {"symbol": ""},
+        "price_usd": float(record["price_usd"]),
+        "liquidity": {"usd": float(record["liquidity_usd"])},
+        "market_cap": float(record["market_cap"]),
+        "pair_created_at": float(record["pair_created_at"]),
+        "price_change": {"h1": float(record["change_h1"]), "h6": float(record["change_h6"]),
+                         "h24": float(record["change_h24"])},
+        "volume": {"h1": float(record["volume_h1"])},
+        "txns": {window: {"buys": float(record[f"buys_{window}"]), "sells": float(record[f"sells_{window}"])}
+                 for window in ("m5", "h1", "h6", "h24")}
+    }
+
+
+@contextmanager
+def live_config(agent, thresholds: Dict, alert_config: Dict):
+    """Run the service's scoring functions under one grid point's settings."""
+    saved = dict(agent.THRESHOLDS), dict(agent.ALERT_CONFIG)
+    agent.THRESHOLDS.update(thresholds)
+    agent.ALERT_CONFIG.update(alert_config)
+    try:
+        yield
+    finally:
+        agent.THRESHOLDS.clear()
+        agent.THRESHOLDS.update(saved[0])
+        agent.ALERT_CONFIG.clear()
+        agent.ALERT_CONFIG.update(saved[1])
+
+
+def replay_scores(records: np.ndarray, config: Dict) -> Dict[str, np.ndarray]:
+    """Per-tick risk and sentiment scores from the live analyze_* functions."""
+    import Liquidity_Monitoring_agent as agent
+
+    risk = np.zeros(len(records))
+    sentiment = np.zeros(len(records))
+    history = PriceRing(agent.PRICE_HISTORY_SIZE)
+    previous = None
+    with live_config(agent, config["thresholds"], config["alert_config"]):
+        for i, record in enumerate(records):
+            current = snapshot_token_data(record)
+            timestamp = float(record["timestamp"])
+            history.append(timestamp, current["price_usd"], current["volume"]["h1"])
+            risk[i] = agent.analyze_token_risk(current, previous, history.stats(), now=timestamp)["risk_score"]
+            sentiment[i] = agent.analyze_market_sentiment(current)["score"]
+            previous = current
+    return {"risk_score": risk, "sentiment_score": sentiment}
+
+
+def alert_masks(records: np.ndarray, config: Dict) -> Dict[str, np.ndarray]:
+    """Per-tick firing masks for each alert kind under one configuration."""
+    scores = replay_scores(records, config)
+    events = config["events"]
+
+    # analyze_token_risk: the report's risk score entering the high-risk band
+    high = scores["risk_score"] >= events["risk_alert_score"]
+    # analyze_market_sentiment: the score falling sharply since the previous tick
+    drop = np.concatenate(([0.0], scores["sentiment_score"][:-1] - scores["sentiment_score"][1:]))
+    return {"risk": high & ~np.concatenate(([False], high[:-1])),
+            "sentiment": drop > events["sentiment_shift"],
+            **replay_alerts(records, config["alert_config"])}
+
+
+def evaluate(records: np.ndarray, config: Dict) -> Dict:
+    timestamps = records["timestamp"]
+    horizon = config["events"]["horizon"]
+    masks = alert_masks(records, config)
+    fired = np.zeros(len(records), dtype=bool)
+    for mask in masks.values():
+        fired |= mask
+    alerts = timestamps[fired]
+    events = drawdown_onsets(timestamps, records["price_usd"], config["events"]["drawdown_pct"])
+
+    # Earliest alert inside the horizon before each drawdown gives its lead time
+    lo = np.searchsorted(alerts, events - horizon, side="left")
+    hi = np.searchsorted(alerts, events, side="right")
+    detected = hi > lo
+    leads = events[detected] - alerts[lo[detected]]
+
+    # An alert is a false positive when no drawdown starts within the horizon after it
+    nxt = np.searchsorted(events, alerts, side="left")
+    has_next = nxt < len(events)
+    true_positive = np.zeros(len(alerts), dtype=bool)
+    true_positive[has_next] = events[nxt[has_next]] - alerts[has_next] <= horizon
+
+    return {
+        "snapshots": int(len(records)),
+        "alerts": {kind: int(mask.sum()) for kind, mask in masks.items()},
+        "alert_ticks": int(len(alerts)),
+        "false_positives": int((~true_positive).sum()),
+        "drawdowns": int(len(events)),
+        "detected": int(detected.sum()),
+        "lead_times": leads.tolist()
+    }
+
+
+def open_snapshots(root: Path) -> SeriesStore:
+    return SeriesStore(Path(root), dtype=SNAPSHOT_DTYPE, legacy_dtype=LEGACY_SNAPSHOT_DTYPE)
+
+
+def backtest_token(args: Tuple[str, str, List[Dict]]) -> List[Dict]:
+    root, token_key, configs = args
+    records = open_snapshots(root).read_array(token_key)
+    if len(records) < 2:
+        return []
+    return [evaluate(records, config) for config in configs]
+
+
+def _merge(total: Optional[Dict], result: Dict) -> Dict:
+    if total is None:
+        return {**result, "alerts": dict(result["alerts"]), "lead_times": list(result["lead_times"])}
+    for key in ("snapshots", "alert_ticks", "false_positives", "drawdowns", "detected"):
+        total[key] += result[key]
+    for kind, count in result["alerts"].items():
+        total["alerts"][kind] += count
+    total["lead_times"].extend(result["lead_times"])
+    return total
+
+
+def run_backtest(root: Path, thresholds: Dict, alert_config: Dict, grid: Optional[Dict] = None,
+                 tokens: Optional[List[str]] = None, workers: Optional[int] = None) -> Dict:
+    configs = expand_grid(grid or DEFAULT_GRID, thresholds, alert_config)
+    tokens = tokens or open_snapshots(root).tokens()
+    workers = workers or os.cpu_count() or 1
+    tasks = [(str(root), token_key, configs) for token_key in tokens]
+
+    start = time.perf_counter()
+    totals: List[Optional[Dict]] = [None] * len(configs)
+    if workers == 1:
+        per_token = map(backtest_token, tasks)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        per_token = pool.map(backtest_token, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+    for results in per_token:
+        for i, result in enumerate(results):
+            totals[i] = _merge(totals[i], result)
+    if workers != 1:
+        pool.shutdown()
+    elapsed = time.perf_counter() - start
+
+    rows = []
+    for config, total in zip(configs, totals):
+        if total is None:
+            continue
+        leads = total.pop("lead_times")
+        rows.append({
+            "params": config["params"],
+            **total,
+            "false_positive_rate": total["false_positives"] / total["alert_ticks"] if total["alert_ticks"] else 0.0,
+            "drawdown_hit_rate": total["detected"] / total["drawdowns"] if total["drawdowns"] else 0.0,
+            "lead_time_median_s": float(np.median(leads)) if leads else None,
+            "lead_time_mean_s": float(np.mean(leads)) if leads else None
+        })
+
+    snapshots = rows[0]["snapshots"] if rows else 0
+    return {
+        "tokens": len(tokens),
+        "configs": len(configs),
+        "snapshots": snapshots,
+        "elapsed_s": elapsed,
+        # Each snapshot is scored once per configuration
+        "snapshots_per_second": snapshots * len(configs) / elapsed if elapsed > 0 else 0.0,
+        "results": sorted(rows, key=lambda row: (row["false_positive_rate"], -row["drawdown_hit_rate"]))
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--root", default=str(Path("data") / "snapshots"))
+    parser.add_argument("--grid", help="JSON object of parameter -> list of values, or a path to one")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--tokens", nargs="*", help="token keys to replay (default: all recorded)")
+    args = parser.parse_args()
+
+    # The live constants are the baseline every grid point overrides
+    from Liquidity_Monitoring_agent import ALERT_CONFIG, THRESHOLDS
+
+    grid = None
+    if args.grid:
+        grid = json.loads(Path(args.grid).read_text() if os.path.exists(args.grid) else args.grid)
+    print(json.dumps(run_backtest(Path(args.root), THRESHOLDS, ALERT_CONFIG, grid, args.tokens, args.workers),
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
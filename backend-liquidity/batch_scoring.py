@@ -0,0 +1,180 @@
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Vulnerability bits, one per rule in analyze_token_risk (same order, same weights)
+LOW_LIQUIDITY = 1 << 0
+HIGH_VOLATILITY = 1 << 1
+IMPERMANENT_LOSS = 1 << 2
+UNUSUAL_TX_PATTERN = 1 << 3
+MCAP_BELOW_LIQUIDITY = 1 << 4
+NEW_TOKEN = 1 << 5
+SELL_PRESSURE = 1 << 6
+POSSIBLE_PUMP = 1 << 7
+SUDDEN_PRICE_CHANGE = 1 << 8
+
+VULNERABILITY_NAMES = {
+    LOW_LIQUIDITY: "Low liquidity",
+    HIGH_VOLATILITY: "High volatility",
+    IMPERMANENT_LOSS: "High impermanent loss risk",
+    UNUSUAL_TX_PATTERN: "Unusual transaction pattern",
+    MCAP_BELOW_LIQUIDITY: "Market cap < liquidity",
+    NEW_TOKEN: "New token",
+    SELL_PRESSURE: "High selling pressure",
+    POSSIBLE_PUMP: "Possible pump",
+    SUDDEN_PRICE_CHANGE: "Sudden price change"
+}
+
+RISK_SCORE_CAP = 70
+
+COLUMNS = (
+    "price_usd", "liquidity_usd", "market_cap", "pair_created_at",
+    "change_h1", "change_h6", "change_h24",
+    "buys_h1", "sells_h1", "buys_h6", "sells_h6", "buys_h24", "sells_h24"
+)
+
+# Recorded per tick for replay (backtest.py): the scored columns plus what the alert rules read
+SNAPSHOT_DTYPE = np.dtype([("timestamp", "<f8")] + [(name, "<f8") for name in COLUMNS]
+                          + [("volume_h1", "<f8"), ("buys_m5", "<f8"), ("sells_m5", "<f8")])
+# Snapshots recorded before buys_m5/sells_m5, without a layout.json; SeriesStore migrates them
+LEGACY_SNAPSHOT_DTYPE = np.dtype([("timestamp", "<f8")] + [(name, "<f8") for name in COLUMNS]
+                                 + [("volume_h1", "<f8")])
+
+
+def vulnerability_names(mask: int) -> List[str]:
+    return [name for bit, name in VULNERABILITY_NAMES.items() if mask & bit]
+
+
+class TokenColumns:
+    """Struct-of-arrays view of N tokens holding only the fields the rules read."""
+
+    def __init__(self, **columns: np.ndarray):
+        for name in COLUMNS:
+            setattr(self, name, columns[name])
+        self.size = len(self.price_usd)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @staticmethod
+    def row(t: Dict) -> tuple:
+        """One token's values in COLUMNS order."""
+        change, txns = t["price_change"], t["txns"]
+        return (
+            float(t["price_usd"]), t["liquidity"]["usd"], t["market_cap"], t["pair_created_at"],
+            change["h1"], change["h6"], change["h24"],
+            txns["h1"].get("buys", 0), txns["h1"].get("sells", 0),
+            txns["h6"].get("buys", 0), txns["h6"].get("sells", 0),
+            txns["h24"].get("buys", 0), txns["h24"].get("sells", 0)
+        )
+
+    @classmethod
+    def from_token_data(cls, tokens: Sequence[Dict]) -> "TokenColumns":
+        return cls.from_rows([cls.row(t) for t in tokens])
+
+    @classmethod
+    def from_records(cls, records: np.ndarray) -> "TokenColumns":
+        """Columns over SNAPSHOT_DTYPE records (e.g. a memory-mapped segment)."""
+        return cls(**{name: records[name] for name in COLUMNS})
+
+    @classmethod
+    def from_rows(cls, rows: List[tuple]) -> "TokenColumns":
+        matrix = np.array(rows, dtype=np.float64).reshape(len(rows), len(COLUMNS))
+        return cls(**{name: matrix[:, i] for i, name in enumerate(COLUMNS)})
+
+    @classmethod
+    def from_pairs(cls, pairs: Sequence[Dict]) -> "TokenColumns":
+        """Build columns straight from raw DexScreener pairs, skipping transform_dex_response."""
+        empty: Dict = {}
+        rows = []
+        for p in pairs:
+            change = p.get("priceChange") or empty
+            txns = p.get("txns") or empty
+            h1, h6, h24 = txns.get("h1") or empty, txns.get("h6") or empty, txns.get("h24") or empty
+            rows.append((
+                float(p.get("priceUsd", "0")),
+                float((p.get("liquidity") or empty).get("usd", 0)),
+                float(p.get("marketCap", 0)),
+                p.get("pairCreatedAt", 0),
+                float(change.get("h1", 0)), float(change.get("h6", 0)), float(change.get("h24", 0)),
+                h1.get("buys", 0), h1.get("sells", 0),
+                h6.get("buys", 0), h6.get("sells", 0),
+                h24.get("buys", 0), h24.get("sells", 0)
+            ))
+        return cls.from_rows(rows)
+
+
+def score_risk(columns: TokenColumns, thresholds: Dict, alert_config: Dict,
+               previous_price: Optional[np.ndarray] = None,
+               realized_volatility: Optional[np.ndarray] = None,
+               now: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """Vectorized analyze_token_risk. Returns risk_score and vulnerability bitmask arrays.
+
+    previous_price / realized_volatility use NaN for tokens without that input,
+    mirroring the scalar path's Optional arguments. `now` may also be an array
+    of per-row timestamps when replaying history.
+    """
+    now = time.time() if now is None else now
+    n = len(columns)
+    score = np.zeros(n, dtype=np.int64)
+    mask = np.zeros(n, dtype=np.int64)
+
+    def apply(rule: np.ndarray, bit: int, weight: int) -> None:
+        score[rule] += weight
+        mask[rule] |= bit
+
+    apply(columns.liquidity_usd < thresholds["liquidity_min"], LOW_LIQUIDITY, 30)
+
+    volatility = np.abs(columns.change_h6)
+    if realized_volatility is not None:
+        volatility = np.fmax(volatility, realized_volatility)
+    high_volatility = volatility > thresholds["volatility_threshold"]
+    apply(high_volatility, HIGH_VOLATILITY, 20)
+    apply(high_volatility & (volatility > thresholds["impermanent_loss_risk"]), IMPERMANENT_LOSS, 10)
+
+    tx_h6 = columns.buys_h6 + columns.sells_h6
+    tx_h1 = columns.buys_h1 + columns.sells_h1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tx_ratio = np.where(tx_h1 > 0, tx_h6 / tx_h1, 0.0)
+    apply((tx_h1 > 0) & (tx_ratio > thresholds["abnormal_tx_ratio"]), UNUSUAL_TX_PATTERN, 20)
+
+    apply((columns.market_cap > 0) & (columns.market_cap < columns.liquidity_usd), MCAP_BELOW_LIQUIDITY, 20)
+
+    token_age = (now - columns.pair_created_at) / 86400
+    apply(token_age < thresholds["new_token_risk_days"], NEW_TOKEN, 15)
+
+    total_h24 = columns.buys_h24 + columns.sells_h24
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sell_pct = np.where(total_h24 > 0, (columns.sells_h24 / total_h24) * 100, 0.0)
+    apply((total_h24 > 10) & (sell_pct > thresholds["quick_dump_risk"]), SELL_PRESSURE, 25)
+
+    apply(columns.change_h24 > thresholds["pump_warning_threshold"], POSSIBLE_PUMP, 5)
+
+    if previous_price is not None:
+        valid = previous_price > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            price_diff = np.where(valid, np.abs(columns.price_usd - previous_price) / previous_price * 100, 0.0)
+        apply(valid & (price_diff > alert_config["price_change_threshold"]), SUDDEN_PRICE_CHANGE, 10)
+
+    return {"risk_score": np.minimum(score, RISK_SCORE_CAP), "vulnerabilities": mask}
+
+
+def score_sentiment(columns: TokenColumns) -> Dict[str, np.ndarray]:
+    """Vectorized analyze_market_sentiment score and breakdown."""
+    total = columns.buys_h24 + columns.sells_h24
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tx_sentiment = np.where(total > 0, (columns.buys_h24 - columns.sells_h24) / total, 0.0)
+
+    price_1h = columns.change_h1 / 100
+    price_24h = columns.change_h24 / 100
+    price_sentiment = np.clip((price_1h * 0.6) + (price_24h * 0.4), -1.0, 1.0)
+    social_sentiment = (price_1h * 0.3) + (price_24h * 0.7)
+    overall = (tx_sentiment * 0.4) + (price_sentiment * 0.4) + (social_sentiment * 0.2)
+
+    return {
+        "score": overall,
+        "social": social_sentiment,
+        "transactions": tx_sentiment,
+        "price_action": price_sentiment
+    }
@@ -0,0 +1,467 @@
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+
+import requests
+
+import batch_scoring
+import dex_client
+from ratelimit import TokenBucket
+
+
+# ---------- Stub Upstream ----------
+def make_pair(address: str, chain_id: str = "solana", index: int = 0) -> Dict:
+    return {
+        "chainId": chain_id,
+        "dexId": "raydium",
+        "url": f"https://dexscreener.com/{chain_id}/pair{index}{address}",
+        "pairAddress": f"pair{index}{address}",
+        "labels": [],
+        "baseToken": {"address": address, "name": f"Token {address}", "symbol": address[:6].upper()},
+        "quoteToken": {"address": "So11111111111111111111111111111111111111112", "name": "Wrapped SOL", "symbol": "SOL"},
+        "priceNative": "0.0012",
+        "priceUsd": "0.1834",
+        "txns": {
+            "m5": {"buys": 12, "sells": 9},
+            "h1": {"buys": 140, "sells": 122},
+            "h6": {"buys": 810, "sells": 790},
+            "h24": {"buys": 3100, "sells": 2950}
+        },
+        "volume": {"h24": 1250000.5, "h6": 310000.2, "h1": 52000.1, "m5": 4100.7},
+        "priceChange": {"m5": 0.4, "h1": -1.2, "h6": 3.5, "h24": 12.8},
+        "liquidity": {"usd": 480000.0, "base": 1300000.0, "quote": 1200.0},
+        "fdv": 18340000,
+        "marketCap": 18340000,
+        "pairCreatedAt": 1700000000000,
+        "info": {"imageUrl": "https://example.com/logo.png", "websites": [], "socials": []}
+    }
+
+
+def random_pair(rng: random.Random, index: int) -> Dict:
+    """A pair with randomized metrics so every risk rule fires for some tokens."""
+    pair = make_pair(f"Rnd{index:07d}", rng.choice(["solana", "ethereum", "bsc"]), index)
+    pair["priceUsd"] = f"{rng.uniform(0.0001, 50):.6f}"
+    pair["liquidity"]["usd"] = rng.choice([rng.uniform(0, 100000), rng.uniform(100000, 5e6)])
+    pair["marketCap"] = rng.choice([0, rng.uniform(1e4, 1e8)])
+    pair["pairCreatedAt"] = int(time.time() - rng.uniform(0, 30) * 86400)
+    pair["priceChange"] = {w: rng.uniform(-80, 120) for w in ("m5", "h1", "h6", "h24")}
+    pair["txns"] = {w: {"buys": rng.randint(0, 500), "sells": rng.randint(0, 500)}
+                    for w in ("m5", "h1", "h6", "h24")}
+    return pair
+
+
+class StubDexScreener:
+    """Local stand-in for the DexScreener tokens endpoint with fixed latency."""
+
+    def __init__(self, latency: float = 0.02, pairs_per_token: int = 2):
+        self.latency = latency
+        self.pairs_per_token = pairs_per_token
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                stub.requests += 1
+                time.sleep(stub.latency)
+                addresses = self.path.rsplit("/", 1)[-1].split(",")
+                chains = ["ethereum", "solana", "bsc", "base"]
+                pairs = [make_pair(address, chains[i % len(chains)], i)
+                         for address in addresses for i in range(stub.pairs_per_token)]
+                body = json.dumps({"schemaVersion": "1.0.0", "pairs": pairs}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubAnthropic:
+    """Local stand-in for the Messages API (point ANTHROPIC_BASE_URL at `url`)."""
+
+    def __init__(self, latency: float = 1.0):
+        self.latency = latency
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                stub.requests += 1
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep(stub.latency)
+                body = json.dumps({
+                    "id": f"msg_stub{stub.requests}",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": "stub",
+                    "content": [{"type": "text", "text": "Liquidity is stable\nBuy pressure is rising\nWatch the h6 move"}],
+                    "stop_reason": "end_turn",
+                    "stop_sequence": None,
+                    "usage": {"input_tokens": 100, "output_tokens": 20}
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    __enter__ = StubDexScreener.__enter__
+    __exit__ = StubDexScreener.__exit__
+
+
+# ---------- Helpers ----------
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+
+def report(name: str, tokens: int, elapsed: float, latencies: List[float], upstream: int) -> None:
+    print(f"{name:<22} tokens={tokens:<6} upstream_reqs={upstream:<6} "
+          f"tokens/s={tokens / elapsed:>9.1f} p50={statistics.median(latencies) * 1000:>7.1f}ms "
+          f"p99={percentile(latencies, 0.99) * 1000:>7.1f}ms")
+
+
+def timed_concurrent(fn: Callable[[str], object], addresses: List[str], workers: int) -> List[float]:
+    def run(address: str) -> float:
+        start = time.perf_counter()
+        fn(address)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, addresses))
+
+
+# ---------- Benchmarks ----------
+def bench_dex_fetch(token_counts: List[int], workers: int, latency: float) -> None:
+    with StubDexScreener(latency=latency) as stub:
+        dex_client.DEXSCREENER_API = stub.url
+        # Measure the client, not the production request budget
+        dex_client.client.rate_limiter = TokenBucket(1e9, 1e9)
+        for count in token_counts:
+            addresses = [f"Tok{i:06d}pump" for i in range(count)]
+
+            def per_token_get(address: str) -> None:
+                requests.get(f"{stub.url}/latest/dex/tokens/{address}", timeout=10).json()
+
+            def per_token_session(address: str) -> None:
+                dex_client.session.get(f"{stub.url}/latest/dex/tokens/{address}", timeout=10).json()
+
+            cases = [
+                ("requests.get/token", per_token_get),
+                ("session/token", per_token_session),
+                ("coalesced batcher", dex_client.batcher.fetch),
+            ]
+            for name, fn in cases:
+                stub.requests = 0
+                start = time.perf_counter()
+                latencies = timed_concurrent(fn, addresses, workers)
+                report(name, count, time.perf_counter() - start, latencies, stub.requests)
+
+            # Explicit batch API: one call for the whole universe
+            stub.requests = 0
+            start = time.perf_counter()
+            dex_client.fetch_pairs(addresses)
+            elapsed = time.perf_counter() - start
+            report("fetch_pairs batch", count, elapsed, [elapsed], stub.requests)
+            print()
+
+
+def bench_scoring(pair_counts: List[int]) -> None:
+    import Liquidity_Monitoring_agent as agent
+
+    rng = random.Random(7)
+    for count in pair_counts:
+        pairs = [random_pair(rng, i) for i in range(count)]
+
+        start = time.perf_counter()
+        tokens = [agent.transform_dex_response(pair) for pair in pairs]
+        risks = [agent.analyze_token_risk(token) for token in tokens]
+        sentiments = [agent.analyze_market_sentiment(token) for token in tokens]
+        scalar = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = agent.score_pairs_batch(pairs)
+        vectorized = time.perf_counter() - start
+
+        # Parity with the scalar path: scores, triggered rules and sentiment
+        for i, (risk, sentiment) in enumerate(zip(risks, sentiments)):
+            assert risk["risk_score"] == batch["risk_score"][i], (i, risk, batch["risk_score"][i])
+            names = batch_scoring.vulnerability_names(int(batch["vulnerabilities"][i]))
+            assert len(names) == len(risk["vulnerabilities"]), (i, names, risk["vulnerabilities"])
+            assert all(v.startswith(n) for n, v in zip(names, risk["vulnerabilities"])), (i, names)
+            assert sentiment["score"] == batch["sentiment_score"][i], (i, sentiment, batch["sentiment_score"][i])
+
+        print(f"pairs={count:<8} scalar={count / scalar:>12.0f} pairs/s  "
+              f"batch={count / vectorized:>12.0f} pairs/s  speedup={scalar / vectorized:>6.1f}x  parity=ok")
+
+
+def bench_memory(pair_count: int) -> None:
+    import tracemalloc
+    import Liquidity_Monitoring_agent as agent
+    from token_data import CompactTokenData
+
+    rng = random.Random(11)
+    pairs = [random_pair(rng, i) for i in range(pair_count)]
+
+    # Shapes must agree before sizes mean anything
+    for pair in pairs[:1000]:
+        compact, eager = CompactTokenData.from_pair(pair).to_dict(), agent.transform_dex_response(pair)
+        assert compact.keys() == eager.keys()
+        assert float(compact["price_usd"]) == float(eager["price_usd"])
+        assert all(compact[k] == eager[k] for k in eager if k not in ("price_usd", "price_native"))
+
+    for name, build in (("dict (transform_dex_response)", agent.transform_dex_response),
+                        ("CompactTokenData", CompactTokenData.from_pair)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        cache = {f"{p['chainId']}-{p['baseToken']['address']}": build(p) for p in pairs}
+        elapsed = time.perf_counter() - start
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<30} pairs={len(cache):<8} bytes/pair={size / len(cache):>8.0f} "
+              f"build={len(cache) / elapsed:>9.0f} pairs/s")
+        del cache
+
+
+def write_synthetic_snapshots(root, token_count: int, snapshots: int, seed: int = 3) -> None:
+    """Random-walk histories with occasional crashes, laid out like snapshot_store segments."""
+    import json
+    from pathlib import Path
+
+    import numpy as np
+
+    from timeseries import LAYOUT_FILE
+
+    rng = np.random.default_rng(seed)
+    for t in range(token_count):
+        records = np.zeros(snapshots, dtype=batch_scoring.SNAPSHOT_DTYPE)
+        records["timestamp"] = 1.7e9 + np.arange(snapshots) * 20.0
+        shocks = rng.normal(0, 0.01, snapshots) - (rng.random(snapshots) < 0.001) * rng.uniform(0.1, 0.4, snapshots)
+        records["price_usd"] = np.exp(np.cumsum(shocks))
+        records["liquidity_usd"] = rng.uniform(5e4, 5e6) * np.exp(np.cumsum(rng.normal(0, 0.01, snapshots)))
+        records["market_cap"] = records["liquidity_usd"] * rng.uniform(0.5, 20)
+        records["pair_created_at"] = 1.7e9 - rng.uniform(0, 60) * 86400
+        for window, scale in (("h1", 1), ("h6", 2.5), ("h24", 5)):
+            records[f"change_{window}"] = rng.normal(0, 8 * scale, snapshots)
+            records[f"buys_{window}"] = rng.poisson(50 * scale, snapshots)
+            records[f"sells_{window}"] = rng.poisson(50 * scale, snapshots)
+        records["volume_h1"] = rng.lognormal(10, 1, snapshots)
+        records["buys_m5"] = rng.poisson(5, snapshots)
+        records["sells_m5"] = rng.poisson(5, snapshots)
+        directory = Path(root) / f"solana-Syn{t:05d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        records.tofile(directory / "seg-00000000.bin")
+        (directory / LAYOUT_FILE).write_text(json.dumps(records.dtype.descr))
+
+
+def bench_backtest(token_count: int, snapshots: int, workers: List[int]) -> None:
+    import os
+    import tempfile
+
+    import Liquidity_Monitoring_agent as agent
+    from backtest import run_backtest
+
+    with tempfile.TemporaryDirectory() as root:
+        write_synthetic_snapshots(root, token_count, snapshots)
+        for count in workers:
+            result = run_backtest(root, agent.THRESHOLDS, agent.ALERT_CONFIG, workers=count)
+            # Ticks are recorded every ~20s, so this is how much faster than real time one config replays
+            realtime = result["snapshots_per_second"] * 20 / token_count
+            print(f"workers={count:<3} tokens={token_count} snapshots={result['snapshots']} "
+                  f"configs={result['configs']} elapsed={result['elapsed_s']:.2f}s "
+                  f"throughput={result['snapshots_per_second']:>12.0f} snapshots/s "
+                  f"(~{realtime:,.0f}x real time per token)")
+        best = result["results"][0]
+        print(f"lowest FP rate: {best['params']} fp={best['false_positive_rate']:.2f} "
+              f"hit={best['drawdown_hit_rate']:.2f} lead_median={best['lead_time_median_s']}s (cpus={os.cpu_count()})")
+
+
+def bench_serving(server: str, total: int, concurrency: int, dex_latency: float, llm_latency: float) -> None:
+    """Load-test one server process (asgi or flask) on slow stub upstreams.
+
+    Every request asks for a distinct token so none is served from a cache and
+    each one waits on both DexScreener and the LLM.
+    """
+    import asyncio
+    import os
+    import socket
+    import subprocess
+    import sys
+
+    # Stub servers are thread-per-request; let pending connections queue
+    ThreadingHTTPServer.request_queue_size = 4096
+    with StubDexScreener(latency=dex_latency) as dex, StubAnthropic(latency=llm_latency) as llm:
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        env = {
+            **os.environ,
+            "PORT": str(port),
+            "DEXSCREENER_API": dex.url,
+            "ANTHROPIC_BASE_URL": llm.url,
+            "CLAUDE_API_KEY": "stub",
+            # Measure serving, not the production upstream budgets
+            "DEX_REQUESTS_PER_MINUTE": "1e9",
+            "DEX_REQUEST_BURST": "1e9",
+            "LLM_CALLS_PER_MINUTE": "1e9",
+            "LLM_BURST": "1e9",
+            "CHECKPOINT": "0"
+        }
+        if server == "asgi":
+            command = [sys.executable, "-m", "uvicorn", "asgi:app", "--port", str(port),
+                       "--log-level", "warning", "--no-access-log"]
+        else:
+            command = [sys.executable, "Liquidity_Monitoring_agent.py"]
+        process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL)
+
+        def threads() -> int:
+            try:
+                with open(f"/proc/{process.pid}/status") as f:
+                    return next(int(line.split()[1]) for line in f if line.startswith("Threads:"))
+            except OSError:
+                return 0
+
+        async def get(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                      path: str) -> Tuple[int, bytes, bool]:
+            # Bare HTTP/1.1: an httpx client pool saturates one CPU long before the server does
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode())
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.lower().split(b"\r\n")
+            status = int(lines[0].split(b" ", 2)[1])
+            headers = dict(line.split(b":", 1) for line in lines[1:] if b":" in line)
+            keep_alive = lines[0].startswith(b"http/1.1") and headers.get(b"connection", b"").strip() != b"close"
+            if b"content-length" in headers:
+                body = await reader.readexactly(int(headers[b"content-length"]))
+            else:
+                body, keep_alive = await reader.read(), False
+            return status, body, keep_alive
+
+        async def run() -> None:
+            for _ in range(100):
+                try:
+                    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                    writer.close()
+                    break
+                except OSError:
+                    await asyncio.sleep(0.1)
+
+            latencies: List[float] = []
+            errors = 0
+            peak = [threads()]
+            queue = iter(range(total))
+
+            async def user() -> None:
+                nonlocal errors
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                for i in queue:
+                    start = time.perf_counter()
+                    try:
+                        status, body, keep_alive = await asyncio.wait_for(get(
+                            reader, writer, f"/get_token?chain_id=solana&token_address=Load{i:07d}"), 60)
+                    except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                        print(f"request {i} failed: {e!r}")
+                        errors += 1
+                        keep_alive = False
+                    else:
+                        latencies.append(time.perf_counter() - start)
+                        if status != 200 or b"Failed" in body:
+                            errors += 1
+                    if not keep_alive:
+                        writer.close()
+                        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.close()
+
+            async def sample() -> None:
+                while True:
+                    peak[0] = max(peak[0], threads())
+                    await asyncio.sleep(0.05)
+
+            sampler = asyncio.ensure_future(sample())
+            start = time.perf_counter()
+            await asyncio.gather(*(user() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+            sampler.cancel()
+            print(f"server={server:<6} requests={total} concurrency={concurrency} errors={errors} "
+                  f"req/s={total / elapsed:>7.1f} p50={statistics.median(latencies) * 1000:>7.0f}ms "
+                  f"p99={percentile(latencies, 0.99) * 1000:>7.0f}ms peak_threads={peak[0]} "
+                  f"upstream: dex={dex.requests} llm={llm.requests}")
+
+        try:
+            asyncio.run(run())
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Liquidity agent benchmarks against local stubs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    dex = commands.add_parser("dex", help="per-token vs batched DexScreener fetching")
+    dex.add_argument("--tokens", type=int, nargs="+", default=[10, 100, 1000])
+    dex.add_argument("--workers", type=int, default=16)
+    dex.add_argument("--latency", type=float, default=0.02, help="stub upstream latency in seconds")
+
+    scoring = commands.add_parser("scoring", help="scalar vs vectorized risk/sentiment scoring")
+    scoring.add_argument("--pairs", type=int, nargs="+", default=[1000, 10000, 50000])
+
+    memory = commands.add_parser("memory", help="bytes per tracked pair in data_cache")
+    memory.add_argument("--pairs", type=int, default=100000)
+
+    backtest = commands.add_parser("backtest", help="threshold-grid replay throughput over synthetic history")
+    backtest.add_argument("--tokens", type=int, default=16)
+    backtest.add_argument("--snapshots", type=int, default=2000)
+    backtest.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+
+    serving = commands.add_parser("serving", help="concurrent /get_token load on slow stub upstreams")
+    serving.add_argument("--server", choices=["asgi", "flask"], nargs="+", default=["asgi", "flask"])
+    serving.add_argument("--requests", type=int, default=2000)
+    serving.add_argument("--concurrency", type=int, default=500)
+    serving.add_argument("--dex-latency", type=float, default=0.3)
+    serving.add_argument("--llm-latency", type=float, default=1.0)
+
+    args = parser.parse_args()
+    if args.command == "dex":
+        bench_dex_fetch(args.tokens, args.workers, args.latency)
+    elif args.command == "scoring":
+        bench_scoring(args.pairs)
+    elif args.command == "memory":
+        bench_memory(args.pairs)
+    elif args.command == "backtest":
+        bench_backtest(args.tokens, args.snapshots, args.workers)
+    elif args.command == "serving":
+        for server in args.server:
+            bench_serving(server, args.requests, args.concurrency, args.dex_latency, args.llm_latency)
@@ -0,0 +1,227 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after being set."""
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_entry(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        """Return (age_seconds, value) without applying the TTL, or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            stored_at, value = entry
+            return time.time() - stored_at, value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self.get_entry(key)
+        if entry is None or entry[0] > self.ttl:
+            return default
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one execution.
+
+    The first caller runs `fn`; callers arriving while it is in flight wait
+    for and share its result (or its exception).
+    """
+
+    class _Call:
+        __slots__ = ("done", "value", "error")
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.value: Any = None
+            self.error: Optional[BaseException] = None
+
+    def __init__(self):
+        self._calls: Dict[Hashable, "SingleFlight._Call"] = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn once per key at a time. Returns (value, shared)."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = SingleFlight._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+
+class ResponseCache:
+    """Short-TTL cache with single-flight fills and stale-while-revalidate.
+
+    Fresh entries (age <= ttl) are served directly. Stale entries (age <=
+    ttl + stale_ttl) are served immediately while one background refresh runs.
+    Misses are computed once no matter how many callers arrive concurrently.
+    `None` results are shared with concurrent callers but not cached.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.entries = TTLCache(ttl + stale_ttl, max_entries)
+        self.flights = SingleFlight()
+
+    def _fill(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        value = compute()
+        if value is not None:
+            self.entries.set(key, value)
+        return value
+
+    def _revalidate(self, key: Hashable, compute: Callable[[], Any]) -> None:
+        try:
+            self.flights.do(key, lambda: self._fill(key, compute))
+        except Exception as e:
+            print(f"Background refresh failed for {key}: {e}")
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Tuple[Any, str]:
+        """Return (value, status) where status is HIT, STALE, SHARED or MISS."""
+        entry = self.entries.get_entry(key)
+        if entry is not None:
+            age, value = entry
+            if age <= self.ttl:
+                return value, "HIT"
+            if age <= self.ttl + self.stale_ttl:
+                if not self.flights.in_flight(key):
+                    threading.Thread(target=self._revalidate, args=(key, compute), daemon=True).start()
+                return value, "STALE"
+
+        value, shared = self.flights.do(key, lambda: self._fill(key, compute))
+        return value, "SHARED" if shared else "MISS"
+
+    def invalidate(self, key: Hashable) -> None:
+        self.entries.pop(key)
+
+
+# ---------- Event-loop variants ----------
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop: followers await the leader's future."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, "asyncio.Future"] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        call = self._calls.get(key)
+        if call is not None:
+            # shield: a cancelled follower must not cancel the leader's result
+            return await asyncio.shield(call), True
+
+        call = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await fn()
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as e:
+            call.set_exception(e)
+            # Retrieve it so an unawaited future does not log "exception never retrieved"
+            call.exception()
+            raise
+        else:
+            call.set_result(value)
+            return value, False
+        finally:
+            del self._calls[key]
+
+
+class AsyncResponseCache:
+    """ResponseCache for coroutines. Pass the sync cache's `entries` to share
+    stored values with it (the TTLCache is thread-safe)."""
+
+    def __init__(self, ttl: float, stale_ttl: float = 0, max_entries: int = 1024,
+                 entries: Optional[TTLCache] = None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.entries = entries if entries is not None else TTLCache(ttl + stale_ttl, max_entries)
+        self.flights = AsyncSingleFlight()
+        self._background: Set["asyncio.Task"] = set()
+
+    async def _fill(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        value = await compute()
+        if value is not None:
+            self.entries.set(key, value)
+        return value
+
+    async def _revalidate(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            await self.flights.do(key, lambda: self._fill(key, compute))
+        except Exception as e:
+            print(f"Background refresh failed for {key}: {e}")
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        """Return (value, status) where status is HIT, STALE, SHARED or MISS."""
+        entry = self.entries.get_entry(key)
+        if entry is not None:
+            age, value = entry
+            if age <= self.ttl:
+                return value, "HIT"
+            if age <= self.ttl + self.stale_ttl:
+                if not self.flights.in_flight(key):
+                    # Keep a reference so the task is not garbage collected mid-flight
+                    task = asyncio.ensure_future(self._revalidate(key, compute))
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
+                return value, "STALE"
+
+        value, shared = await self.flights.do(key, lambda: self._fill(key, compute))
+        return value, "SHARED" if shared else "MISS"
+
+    def invalidate(self, key: Hashable) -> None:
+        self.entries.pop(key)
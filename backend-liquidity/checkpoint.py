@@ -0,0 +1,106 @@
+import io
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+MAGIC = b"LMCK"
+VERSION = 1
+
+
+class _PlainUnpickler(pickle.Unpickler):
+    """Checkpoints hold only builtins (dicts, lists, tuples, str, bytes, numbers);
+    refusing globals means a tampered file cannot execute code on load."""
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"checkpoint may not reference {module}.{name}")
+
+
+def dumps(value: Any) -> bytes:
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads(data: bytes) -> Any:
+    """Inverse of dumps() for plain builtin values only (also used by shared_cache)."""
+    return _PlainUnpickler(io.BytesIO(data)).load()
+
+
+def save_checkpoint(path: Path, state: Dict) -> int:
+    """Atomically write `state` as a pickled checkpoint; returns its size in bytes.
+
+    Price arrays are raw float64 bytes, which barely compress, so no compression pass.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = MAGIC + bytes([VERSION]) + dumps(state)
+    # Per process: every gunicorn worker checkpoints to the same path
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(payload)
+
+
+def load_checkpoint(path: Path) -> Optional[Dict]:
+    try:
+        with open(path, "rb") as f:
+            payload = f.read()
+    except FileNotFoundError:
+        return None
+    if payload[:4] != MAGIC or payload[4:5] != bytes([VERSION]):
+        print(f"Ignoring checkpoint {path}: unknown format")
+        return None
+    return loads(payload[5:])
+
+
+class Checkpointer:
+    """Snapshots in-memory state to disk every `interval` seconds on a daemon thread."""
+
+    def __init__(self, path: Path, collect: Callable[[], Dict], interval: float = 60):
+        self.path = Path(path)
+        self.collect = collect
+        self.interval = interval
+        self.saves = 0
+        self.last_saved: Optional[float] = None
+        self.last_bytes = 0
+        self.last_duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def save(self) -> None:
+        start = time.perf_counter()
+        self.last_bytes = save_checkpoint(self.path, self.collect())
+        self.last_duration = time.perf_counter() - start
+        self.last_saved = time.time()
+        self.saves += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.save()
+            except Exception as e:
+                print(f"Checkpoint error: {e}")
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="checkpoint", daemon=True)
+            self._thread.start()
+
+    def stop(self, save: bool = True) -> None:
+        self._stop.set()
+        if save:
+            self.save()
+
+    def stats(self) -> Dict:
+        return {
+            "path": str(self.path),
+            "saves": self.saves,
+            "last_saved": self.last_saved,
+            "bytes": self.last_bytes,
+            "duration_ms": self.last_duration * 1000
+        }
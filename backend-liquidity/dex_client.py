@@ -0,0 +1,146 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from pairs import address_key
+from ratelimit import TokenBucket
+from resilience import ResilientClient
+
+DEXSCREENER_API = os.environ.get("DEXSCREENER_API", "https://api.dexscreener.com")
+# DexScreener accepts up to 30 comma-separated addresses per tokens request
+MAX_ADDRESSES_PER_REQUEST = 30
+# Upper bound on one logical request, retries and hedges included
+REQUEST_TIMEOUT = float(os.environ.get("DEX_REQUEST_DEADLINE", 8))
+
+
+def create_session(pool_size: int = 32) -> requests.Session:
+    http = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    http.mount("https://", adapter)
+    http.mount("http://", adapter)
+    http.headers.update({"Accept": "application/json"})
+    return http
+
+
+# One pooled session for the whole process so connections are kept alive
+session = create_session(int(os.environ.get("DEX_POOL_SIZE", 32)))
+# Global budget on DexScreener requests (documented limit: 300/min on the tokens endpoint)
+upstream_budget = TokenBucket(float(os.environ.get("DEX_REQUESTS_PER_MINUTE", 300)) / 60,
+                              float(os.environ.get("DEX_REQUEST_BURST", 30)))
+# Breakers, retry budget, Retry-After and optional hedging around the shared session
+client = ResilientClient(
+    session,
+    deadline=REQUEST_TIMEOUT,
+    read_timeout=float(os.environ.get("DEX_READ_TIMEOUT", 5)),
+    max_retries=int(os.environ.get("DEX_MAX_RETRIES", 2)),
+    hedge=os.environ.get("DEX_HEDGE_REQUESTS", "false").lower() == "true",
+    rate_limiter=upstream_budget
+)
+# Chunks of a large batch are fetched in parallel over the shared session
+_chunk_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("DEX_BATCH_PARALLELISM", 8)),
+                                 thread_name_prefix="dex-batch")
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def tokens_url(chunk: List[str]) -> str:
+    return f"{DEXSCREENER_API}/latest/dex/tokens/{','.join(chunk)}"
+
+
+def group_pairs(unique: List[str], responses: Iterable[List[Dict]]) -> Dict[str, List[Dict]]:
+    """Assign each returned pair to the requested address that is its base token.
+
+    Upstream also returns pairs where a requested token is only the quote;
+    their price and symbol belong to the other token, so they are dropped.
+    """
+    result: Dict[str, List[Dict]] = {address: [] for address in unique}
+    by_key = {address_key(address): address for address in unique}
+    for pairs in responses:
+        for pair in pairs:
+            address = by_key.get(address_key((pair.get("baseToken") or {}).get("address", "")))
+            if address:
+                result[address].append(pair)
+    return result
+
+
+def fetch_pairs(addresses: List[str]) -> Dict[str, List[Dict]]:
+    """Fetch pairs for many token addresses with comma-joined requests.
+
+    Returns every pair with each requested address as the base token, in upstream order,
+    so callers can apply the same chain selection the single-token path uses.
+    """
+    unique = list(dict.fromkeys(addresses))
+
+    def fetch_chunk(chunk: List[str]) -> List[Dict]:
+        return client.get(tokens_url(chunk)).json().get("pairs") or []
+
+    chunks = list(_chunks(unique, MAX_ADDRESSES_PER_REQUEST))
+    if len(chunks) == 1:
+        responses = [fetch_chunk(chunks[0])]
+    else:
+        responses = list(_chunk_pool.map(fetch_chunk, chunks))
+    return group_pairs(unique, responses)
+
+
+class DexBatcher:
+    """Coalesces concurrent single-address lookups into batched requests.
+
+    Callers block on fetch(); lookups arriving within `window` seconds of each
+    other share one comma-joined request, and a full batch is sent immediately.
+    """
+
+    def __init__(self, window: float = 0.02, max_batch: int = MAX_ADDRESSES_PER_REQUEST):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[str, List[Future]] = {}
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def submit(self, address: str) -> Future:
+        future: Future = Future()
+        flush_now = False
+        with self._lock:
+            self._pending.setdefault(address, []).append(future)
+            if len(self._pending) >= self.max_batch:
+                flush_now = True
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self.flush()
+        return future
+
+    def fetch(self, address: str, timeout: float = REQUEST_TIMEOUT) -> List[Dict]:
+        return self.submit(address).result(timeout=timeout + self.window + 1)
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return
+
+        try:
+            pairs = fetch_pairs(list(pending))
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+
+        for address, futures in pending.items():
+            for future in futures:
+                future.set_result(pairs.get(address, []))
+
+
+batcher = DexBatcher(window=float(os.environ.get("DEX_BATCH_WINDOW", 0.02)))
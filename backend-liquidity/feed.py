@@ -0,0 +1,146 @@
+import itertools
+import json
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from alerts import Alert, AlertSink
+
+
+class FeedEvent:
+    __slots__ = ("id", "event", "topic", "data")
+
+    def __init__(self, id: int, event: str, topic: str, data: Dict):
+        self.id = id
+        self.event = event
+        self.topic = topic
+        self.data = data
+
+    def to_sse(self) -> str:
+        return f"id: {self.id}\nevent: {self.event}\ndata: {json.dumps(self.data)}\n\n"
+
+
+class Subscription:
+    """Bounded per-subscriber buffer.
+
+    Conflatable events (per-tick reports) replace an undelivered event of the
+    same kind for the same topic, so a slow reader gets the latest state rather
+    than a backlog; that is counted in `conflated` and loses nothing the reader
+    needs. When the buffer is still full the oldest event is dropped; a
+    subscriber that has lost more than `max_dropped` events is disconnected.
+    """
+
+    def __init__(self, topics: Optional[Set[str]], events: Optional[Set[str]],
+                 buffer: int = 100, max_dropped: int = 1000):
+        self.topics = topics
+        self.events = events
+        self.buffer = buffer
+        self.max_dropped = max_dropped
+        self.dropped = 0
+        self.conflated = 0
+        self.delivered = 0
+        self.closed = False
+        self._queue: Deque[FeedEvent] = deque()
+        self._pending: Dict[Tuple[str, str], FeedEvent] = {}
+        self._cond = threading.Condition()
+
+    def wants(self, event: FeedEvent) -> bool:
+        return ((self.topics is None or event.topic in self.topics)
+                and (self.events is None or event.event in self.events))
+
+    def offer(self, event: FeedEvent, conflate: bool) -> None:
+        with self._cond:
+            if self.closed:
+                return
+            key = (event.event, event.topic)
+            if conflate and key in self._pending:
+                queued = self._pending[key]
+                queued.id, queued.data = event.id, event.data
+                self.conflated += 1
+            else:
+                if len(self._queue) >= self.buffer:
+                    oldest = self._queue.popleft()
+                    self._pending.pop((oldest.event, oldest.topic), None)
+                    self.dropped += 1
+                # Copy so in-place conflation never touches other subscribers' events
+                queued = FeedEvent(event.id, event.event, event.topic, event.data)
+                self._queue.append(queued)
+                if conflate:
+                    self._pending[key] = queued
+            if self.dropped > self.max_dropped:
+                self.closed = True
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> List[FeedEvent]:
+        """Wait for events and return everything buffered (possibly empty on timeout)."""
+        with self._cond:
+            if not self._queue and not self.closed:
+                self._cond.wait(timeout)
+            events = list(self._queue)
+            self._queue.clear()
+            self._pending.clear()
+            self.delivered += len(events)
+            return events
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+
+class FeedHub:
+    """Publishes monitoring reports and alerts to in-process subscribers by topic (token key)."""
+
+    def __init__(self, buffer: int = 100, max_dropped: int = 1000):
+        self.buffer = buffer
+        self.max_dropped = max_dropped
+        self._subscribers: List[Subscription] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, events: Optional[Iterable[str]] = None,
+                  buffer: Optional[int] = None) -> Subscription:
+        subscription = Subscription(set(topics) if topics else None, set(events) if events else None,
+                                    buffer or self.buffer, self.max_dropped)
+        with self._lock:
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def publish(self, event: str, topic: str, data: Dict, conflate: bool = False) -> int:
+        feed_event = FeedEvent(next(self._ids), event, topic, data)
+        with self._lock:
+            subscribers = [s for s in self._subscribers if not s.closed and s.wants(feed_event)]
+            self.published += 1
+        for subscription in subscribers:
+            subscription.offer(feed_event, conflate)
+        return len(subscribers)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            "subscribers": len(subscribers),
+            "published": self.published,
+            "delivered": sum(s.delivered for s in subscribers),
+            "dropped": sum(s.dropped for s in subscribers),
+            "conflated": sum(s.conflated for s in subscribers)
+        }
+
+
+class FeedSink(AlertSink):
+    """Alert sink that republishes alerts on the feed under the token's topic."""
+
+    name = "feed"
+
+    def __init__(self, hub: FeedHub):
+        self.hub = hub
+
+    def emit(self, alert: Alert) -> None:
+        self.hub.publish("alert", alert["token_key"], alert)
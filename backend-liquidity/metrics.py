@@ -0,0 +1,251 @@
+import bisect
+import sys
+import threading
+import time
+from collections import Counter as StackCounter, deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; roughly Prometheus' default latency buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (labels, value) pairs for one metric
+Samples = List[Tuple[Dict[str, str], float]]
+
+
+class Histogram:
+    """Cumulative bucket histogram plus a window of recent samples for quantiles.
+
+    Buckets are for export and never reset; quantile() reads only the last
+    `window` observations so it tracks current conditions (e.g. hedge delays).
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, window: int = 512):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.recent.append(value)
+
+    def quantile(self, q: float) -> float:
+        with self._lock:
+            samples = sorted(self.recent)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets, self.counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = self.count
+            return {"buckets": buckets, "count": self.count, "sum": self.sum}
+
+
+# ---------- Labeled metrics ----------
+class CounterFamily:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> Samples:
+        with self._lock:
+            return [(dict(zip(self.labels, key)), value) for key, value in self.values.items()]
+
+
+class HistogramFamily:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = buckets
+        self.children: Dict[Tuple[str, ...], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def child(self, **labels: str) -> Histogram:
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        histogram = self.children.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.children.setdefault(key, Histogram(self.buckets, window=1))
+        return histogram
+
+    def observe(self, value: float, **labels: str) -> None:
+        self.child(**labels).observe(value)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Time a block; also usable as a decorator."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def items(self) -> List[Tuple[Dict[str, str], Histogram]]:
+        with self._lock:
+            return [(dict(zip(self.labels, key)), histogram) for key, histogram in self.children.items()]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Registry:
+    """Holds metric families and renders them in the Prometheus text format.
+
+    Collectors are callables returning (name, type, help, samples) tuples for
+    stats that already live elsewhere (scheduler, upstream client, caches).
+    """
+
+    def __init__(self):
+        self.counters: List[CounterFamily] = []
+        self.histograms: List[HistogramFamily] = []
+        self.external: List[Tuple[str, str, Histogram, Dict[str, str]]] = []
+        self.collectors: List[Callable[[], Iterable[Tuple[str, str, str, Samples]]]] = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> CounterFamily:
+        family = CounterFamily(name, help, labels)
+        self.counters.append(family)
+        return family
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> HistogramFamily:
+        family = HistogramFamily(name, help, labels, buckets)
+        self.histograms.append(family)
+        return family
+
+    def register_histogram(self, name: str, help: str, histogram: Histogram,
+                           labels: Optional[Dict[str, str]] = None) -> None:
+        self.external.append((name, help, histogram, labels or {}))
+
+    def collector(self, fn: Callable[[], Iterable[Tuple[str, str, str, Samples]]]) -> Callable:
+        self.collectors.append(fn)
+        return fn
+
+    @staticmethod
+    def _histogram_lines(name: str, labels: Dict[str, str], histogram: Histogram) -> List[str]:
+        snapshot = histogram.snapshot()
+        lines = [f"{name}_bucket{_format_labels({**labels, 'le': le})} {count}"
+                 for le, count in snapshot["buckets"].items()]
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(snapshot['sum'])}")
+        lines.append(f"{name}_count{_format_labels(labels)} {snapshot['count']}")
+        return lines
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self.counters:
+            lines += [f"# HELP {family.name} {family.help}", f"# TYPE {family.name} counter"]
+            lines += [f"{family.name}{_format_labels(labels)} {_format_value(value)}"
+                      for labels, value in family.samples()]
+        for family in self.histograms:
+            lines += [f"# HELP {family.name} {family.help}", f"# TYPE {family.name} histogram"]
+            for labels, histogram in family.items():
+                lines += self._histogram_lines(family.name, labels, histogram)
+        for name, help, histogram, labels in self.external:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+            lines += self._histogram_lines(name, labels, histogram)
+        for collect in self.collectors:
+            try:
+                for name, kind, help, samples in collect():
+                    lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                    lines += [f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples]
+            except Exception as e:
+                lines.append(f"# collector error: {e}")
+        return "\n".join(lines) + "\n"
+
+
+# ---------- Slow request profiler ----------
+class SlowRequestProfiler:
+    """Opt-in sampling profiler for requests that exceed `threshold` seconds.
+
+    A daemon thread samples the stacks of threads currently serving a request
+    every `interval` seconds (sys._current_frames, no tracing overhead on the
+    request itself). When a request finishes past the threshold its collapsed
+    stacks ("module:function:line;..." -> samples) are kept for inspection.
+    """
+
+    def __init__(self, threshold: float, interval: float = 0.005, keep: int = 20, top: int = 15):
+        self.threshold = threshold
+        self.interval = interval
+        self.top = top
+        self.reports: Deque[Dict] = deque(maxlen=keep)
+        self._active: Dict[int, Tuple[str, float, StackCounter]] = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+        self._thread.start()
+
+    def begin(self, label: str) -> int:
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._active[thread_id] = (label, time.perf_counter(), StackCounter())
+        return thread_id
+
+    def end(self, thread_id: int) -> Optional[Dict]:
+        with self._lock:
+            entry = self._active.pop(thread_id, None)
+        if entry is None:
+            return None
+        label, started, stacks = entry
+        elapsed = time.perf_counter() - started
+        if elapsed < self.threshold:
+            return None
+        report = {
+            "request": label,
+            "duration_ms": elapsed * 1000,
+            "samples": sum(stacks.values()),
+            "stacks": [{"stack": stack, "samples": count} for stack, count in stacks.most_common(self.top)],
+            "timestamp": time.time()
+        }
+        self.reports.append(report)
+        print(f"Slow request {label}: {elapsed * 1000:.0f}ms, {report['samples']} samples")
+        return report
+
+    @staticmethod
+    def _collapse(frame, limit: int = 40) -> str:
+        parts = []
+        while frame is not None and len(parts) < limit:
+            code = frame.f_code
+            parts.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ";".join(reversed(parts))
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            # Sample under the lock so end() never reads a counter mid-update
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, (_, _, stacks) in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[self._collapse(frame)] += 1
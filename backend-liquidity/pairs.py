@@ -0,0 +1,85 @@
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def _liquidity(pair: Dict) -> float:
+    return float((pair.get("liquidity") or {}).get("usd", 0) or 0)
+
+
+def _volume_h24(pair: Dict) -> float:
+    return float((pair.get("volume") or {}).get("h24", 0) or 0)
+
+
+SELECTION_POLICIES: Dict[str, Callable[[Dict], float]] = {
+    "liquidity": _liquidity,
+    "volume": _volume_h24
+}
+
+
+def address_key(address: str) -> str:
+    # EVM addresses are case-insensitive hex; Solana base58 addresses are not
+    return address.lower() if address.startswith("0x") else address
+
+
+def is_base(pair: Dict, token_address: str) -> bool:
+    """True when the token is the pair's base token (its price is the pair's priceUsd)."""
+    return address_key((pair.get("baseToken") or {}).get("address", "")) == address_key(token_address)
+
+
+def _quote_keys(pair: Dict) -> Tuple[str, ...]:
+    quote = pair.get("quoteToken") or {}
+    return tuple(key for key in (quote.get("address", "").lower(), quote.get("symbol", "").lower()) if key)
+
+
+class PairIndex:
+    """Every upstream pair for one token, indexed by chain, (chain, dex) and (chain, quote).
+
+    Only pairs with the token as the base are kept: in a pair where it is the
+    quote, priceUsd, symbol and liquidity describe the other token.
+
+    select() applies a selection policy over the matching pools, so callers
+    get the deepest (or busiest) pool instead of whichever came first, and
+    aggregate() sums the pools on a chain for rules that need total depth.
+    """
+
+    def __init__(self, token_address: str, pairs: List[Dict]):
+        self.token_address = token_address
+        self.pairs = [pair for pair in pairs if is_base(pair, token_address)]
+        self.by_chain: Dict[str, List[Dict]] = defaultdict(list)
+        self.by_dex: Dict[Tuple[str, str], List[Dict]] = defaultdict(list)
+        self.by_quote: Dict[Tuple[str, str], List[Dict]] = defaultdict(list)
+        for pair in self.pairs:
+            chain_id = pair.get("chainId", "")
+            self.by_chain[chain_id].append(pair)
+            self.by_dex[(chain_id, pair.get("dexId", ""))].append(pair)
+            for key in _quote_keys(pair):
+                self.by_quote[(chain_id, key)].append(pair)
+
+    def candidates(self, chain_id: str, dex_id: Optional[str] = None, quote: Optional[str] = None) -> List[Dict]:
+        if dex_id and quote:
+            in_dex = self.by_dex.get((chain_id, dex_id), [])
+            return [p for p in self.by_quote.get((chain_id, quote.lower()), []) if p in in_dex]
+        if dex_id:
+            return self.by_dex.get((chain_id, dex_id), [])
+        if quote:
+            return self.by_quote.get((chain_id, quote.lower()), [])
+        return self.by_chain.get(chain_id, [])
+
+    def select(self, chain_id: str, dex_id: Optional[str] = None, quote: Optional[str] = None,
+               policy: str = "liquidity") -> Optional[Dict]:
+        pairs = self.candidates(chain_id, dex_id, quote)
+        if not pairs:
+            return None
+        return max(pairs, key=SELECTION_POLICIES.get(policy, _liquidity))
+
+    def aggregate(self, chain_id: str) -> Dict:
+        pairs = self.by_chain.get(chain_id, [])
+        return {
+            "pools": len(pairs),
+            "liquidity_usd": sum(_liquidity(p) for p in pairs),
+            "volume_h24": sum(_volume_h24(p) for p in pairs),
+            "dexes": sorted({p.get("dexId", "") for p in pairs})
+        }
+
+    def chains(self) -> Dict[str, int]:
+        return {chain_id: len(pairs) for chain_id, pairs in self.by_chain.items()}
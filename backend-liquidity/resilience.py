@@ -0,0 +1,299 @@
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from metrics import Histogram
+from ratelimit import TokenBucket
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+
+class RateLimitedError(UpstreamError):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and fails fast for
+    `reset_timeout` seconds, then lets a single probe through (half-open)."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """Neutral outcome (e.g. a 429): health unknown, so let the next call probe again."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+
+class RetryBudget:
+    """Caps retries (and hedges) to `ratio` of recent requests plus a small floor per second,
+    so a brownout cannot turn into a retry storm."""
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1, capacity: float = 20):
+        self.ratio = ratio
+        self.floor = TokenBucket(min_per_second, max(1.0, min_per_second))
+        self.capacity = capacity
+        self._balance = 0.0
+        self._lock = threading.Lock()
+        self.spent = 0
+        self.denied = 0
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._balance = min(self.capacity, self._balance + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._balance >= 1:
+                self._balance -= 1
+                self.spent += 1
+                return True
+        if self.floor.try_acquire():
+            self.spent += 1
+            return True
+        self.denied += 1
+        return False
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ResilientClient:
+    """GET-only HTTP client with per-host circuit breakers, jittered retries under
+    a shared retry budget, 429/Retry-After handling and optional hedged requests.
+
+    A call never takes longer than `deadline` seconds in total; each attempt's
+    read timeout is clipped to what remains of it.
+    """
+
+    RETRY_STATUS = {500, 502, 503, 504}
+    # Smallest per-attempt timeout; below it the deadline counts as spent
+    MIN_ATTEMPT_TIMEOUT = 0.05
+
+    def __init__(self, session: requests.Session, deadline: float = 8, connect_timeout: float = 3.05,
+                 read_timeout: float = 5, max_retries: int = 2, backoff_base: float = 0.2,
+                 backoff_cap: float = 2, hedge: bool = False, hedge_quantile: float = 0.95,
+                 hedge_min_samples: int = 20, rate_limiter: Optional[TokenBucket] = None,
+                 retry_budget: Optional[RetryBudget] = None):
+        self.session = session
+        self.deadline = deadline
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.rate_limiter = rate_limiter
+        self.retry_budget = retry_budget or RetryBudget()
+        self.latency = Histogram()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._blocked_until: Dict[str, float] = {}
+        self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge") if hedge else None
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "errors": 0, "retries": 0, "hedges": 0,
+                         "rate_limited": 0, "short_circuited": 0}
+
+    def _breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self.breakers.get(host)
+            if breaker is None:
+                breaker = self.breakers[host] = CircuitBreaker()
+            return breaker
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def _classify(self, host: str, breaker: CircuitBreaker, status_code: int,
+                  retry_after_header: Optional[str]) -> Tuple[str, Optional[float]]:
+        """Record a response on the host's breaker and say what to do with it.
+
+        Returns (outcome, retry_after) where outcome is "ok", "rate_limited" or
+        "retry". Shared with AsyncResilientClient so both treat statuses alike.
+        """
+        if status_code == 429:
+            # Upstream asked us to slow down: not a health failure, but honor the wait
+            # and free a half-open probe so the breaker does not stay shut
+            breaker.release_probe()
+            self._count("rate_limited")
+            retry_after = parse_retry_after(retry_after_header)
+            if retry_after:
+                self._blocked_until[host] = time.time() + retry_after
+            return "rate_limited", retry_after
+        if status_code in self.RETRY_STATUS:
+            breaker.record_failure()
+            return "retry", None
+        breaker.record_success()
+        return "ok", None
+
+    def _attempt_timeout(self, deadline: float) -> Optional[float]:
+        """What is left of the deadline for one attempt, or None once it is spent."""
+        remaining = deadline - time.monotonic()
+        return remaining if remaining >= self.MIN_ATTEMPT_TIMEOUT else None
+
+    def _send(self, url: str, deadline: float) -> requests.Response:
+        # Waiting for the local budget counts against the deadline too
+        if self.rate_limiter is not None and not self.rate_limiter.acquire(
+                timeout=max(0.0, deadline - time.monotonic())):
+            raise RateLimitedError("local request budget exhausted")
+        remaining = max(self.MIN_ATTEMPT_TIMEOUT, deadline - time.monotonic())
+        start = time.monotonic()
+        try:
+            return self.session.get(url, timeout=(min(self.connect_timeout, remaining),
+                                                  min(self.read_timeout, remaining)))
+        finally:
+            self.latency.observe(time.monotonic() - start)
+
+    def _attempt(self, url: str, deadline: float) -> requests.Response:
+        if not self.hedge or self.latency.count < self.hedge_min_samples:
+            return self._send(url, deadline)
+
+        # Hedge: if the first request outlives the recent p95, race a second one
+        primary = self._hedge_pool.submit(self._send, url, deadline)
+        done, _ = wait([primary], timeout=self.latency.quantile(self.hedge_quantile))
+        if done or not self.retry_budget.try_spend():
+            return primary.result()
+        self._count("hedges")
+        pending = {primary, self._hedge_pool.submit(self._send, url, deadline)}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    error = e
+        raise error
+
+    def get(self, url: str) -> requests.Response:
+        host = urlsplit(url).netloc
+        breaker = self._breaker(host)
+        deadline = time.monotonic() + self.deadline
+        self.retry_budget.deposit()
+        self._count("requests")
+        attempt = 0
+
+        while True:
+            blocked = self._blocked_until.get(host, 0) - time.time()
+            if blocked > 0:
+                self._count("short_circuited")
+                raise RateLimitedError(f"{host} rate limited for another {blocked:.1f}s")
+            if not breaker.allow():
+                self._count("short_circuited")
+                raise CircuitOpenError(f"circuit open for {host}")
+
+            if self._attempt_timeout(deadline) is None:
+                breaker.release_probe()
+                self._count("errors")
+                raise requests.Timeout(f"deadline of {self.deadline}s exceeded for {host}")
+            retry_after = None
+            try:
+                response = self._attempt(url, deadline)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                breaker.record_failure()
+                error: Exception = e
+            except BaseException:
+                # Local budget, an interrupt, a bug: nothing learned about the host, so free a half-open probe
+                breaker.release_probe()
+                raise
+            else:
+                outcome, retry_after = self._classify(host, breaker, response.status_code,
+                                                      response.headers.get("Retry-After"))
+                if outcome == "rate_limited":
+                    error = RateLimitedError(f"{host} returned 429")
+                elif outcome == "retry":
+                    error = requests.HTTPError(f"{response.status_code} from {host}", response=response)
+                else:
+                    response.raise_for_status()
+                    return response
+
+            attempt += 1
+            delay = retry_after if retry_after is not None else random.uniform(
+                0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+            if (attempt > self.max_retries or time.monotonic() + delay >= deadline
+                    or not self.retry_budget.try_spend()):
+                self._count("errors")
+                raise error
+            self._count("retries")
+            if retry_after is not None:
+                self._blocked_until.pop(host, None)
+            time.sleep(delay)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "retry_budget": {"spent": self.retry_budget.spent, "denied": self.retry_budget.denied},
+            "latency": {
+                "p50": self.latency.quantile(0.50),
+                "p95": self.latency.quantile(0.95),
+                "p99": self.latency.quantile(0.99),
+                "histogram": self.latency.snapshot()
+            },
+            "breakers": {
+                host: {"state": breaker.state, "failures": breaker.failures, "trips": breaker.trips}
+                for host, breaker in self.breakers.items()
+            }
+        }
@@ -0,0 +1,300 @@
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Rolling window of lag samples kept per token for the stats endpoint
+LAG_SAMPLES = 100
+
+
+class MonitoredToken:
+    __slots__ = ("chain_id", "token_address", "interval", "base_interval", "activity", "next_due",
+                 "running", "ticks", "errors", "last_lag", "max_lag", "lags")
+
+    def __init__(self, chain_id: str, token_address: str, interval: float):
+        self.chain_id = chain_id
+        self.token_address = token_address
+        self.interval = interval
+        self.base_interval = interval
+        self.activity: Optional[float] = None
+        self.next_due = 0.0
+        self.running = False
+        self.ticks = 0
+        self.errors = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.lags: List[float] = []
+
+    @property
+    def key(self) -> str:
+        return f"{self.chain_id}-{self.token_address}"
+
+
+class AdaptivePolicy:
+    """Retunes a token's interval from an activity score after every tick.
+
+    activity >= hot tightens the interval (down to min_interval), activity <
+    idle backs it off exponentially (up to max_interval), anything in between
+    relaxes back toward the token's base interval. Tightening is capped so the
+    scheduler's total poll rate stays within poll_budget polls per second;
+    when the base intervals alone add up to more than that, fit_budget()
+    stretches them (past max_interval if need be).
+    """
+
+    def __init__(self, min_interval: float = 5, max_interval: float = 300, hot: float = 1.0,
+                 idle: float = 0.2, tighten: float = 0.5, backoff: float = 2.0,
+                 poll_budget: Optional[float] = None):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.hot = hot
+        self.idle = idle
+        self.tighten = tighten
+        self.backoff = backoff
+        self.poll_budget = poll_budget
+
+    def next_interval(self, token: MonitoredToken, activity: Optional[float], total_rate: float) -> float:
+        current = token.interval
+        if activity is None:
+            return current
+        if activity >= self.hot:
+            proposed = max(self.min_interval, min(current, token.base_interval) * self.tighten)
+        elif activity < self.idle:
+            proposed = min(self.max_interval, current * self.backoff)
+        elif current < token.base_interval:
+            proposed = min(token.base_interval, current * self.backoff)
+        else:
+            proposed = token.base_interval
+
+        if proposed < current and self.poll_budget:
+            spare = self.poll_budget - (total_rate - 1 / current)
+            if spare <= 1 / current:
+                return current
+            proposed = max(proposed, 1 / spare)
+        return proposed
+
+    def fit_budget(self, tokens: List[MonitoredToken], total_rate: float) -> float:
+        """Stretch intervals until the total poll rate fits poll_budget. Returns the new rate.
+
+        Each token's base interval is scaled by the same factor, so tokens
+        share the budget in proportion to their base rates however they were
+        added; anything still over (tokens tightened into spare budget before
+        another was added) is taken from every token evenly.
+        """
+        if not self.poll_budget or total_rate <= self.poll_budget:
+            return total_rate
+        stretch = sum(1 / token.base_interval for token in tokens) / self.poll_budget
+        for token in tokens:
+            token.interval = max(token.interval, token.base_interval * stretch)
+        total_rate = sum(1 / token.interval for token in tokens)
+        if total_rate > self.poll_budget:
+            scale = total_rate / self.poll_budget
+            for token in tokens:
+                token.interval *= scale
+            total_rate = sum(1 / token.interval for token in tokens)
+        return total_rate
+
+
+class MonitoringScheduler:
+    """Runs a tick callable for many tokens on a bounded worker pool.
+
+    Each token has its own interval; the next due time is jittered so that
+    tokens added together spread out instead of hitting the API in lockstep.
+    A tick never overlaps with itself, and the dispatcher only hands out work
+    when a worker is free, so lag grows visibly instead of queueing unbounded.
+    """
+
+    def __init__(self, tick: Callable[[str, str], object], max_workers: int = 16,
+                 default_interval: float = 20, jitter: float = 0.1,
+                 policy: Optional[AdaptivePolicy] = None,
+                 activity: Optional[Callable[[str, object], Optional[float]]] = None):
+        self.tick = tick
+        self.policy = policy
+        # activity(token_key, tick_result) -> score consumed by the policy
+        self.activity = activity
+        self.total_rate = 0.0
+        self.max_workers = max_workers
+        self.default_interval = default_interval
+        self.jitter = jitter
+        self.tokens: Dict[str, MonitoredToken] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    # ---------- Registration ----------
+    def add_token(self, chain_id: str, token_address: str, interval: Optional[float] = None) -> MonitoredToken:
+        token = MonitoredToken(chain_id, token_address, interval or self.default_interval)
+        with self._cond:
+            existing = self.tokens.get(token.key)
+            if existing:
+                self.total_rate += 1 / token.interval - 1 / existing.interval
+                existing.interval = existing.base_interval = token.interval
+                self._fit_budget()
+                return existing
+            self.tokens[token.key] = token
+            self.total_rate += 1 / token.interval
+            self._fit_budget()
+            # First tick lands somewhere inside the first interval
+            self._push(token, time.time() + random.uniform(0, token.interval * self.jitter))
+        return token
+
+    def remove_token(self, chain_id: str, token_address: str) -> bool:
+        with self._cond:
+            token = self.tokens.pop(f"{chain_id}-{token_address}", None)
+            if token is None:
+                return False
+            self.total_rate -= 1 / token.interval
+            return True
+
+    def _push(self, token: MonitoredToken, due: float) -> None:
+        token.next_due = due
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, token.key))
+        self._cond.notify()
+
+    def _next_due(self, token: MonitoredToken, due: float, now: float) -> float:
+        spread = token.interval * self.jitter
+        next_due = due + token.interval + random.uniform(-spread, spread)
+        # Behind by more than a full interval: skip missed ticks instead of bursting
+        if next_due < now:
+            next_due = now + random.uniform(0, spread)
+        return next_due
+
+    # ---------- Lifecycle ----------
+    def start(self) -> None:
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="monitor")
+            self._thread = threading.Thread(target=self._dispatch, name="monitor-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, wait: bool = True) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+        if self._executor:
+            self._executor.shutdown(wait=wait)
+
+    def run_forever(self) -> None:
+        self.start()
+        try:
+            while self._thread and self._thread.is_alive():
+                self._thread.join(1)
+        except KeyboardInterrupt:
+            self.stop()
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if self._heap:
+                        wait = self._heap[0][0] - time.time()
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                if self._stopped:
+                    return
+                due, _, key = heapq.heappop(self._heap)
+                token = self.tokens.get(key)
+                # Removed, or stale heap entry superseded by a newer schedule
+                if token is None or token.next_due != due:
+                    continue
+
+            # Block here when every worker is busy so lag reflects saturation
+            self._slots.acquire()
+            started = time.time()
+            lag = max(0.0, started - due)
+            token.last_lag = lag
+            token.max_lag = max(token.max_lag, lag)
+            token.lags.append(lag)
+            if len(token.lags) > LAG_SAMPLES:
+                del token.lags[0]
+            token.running = True
+            try:
+                self._executor.submit(self._run, token, due)
+            except RuntimeError:
+                # Executor shut down (stop() or interpreter exit) while we were dispatching
+                token.running = False
+                self._slots.release()
+                return
+
+    def _run(self, token: MonitoredToken, due: float) -> None:
+        result = None
+        try:
+            result = self.tick(token.chain_id, token.token_address)
+        except Exception as e:
+            token.errors += 1
+            print(f"Monitoring error for {token.key}: {e}")
+        finally:
+            token.ticks += 1
+            token.running = False
+            self._slots.release()
+            with self._cond:
+                if self.tokens.get(token.key) is token:
+                    if self.policy is not None:
+                        self._adapt(token, result)
+                    self._push(token, self._next_due(token, due, time.time()))
+
+    def _adapt(self, token: MonitoredToken, result: object) -> None:
+        try:
+            token.activity = self.activity(token.key, result) if self.activity else None
+        except Exception as e:
+            print(f"Activity error for {token.key}: {e}")
+            token.activity = None
+        interval = self.policy.next_interval(token, token.activity, self.total_rate)
+        self.total_rate += 1 / interval - 1 / token.interval
+        token.interval = interval
+        self._fit_budget()
+
+    def _fit_budget(self) -> None:
+        # Caller holds _cond. Rescheduled ticks pick up the stretched intervals
+        if self.policy is not None:
+            self.total_rate = self.policy.fit_budget(list(self.tokens.values()), self.total_rate)
+
+    # ---------- Introspection ----------
+    def stats(self) -> Dict:
+        with self._cond:
+            tokens = list(self.tokens.values())
+        lags = sorted(lag for token in tokens for lag in token.lags)
+
+        def percentile(p: float) -> float:
+            if not lags:
+                return 0.0
+            return lags[min(len(lags) - 1, int(p * len(lags)))]
+
+        return {
+            "tokens": len(tokens),
+            "max_workers": self.max_workers,
+            "running": sum(1 for token in tokens if token.running),
+            "polls_per_second": self.total_rate,
+            "lag": {
+                "p50": percentile(0.50),
+                "p99": percentile(0.99),
+                "max": lags[-1] if lags else 0.0
+            },
+            "per_token": {
+                token.key: {
+                    "interval": token.interval,
+                    "base_interval": token.base_interval,
+                    "activity": token.activity,
+                    "next_due": token.next_due,
+                    "ticks": token.ticks,
+                    "errors": token.errors,
+                    "last_lag": token.last_lag,
+                    "max_lag": token.max_lag
+                }
+                for token in tokens
+            }
+        }
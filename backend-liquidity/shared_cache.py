@@ -0,0 +1,395 @@
+import hashlib
+import itertools
+import os
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from checkpoint import dumps, loads
+
+_EXPIRY = struct.Struct("<d")
+
+
+# ---------- Backends ----------
+class CacheBackend(ABC):
+    """Bytes-in, bytes-out store with per-key TTL; add() is set-if-absent (used as a lock)."""
+
+    name = "backend"
+    shared = True
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    """In-process fallback; shares nothing between workers but keeps the same semantics."""
+
+    name = "memory"
+    shared = False
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: Dict[str, Tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str, now: float) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._data[key]
+            return None
+        return entry[1]
+
+    def get(self, key):
+        with self._lock:
+            return self._live(key, time.time())
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            if len(self._data) >= self.max_entries and key not in self._data:
+                now = time.time()
+                for stale in [k for k, (expires, _) in self._data.items() if expires <= now]:
+                    del self._data[stale]
+                if len(self._data) >= self.max_entries:
+                    self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.time() + ttl, value)
+
+    def add(self, key, value, ttl):
+        with self._lock:
+            if self._live(key, time.time()) is not None:
+                return False
+            self._data[key] = (time.time() + ttl, value)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class FileBackend(CacheBackend):
+    """One file per key under a directory every worker can see.
+
+    Pointed at tmpfs (e.g. /dev/shm) this is shared memory between gunicorn
+    workers on one host with no extra server. Writes go through a temp file and
+    os.replace so readers never see a partial value; add() uses O_EXCL.
+
+    Expired files are deleted when read, and every `sweep_every` sets the
+    whole directory is swept, so keys nobody reads again don't pile up (on
+    tmpfs they would hold RAM).
+    """
+
+    name = "file"
+
+    def __init__(self, root: Path, sweep_every: int = 500, stale_tmp_age: float = 60):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.sweep_every = sweep_every
+        self.stale_tmp_age = stale_tmp_age
+        self._sets = itertools.count(1)
+
+    def _path(self, key: str) -> Path:
+        return self.root / hashlib.sha1(key.encode()).hexdigest()
+
+    def _expired(self, data: bytes, stat: os.stat_result, now: float) -> bool:
+        if len(data) < _EXPIRY.size:
+            # Empty for a moment while add() writes it; only an old one was abandoned
+            return now - stat.st_mtime > self.stale_tmp_age
+        return _EXPIRY.unpack_from(data)[0] <= now
+
+    @staticmethod
+    def _remove(path: Path, stat: os.stat_result) -> bool:
+        # Only if the file is still the one that was read; a writer may have replaced it since
+        try:
+            current = os.stat(path)
+            if (current.st_ino, current.st_dev) != (stat.st_ino, stat.st_dev):
+                return False
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _read(self, path: Path, length: int = -1) -> Tuple[Optional[bytes], bool]:
+        """(value, removed): value is None when missing or expired; expired files are deleted."""
+        try:
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                data = f.read(length)
+        except FileNotFoundError:
+            return None, False
+        now = time.time()
+        if len(data) < _EXPIRY.size or _EXPIRY.unpack_from(data)[0] <= now:
+            return None, self._expired(data, stat, now) and self._remove(path, stat)
+        return data[_EXPIRY.size:], False
+
+    def sweep(self) -> int:
+        """Delete expired entries and abandoned temp files. Returns how many were removed."""
+        removed = 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                try:
+                    if entry.name.endswith(".tmp"):
+                        # A writer that died between open() and os.replace()
+                        if time.time() - entry.stat().st_mtime > self.stale_tmp_age:
+                            os.unlink(entry.path)
+                            removed += 1
+                    else:
+                        removed += self._read(Path(entry.path), _EXPIRY.size)[1]
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def get(self, key):
+        return self._read(self._path(key))[0]
+
+    def set(self, key, value, ttl):
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(_EXPIRY.pack(time.time() + ttl) + value)
+        os.replace(tmp, path)
+        if next(self._sets) % self.sweep_every == 0:
+            self.sweep()
+
+    def add(self, key, value, ttl):
+        path = self._path(key)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                if self._read(path)[0] is not None:
+                    return False
+                # Expired holder (e.g. a crashed worker's lock): _read removed it, retry once
+                continue
+            with os.fdopen(fd, "wb") as f:
+                f.write(_EXPIRY.pack(time.time() + ttl) + value)
+            return True
+        return False
+
+    def delete(self, key):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class RedisBackend(CacheBackend):
+    """Shared across hosts; needs the optional `redis` package."""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.client.ping()
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, px=max(1, int(ttl * 1000)))
+
+    def add(self, key, value, ttl):
+        return bool(self.client.set(key, value, px=max(1, int(ttl * 1000)), nx=True))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+
+def create_backend(url: Optional[str]) -> CacheBackend:
+    """memory:// (default), file:///dev/shm/liquidity or redis://host:6379/0.
+
+    Falls back to the in-process backend when the shared one is unavailable.
+    """
+    parts = urlsplit(url or "memory://")
+    try:
+        if parts.scheme == "file":
+            return FileBackend(Path(parts.path))
+        if parts.scheme in ("redis", "rediss"):
+            return RedisBackend(url)
+    except Exception as e:
+        print(f"Shared cache {url} unavailable, using in-process cache: {e}")
+    return MemoryBackend()
+
+
+# ---------- Cache ----------
+class SharedCache:
+    """Typed values over a CacheBackend, with a cross-worker get_or_compute.
+
+    Values round-trip through checkpoint.dumps/loads, so only builtins (dicts,
+    lists, tuples, str, bytes, numbers) can be stored.
+    """
+
+    def __init__(self, backend: CacheBackend, namespace: str = "liquidity",
+                 wait: float = 2.0, poll: float = 0.05):
+        self.backend = backend
+        self.namespace = namespace
+        self.wait = wait
+        self.poll = poll
+        self.hits = 0
+        self.misses = 0
+        self.waited = 0
+        self.errors = 0
+
+    @property
+    def shared(self) -> bool:
+        return self.backend.shared
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str) -> Any:
+        try:
+            data = self.backend.get(self._key(key))
+            return None if data is None else loads(data)
+        except Exception as e:
+            self.errors += 1
+            print(f"Shared cache get error: {e}")
+            return None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        try:
+            self.backend.set(self._key(key), dumps(value), ttl)
+        except Exception as e:
+            self.errors += 1
+            print(f"Shared cache set error: {e}")
+
+    def delete(self, key: str) -> None:
+        try:
+            self.backend.delete(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            print(f"Shared cache delete error: {e}")
+
+    def get_or_compute(self, key: str, ttl: float, compute: Callable[[], Any]) -> Any:
+        """Return the cached value, or compute it in exactly one worker while the
+        others wait up to `wait` seconds for it (then compute it themselves)."""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        lock_key = self._key(f"lock:{key}")
+        try:
+            locked = self.backend.add(lock_key, b"1", self.wait * 5)
+        except Exception as e:
+            self.errors += 1
+            print(f"Shared cache lock error: {e}")
+            locked = True
+        if not locked:
+            deadline = time.monotonic() + self.wait
+            while time.monotonic() < deadline:
+                time.sleep(self.poll)
+                value = self.get(key)
+                if value is not None:
+                    self.waited += 1
+                    return value
+
+        try:
+            value = compute()
+            if value is not None:
+                self.set(key, value, ttl)
+            return value
+        finally:
+            if locked:
+                try:
+                    self.backend.delete(lock_key)
+                except Exception:
+                    pass
+
+    def stats(self) -> Dict:
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "waited": self.waited,
+            "errors": self.errors
+        }
+
+
+# ---------- Leases ----------
+class Lease:
+    """A named lock in the shared cache that one worker holds at a time.
+
+    The holder renews it every ttl/3 from a background thread; if the holder
+    dies the lease expires and the next worker to poll takes it over. With
+    an in-process backend there is nobody to share with, so it is always held.
+    """
+
+    def __init__(self, cache: SharedCache, name: str, ttl: float = 30.0):
+        self.cache = cache
+        self.key = cache._key(f"lease:{name}")
+        self.ttl = ttl
+        self.owner = f"{os.uname().nodename}:{os.getpid()}".encode()
+        self.held = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def try_acquire(self) -> bool:
+        """Take the lease if it is free, or renew it if we already hold it."""
+        backend = self.cache.backend
+        if not backend.shared:
+            self.held = True
+            return True
+        try:
+            if backend.get(self.key) == self.owner:
+                # No compare-and-set in the backend API: a renewal racing a takeover after
+                # expiry can briefly leave two holders, which the next poll settles
+                backend.set(self.key, self.owner, self.ttl)
+                self.held = True
+            else:
+                self.held = backend.add(self.key, self.owner, self.ttl)
+        except Exception as e:
+            self.cache.errors += 1
+            print(f"Shared cache lease error: {e}")
+            # Keep a held lease until it provably expired rather than flapping on one error
+        return self.held
+
+    def start(self, on_acquired: Callable[[], None], on_lost: Optional[Callable[[], None]] = None) -> None:
+        """Poll the lease in the background: `on_acquired` runs each time it is taken,
+        `on_lost` when another worker took it over (e.g. after this one stalled past the ttl)."""
+        def run() -> None:
+            holding = False
+            while True:
+                held = self.try_acquire()
+                callback = on_acquired if held and not holding else on_lost if holding and not held else None
+                holding = held
+                if callback is not None:
+                    try:
+                        callback()
+                    except Exception as e:
+                        print(f"Lease {self.key} callback failed: {e}")
+                if self._stop.wait(self.ttl / 3):
+                    return
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=run, name=f"lease-{self.key}", daemon=True)
+            self._thread.start()
+
+    def release(self) -> None:
+        self._stop.set()
+        if self.held and self.cache.backend.shared:
+            try:
+                if self.cache.backend.get(self.key) == self.owner:
+                    self.cache.backend.delete(self.key)
+            except Exception:
+                pass
+        self.held = False
@@ -0,0 +1,70 @@
+import pytest
+
+from alerts import AlertEngine, AlertRule, AlertSink, LiquidityDrainRule, PriceChangeRule
+
+TOKEN = "solana-abc"
+
+
+def token_data(price: float, liquidity: float = 100000.0, buys: int = 10, sells: int = 10):
+    return {
+        "base_token": {"symbol": "ABC"},
+        "price_usd": str(price),
+        "liquidity": {"usd": liquidity},
+        "txns": {"m5": {"buys": buys, "sells": sells}},
+        "volume": {"h1": 1000.0}
+    }
+
+
+def make_engine(**kwargs) -> AlertEngine:
+    return AlertEngine([PriceChangeRule(15, 10), LiquidityDrainRule(30, 20)], **kwargs)
+
+
+def test_rule_and_sink_are_abstract():
+    with pytest.raises(TypeError):
+        AlertRule(1.0)
+    with pytest.raises(TypeError):
+        AlertSink()
+
+
+def test_price_rule_fires_once_with_hysteresis_and_cooldown():
+    engine = make_engine(cooldown=300)
+    assert engine.observe(TOKEN, token_data(1.0), now=1000) == []
+    alerts = engine.observe(TOKEN, token_data(1.2), now=1060)
+    assert [alert["rule"] for alert in alerts] == ["price_change"]
+    # Still above threshold * hysteresis: stays active, no repeat
+    assert engine.observe(TOKEN, token_data(1.25), now=1120) == []
+
+
+def test_forget_drops_per_token_state():
+    engine = make_engine()
+    engine.observe(TOKEN, token_data(1.0), now=1000)
+    engine.observe(TOKEN, token_data(1.2), now=1060)
+    engine.observe("solana-other", token_data(1.0), now=1060)
+
+    engine.forget(TOKEN)
+    assert list(engine.windows) == ["solana-other"]
+    assert all(key[0] != TOKEN for key in engine._active)
+    assert all(key[0] != TOKEN for key in engine._last_fired)
+
+
+def test_idle_tokens_are_evicted():
+    engine = make_engine(idle_ttl=600)
+    engine.observe(TOKEN, token_data(1.0), now=1000)
+    engine.observe(TOKEN, token_data(1.2), now=1060)
+    engine.observe("solana-other", token_data(1.0), now=1500)
+
+    engine.observe("solana-other", token_data(1.0), now=1700)
+    assert list(engine.windows) == ["solana-other"]
+    assert not engine._last_fired
+    assert engine.stats()["evicted"] == 1
+
+
+def test_state_round_trip():
+    engine = make_engine()
+    engine.observe(TOKEN, token_data(1.0), now=1000)
+    engine.observe(TOKEN, token_data(1.2), now=1060)
+
+    restored = make_engine()
+    restored.load_state(engine.to_state())
+    # Active and cooled down: the restart does not re-fire
+    assert restored.observe(TOKEN, token_data(1.25), now=1070) == []
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from async_upstream import AsyncResilientClient
+from resilience import CircuitBreaker, CircuitOpenError
+
+HOST = "api.example"
+URL = f"https://{HOST}/latest/dex/tokens/abc"
+
+
+def make_client(handler) -> AsyncResilientClient:
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = AsyncResilientClient(http, max_retries=0)
+    client.breakers[HOST] = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    return client
+
+
+def test_cancelled_half_open_probe_does_not_wedge_breaker():
+    state = {"mode": "fail"}
+
+    async def handler(request):
+        if state["mode"] == "fail":
+            raise httpx.ConnectError("down", request=request)
+        if state["mode"] == "hang":
+            await asyncio.sleep(10)
+        return httpx.Response(200, json={"pairs": []})
+
+    async def main():
+        client = make_client(handler)
+        with pytest.raises(httpx.ConnectError):
+            await client.get(URL)
+        with pytest.raises(CircuitOpenError):
+            await client.get(URL)
+
+        # The probe's client disconnects while it is in flight
+        await asyncio.sleep(0.06)
+        state["mode"] = "hang"
+        probe = asyncio.ensure_future(client.get(URL))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        state["mode"] = "ok"
+        response = await client.get(URL)
+        await client.http.aclose()
+        return response, client.breakers[HOST].state
+
+    response, breaker_state = asyncio.run(main())
+    assert response.status_code == 200
+    assert breaker_state == CircuitBreaker.CLOSED
+
+
+def test_429_on_half_open_probe_does_not_wedge_breaker():
+    statuses = [503, 429, 200]
+
+    async def handler(request):
+        return httpx.Response(statuses.pop(0))
+
+    async def main():
+        client = make_client(handler)
+        with pytest.raises(Exception):
+            await client.get(URL)
+        await asyncio.sleep(0.06)
+        with pytest.raises(Exception, match="429"):
+            await client.get(URL)
+        response = await client.get(URL)
+        await client.http.aclose()
+        return response
+
+    start = time.monotonic()
+    assert asyncio.run(main()).status_code == 200
+    assert time.monotonic() - start < 2
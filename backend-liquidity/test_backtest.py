@@ -0,0 +1,89 @@
+import numpy as np
+
+from alerts import create_engine
+from backtest import expand_grid, replay_alerts, replay_scores
+from batch_scoring import SNAPSHOT_DTYPE
+
+ALERT_CONFIG = {
+    "price_change_threshold": 10,
+    "volume_change_threshold": 50,
+    "liquidity_change_threshold": 20,
+    "price_window_minutes": 15,
+    "liquidity_drain_window_minutes": 30,
+    "liquidity_drain_threshold": 20,
+    "imbalance_ratio": 2.0,
+    "imbalance_streak": 5,
+    "cooldown_seconds": 300,
+    "hysteresis": 0.8
+}
+
+
+def make_records(ticks: int, interval: float = 20.0) -> np.ndarray:
+    records = np.zeros(ticks, dtype=SNAPSHOT_DTYPE)
+    records["timestamp"] = 1.7e9 + np.arange(ticks) * interval
+    records["price_usd"] = 1.0
+    records["liquidity_usd"] = 1e5
+    records["volume_h1"] = 1e4
+    records["buys_m5"] = 10
+    records["sells_m5"] = 10
+    return records
+
+
+def test_replay_matches_the_live_engine():
+    rng = np.random.default_rng(7)
+    records = make_records(500)
+    records["price_usd"] = np.exp(np.cumsum(rng.normal(0, 0.08, 500)))
+    records["liquidity_usd"] = 1e5 * np.exp(np.cumsum(rng.normal(0, 0.05, 500)))
+    records["sells_m5"] = rng.poisson(15, 500)
+
+    masks = replay_alerts(records, ALERT_CONFIG)
+
+    engine = create_engine(ALERT_CONFIG)
+    previous = None
+    expected = []
+    for row in records:
+        current = {"base_token": {"symbol": "ABC"}, "price_usd": str(row["price_usd"]),
+                   "liquidity": {"usd": row["liquidity_usd"]}, "volume": {"h1": row["volume_h1"]},
+                   "txns": {"m5": {"buys": row["buys_m5"], "sells": row["sells_m5"]}}}
+        expected += [(alert["timestamp"], alert["rule"])
+                     for alert in engine.observe("solana-abc", current, previous, now=row["timestamp"])]
+        previous = current
+
+    replayed = sorted((records["timestamp"][i], kind) for kind, mask in masks.items() for i in np.flatnonzero(mask))
+    assert expected
+    assert replayed == sorted(expected)
+
+
+def test_replay_applies_cooldown():
+    # Price flips +-20% every tick for 10 minutes: the snapshot rule fires once per cooldown
+    records = make_records(30)
+    records["price_usd"][1::2] = 1.2
+    masks = replay_alerts(records, ALERT_CONFIG)
+    assert masks["snapshot:PRICE ALERT"].sum() == 2
+
+
+def test_replay_fires_windowed_rules():
+    records = make_records(10)
+    records["sells_m5"][3:] = 50
+    records["liquidity_usd"][5:] = 5e4
+    masks = replay_alerts(records, ALERT_CONFIG)
+    assert np.flatnonzero(masks["imbalance_streak"]).tolist() == [7]
+    assert np.flatnonzero(masks["liquidity_drain"]).tolist() == [5]
+    assert "sentiment" not in masks
+
+
+def test_risk_replay_uses_realized_volatility():
+    import Liquidity_Monitoring_agent as agent
+
+    # Upstream h6 change stays 0; only the replayed prices are volatile
+    records = make_records(80)
+    records["price_usd"][1::2] = 1.3
+    records["pair_created_at"] = records["timestamp"][0] - 365 * 86400
+    thresholds = dict(agent.THRESHOLDS)
+    config = expand_grid({"volatility_threshold": [10]}, thresholds, ALERT_CONFIG)[0]
+    scores = replay_scores(records, config)
+    # The grid point only applies during the replay
+    assert agent.THRESHOLDS == thresholds
+
+    warm = agent.MIN_VOLATILITY_SAMPLES
+    assert (scores["risk_score"][warm:] - scores["risk_score"][warm - 2] >= 20).all()
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from caching import AsyncResponseCache, ResponseCache, SingleFlight, TTLCache
+
+
+def test_ttl_cache_expires_and_evicts_lru():
+    cache = TTLCache(ttl=0.05, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.get_entry("a")[1] == 1
+
+
+def test_single_flight_runs_once_for_concurrent_callers():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    # Let the followers reach the in-flight call before the leader finishes
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(results) == [("value", False)] + [("value", True)] * 4
+    assert not flight.in_flight("k")
+
+
+def test_single_flight_shares_the_exception():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("k", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    # The failed call is not remembered
+    assert flight.do("k", lambda: 1) == (1, False)
+
+
+def test_response_cache_statuses():
+    cache = ResponseCache(ttl=0.05, stale_ttl=1)
+    refreshed = threading.Event()
+    values = iter(["first", "second"])
+
+    def compute():
+        value = next(values)
+        if value == "second":
+            refreshed.set()
+        return value
+
+    assert cache.get_or_compute("k", compute) == ("first", "MISS")
+    assert cache.get_or_compute("k", compute) == ("first", "HIT")
+    time.sleep(0.06)
+    # Stale: served immediately while one refresh runs in the background
+    assert cache.get_or_compute("k", compute) == ("first", "STALE")
+    assert refreshed.wait(1)
+    for _ in range(100):
+        if cache.get_or_compute("k", compute)[0] == "second":
+            break
+        time.sleep(0.01)
+    assert cache.get_or_compute("k", compute) == ("second", "HIT")
+
+
+def test_response_cache_does_not_store_none():
+    cache = ResponseCache(ttl=60)
+    assert cache.get_or_compute("k", lambda: None) == (None, "MISS")
+    assert cache.get_or_compute("k", lambda: "v") == ("v", "MISS")
+
+
+def test_async_response_cache_collapses_concurrent_misses():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        cache = AsyncResponseCache(ttl=60)
+        results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+        return results, await cache.get_or_compute("k", compute)
+
+    results, again = asyncio.run(main())
+    assert len(calls) == 1
+    assert sorted(status for _, status in results) == ["MISS"] + ["SHARED"] * 4
+    assert again == ("value", "HIT")
@@ -0,0 +1,48 @@
+import os
+import pickle
+from collections import OrderedDict
+
+import pytest
+
+from checkpoint import Checkpointer, dumps, load_checkpoint, loads, save_checkpoint
+
+
+class Exploit:
+    def __reduce__(self):
+        return os.system, ("echo pwned",)
+
+
+def test_plain_values_round_trip():
+    value = {"prices": b"\x00\x01", "series": [1, 2.5, None], "key": ("a", True)}
+    assert loads(dumps(value)) == value
+
+
+@pytest.mark.parametrize("value", [Exploit(), OrderedDict(a=1), {"nested": [Exploit()]}])
+def test_loads_refuses_globals(value):
+    with pytest.raises(pickle.UnpicklingError, match="may not reference"):
+        loads(pickle.dumps(value))
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = tmp_path / "state" / "checkpoint.bin"
+    size = save_checkpoint(path, {"tokens": ["solana-abc"]})
+    assert size == path.stat().st_size
+    assert load_checkpoint(path) == {"tokens": ["solana-abc"]}
+    # The per-process temp file was renamed into place
+    assert list(path.parent.iterdir()) == [path]
+
+
+def test_load_checkpoint_ignores_missing_and_foreign_files(tmp_path):
+    assert load_checkpoint(tmp_path / "missing.bin") is None
+    foreign = tmp_path / "foreign.bin"
+    foreign.write_bytes(pickle.dumps({"tokens": []}))
+    assert load_checkpoint(foreign) is None
+
+
+def test_checkpointer_saves_on_stop(tmp_path):
+    path = tmp_path / "checkpoint.bin"
+    checkpointer = Checkpointer(path, lambda: {"saves": "final"}, interval=3600)
+    checkpointer.start()
+    checkpointer.stop()
+    assert load_checkpoint(path) == {"saves": "final"}
+    assert checkpointer.stats()["saves"] == 1
@@ -0,0 +1,36 @@
+from feed import FeedEvent, FeedHub, Subscription
+
+
+def event(i: int, topic: str = "solana-abc", kind: str = "report") -> FeedEvent:
+    return FeedEvent(i, kind, topic, {"n": i})
+
+
+def test_conflation_keeps_the_latest_and_does_not_disconnect():
+    subscription = Subscription(None, None, buffer=10, max_dropped=3)
+    for i in range(100):
+        subscription.offer(event(i), conflate=True)
+
+    assert not subscription.closed
+    assert subscription.conflated == 99 and subscription.dropped == 0
+    assert [e.data for e in subscription.get(0)] == [{"n": 99}]
+
+
+def test_lost_events_disconnect_past_max_dropped():
+    subscription = Subscription(None, None, buffer=2, max_dropped=3)
+    for i in range(5):
+        subscription.offer(event(i, kind="alert"), conflate=False)
+    assert subscription.dropped == 3 and not subscription.closed
+
+    subscription.offer(event(5, kind="alert"), conflate=False)
+    assert subscription.closed
+
+
+def test_hub_stats_report_conflated_separately():
+    hub = FeedHub(buffer=10)
+    subscription = hub.subscribe(topics=["solana-abc"])
+    hub.publish("report", "solana-abc", {"n": 1}, conflate=True)
+    hub.publish("report", "solana-abc", {"n": 2}, conflate=True)
+    hub.publish("report", "solana-other", {"n": 3}, conflate=True)
+
+    assert hub.stats()["conflated"] == 1 and hub.stats()["dropped"] == 0
+    assert [e.data for e in subscription.get(0)] == [{"n": 2}]
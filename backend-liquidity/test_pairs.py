@@ -0,0 +1,46 @@
+from dex_client import group_pairs
+from pairs import PairIndex
+
+TOKEN = "TokMint111"
+EVM_TOKEN = "0xAbC0000000000000000000000000000000000001"
+
+
+def pair(base: str, base_symbol: str, quote: str, quote_symbol: str, liquidity: float,
+         chain_id: str = "solana", dex_id: str = "raydium", price: str = "0.5") -> dict:
+    return {
+        "chainId": chain_id, "dexId": dex_id, "priceUsd": price,
+        "baseToken": {"address": base, "symbol": base_symbol},
+        "quoteToken": {"address": quote, "symbol": quote_symbol},
+        "liquidity": {"usd": liquidity}, "volume": {"h24": liquidity / 10}
+    }
+
+
+# The token is the quote of the deepest pool: its price and symbol are USDC's
+QUOTE_SIDE = pair("UsdcMint", "USDC", TOKEN, "TOK", 5_000_000, price="1.0")
+BASE_DEEP = pair(TOKEN, "TOK", "SolMint", "SOL", 200_000, dex_id="orca")
+BASE_SHALLOW = pair(TOKEN, "TOK", "UsdcMint", "USDC", 50_000)
+
+
+def test_select_ignores_pairs_where_the_token_is_the_quote():
+    index = PairIndex(TOKEN, [QUOTE_SIDE, BASE_SHALLOW, BASE_DEEP])
+    selected = index.select("solana")
+    assert selected is BASE_DEEP
+    assert selected["baseToken"]["symbol"] == "TOK"
+    assert index.select("solana", quote="usdc") is BASE_SHALLOW
+
+
+def test_aggregate_counts_only_base_side_pools():
+    market = PairIndex(TOKEN, [QUOTE_SIDE, BASE_SHALLOW, BASE_DEEP]).aggregate("solana")
+    assert market == {"pools": 2, "liquidity_usd": 250_000, "volume_h24": 25_000, "dexes": ["orca", "raydium"]}
+
+
+def test_evm_addresses_match_case_insensitively():
+    evm_pair = pair(EVM_TOKEN.lower(), "TOK", "0xweth", "WETH", 1000, chain_id="ethereum")
+    assert PairIndex(EVM_TOKEN, [evm_pair]).select("ethereum") is evm_pair
+    # base58 is case-sensitive
+    assert PairIndex(TOKEN.lower(), [BASE_DEEP]).select("solana") is None
+
+
+def test_group_pairs_assigns_pairs_by_base_token():
+    grouped = group_pairs([TOKEN, "UsdcMint"], [[QUOTE_SIDE, BASE_SHALLOW], [BASE_DEEP]])
+    assert grouped == {TOKEN: [BASE_SHALLOW, BASE_DEEP], "UsdcMint": [QUOTE_SIDE]}
@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+import pytest
+
+import asgi
+from Liquidity_Monitoring_agent import app, parse_portfolio_tokens
+
+BAD_BODIES = [
+    [["solana", "abc"]],                           # a bare list, not {"tokens": [...]}
+    {"tokens": [["solana", ["abc"]]]},             # unhashable address
+    {"tokens": [{"chain_id": 1, "token_address": "abc"}]},
+    {"tokens": [{"chain_id": "solana", "token_address": ""}]},
+    {"tokens": ["abc"]},
+    {"tokens": "abc"},
+    {"tokens": []}
+]
+
+
+def test_parse_accepts_both_item_shapes_and_dedupes():
+    tokens, error = parse_portfolio_tokens({"tokens": [{"token_address": "abc"}, ["solana", "abc"], ["bsc", "0x1"]]})
+    assert error is None
+    assert tokens == [("solana", "abc"), ("bsc", "0x1")]
+
+
+@pytest.mark.parametrize("body", BAD_BODIES)
+def test_flask_rejects_malformed_bodies(body):
+    response = app.test_client().post("/get_tokens", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("body", BAD_BODIES)
+def test_asgi_rejects_malformed_bodies(body):
+    reply = asyncio.run(asgi.get_tokens({}, json.dumps(body).encode()))
+    assert reply.status == 400
+    assert "error" in json.loads(reply.body)
+
+
+def make_pair(chain_id: str, base: str, quote: str, liquidity: float) -> dict:
+    return {"chainId": chain_id, "dexId": "raydium", "pairAddress": f"{base}-{quote}", "priceUsd": "1.5",
+            "baseToken": {"address": base, "name": base, "symbol": base.upper()},
+            "quoteToken": {"address": quote, "name": quote, "symbol": quote.upper()},
+            "liquidity": {"usd": liquidity}}
+
+
+def test_get_token_data_batch_returns_one_entry_per_address(monkeypatch):
+    import Liquidity_Monitoring_agent as agent
+
+    requested = []
+
+    def fetch_pairs(addresses):
+        requested.append(list(addresses))
+        return agent.dex_client.group_pairs(list(dict.fromkeys(addresses)), [[
+            make_pair("solana", "abc", "usdc", 1e5),
+            make_pair("solana", "abc", "sol", 1e6),
+            make_pair("bsc", "def", "usdt", 1e5)
+        ]])
+
+    monkeypatch.setattr(agent.dex_client, "fetch_pairs", fetch_pairs)
+    results = agent.get_token_data_batch("solana", ["abc", "def", "abc"])
+
+    assert requested == [["abc", "def", "abc"]]
+    assert set(results) == {"abc", "def"}
+    assert results["abc"]["pair_address"] == "abc-sol"
+    assert results["def"] is None  # only listed on another chain
+    assert agent.get_market_depth("solana", "abc")["pools"] == 2
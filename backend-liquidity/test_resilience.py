@@ -0,0 +1,174 @@
+import time
+
+import pytest
+import requests
+
+from ratelimit import TokenBucket
+from resilience import CircuitBreaker, CircuitOpenError, RateLimitedError, ResilientClient, RetryBudget
+
+HOST = "api.example"
+URL = f"https://{HOST}/latest/dex/tokens/abc"
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}", response=self)
+
+
+class FakeSession:
+    """Replies with the queued statuses or responses in order; an exception instance is raised."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    def get(self, url, timeout):
+        self.calls.append(timeout)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply if isinstance(reply, FakeResponse) else FakeResponse(reply)
+
+
+def make_client(session, **kwargs) -> ResilientClient:
+    client = ResilientClient(session, max_retries=0, **kwargs)
+    client.breakers[HOST] = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    return client
+
+
+# ---------- CircuitBreaker ----------
+def test_breaker_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 1
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_probe_success_closes_and_failure_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 2
+
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+    assert breaker.allow() and breaker.allow()
+
+
+def test_breaker_release_probe_allows_another_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+# ---------- ResilientClient ----------
+def test_429_on_half_open_probe_does_not_wedge_breaker():
+    session = FakeSession(requests.ConnectionError(), requests.ConnectionError(), 429, 200)
+    client = make_client(session)
+
+    # open
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            client.get(URL)
+    assert client.breakers[HOST].state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        client.get(URL)
+
+    # half-open probe answered with 429
+    time.sleep(0.06)
+    with pytest.raises(RateLimitedError):
+        client.get(URL)
+
+    # the next call probes again and recovers
+    assert client.get(URL).status_code == 200
+    assert client.breakers[HOST].state == CircuitBreaker.CLOSED
+
+
+def test_retry_after_blocks_host():
+    client = make_client(FakeSession(FakeResponse(429, {"Retry-After": "30"})))
+    with pytest.raises(RateLimitedError):
+        client.get(URL)
+    with pytest.raises(RateLimitedError, match="rate limited for another"):
+        client.get(URL)
+
+
+def test_5xx_counts_as_breaker_failure():
+    client = make_client(FakeSession(503, 502))
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            client.get(URL)
+    assert client.breakers[HOST].state == CircuitBreaker.OPEN
+
+
+def test_spent_deadline_stops_before_attempting():
+    session = FakeSession(200)
+    client = make_client(session, deadline=0.01)
+    time.sleep(0.001)
+    client.MIN_ATTEMPT_TIMEOUT = 1.0
+    with pytest.raises(requests.Timeout):
+        client.get(URL)
+    assert session.calls == []
+
+
+def test_attempt_timeouts_stay_positive():
+    session = FakeSession(503, 503, 200)
+    client = ResilientClient(session, deadline=0.3, max_retries=2, backoff_base=0.01,
+                             retry_budget=RetryBudget(min_per_second=100))
+    client.get(URL)
+    assert all(connect > 0 and read > 0 for connect, read in session.calls)
+
+
+def test_local_rate_limit_on_half_open_probe_does_not_wedge_breaker():
+    session = FakeSession(requests.ConnectionError(), requests.ConnectionError(), 200)
+    bucket = TokenBucket(rate=0, capacity=2)
+    client = make_client(session, rate_limiter=bucket, deadline=0.2)
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            client.get(URL)
+
+    # The probe is refused by the local budget before reaching the host
+    time.sleep(0.06)
+    with pytest.raises(RateLimitedError, match="local request budget"):
+        client.get(URL)
+    assert client.breakers[HOST].state == CircuitBreaker.HALF_OPEN
+
+    bucket.rate = 1000
+    assert client.get(URL).status_code == 200
+    assert client.breakers[HOST].state == CircuitBreaker.CLOSED
+
+
+def test_local_rate_limit_wait_counts_against_deadline():
+    session = FakeSession(200)
+    client = make_client(session, rate_limiter=TokenBucket(rate=0.01, capacity=1), deadline=0.1)
+    client.get(URL)
+    start = time.monotonic()
+    with pytest.raises(RateLimitedError):
+        client.get(URL)
+    assert time.monotonic() - start < 0.5
@@ -0,0 +1,57 @@
+import pytest
+
+from scheduler import AdaptivePolicy, MonitoredToken, MonitoringScheduler
+
+
+def make_scheduler(policy: AdaptivePolicy, activity=None) -> MonitoringScheduler:
+    return MonitoringScheduler(lambda chain_id, token_address: None, policy=policy,
+                               activity=activity, jitter=0)
+
+
+def tick_all(scheduler: MonitoringScheduler, rounds: int) -> None:
+    # What _run does after each tick, without the threads
+    for _ in range(rounds):
+        for token in list(scheduler.tokens.values()):
+            scheduler._adapt(token, None)
+
+
+def test_policy_tightens_hot_tokens_and_backs_off_idle_ones():
+    policy = AdaptivePolicy(min_interval=5, max_interval=300)
+    token = MonitoredToken("solana", "abc", 20)
+    assert policy.next_interval(token, 2.0, 0.05) == 10
+    assert policy.next_interval(token, 0.0, 0.05) == 40
+    assert policy.next_interval(token, None, 0.05) == 20
+
+
+def test_tightening_is_capped_by_poll_budget():
+    policy = AdaptivePolicy(min_interval=1, poll_budget=1.0)
+    token = MonitoredToken("solana", "abc", 10)
+    # Other tokens already use 0.85 polls/s, leaving 0.15 for this one
+    assert policy.next_interval(token, 2.0, 0.95) == pytest.approx(1 / 0.15)
+
+
+def test_base_intervals_over_budget_are_scaled_up():
+    budget = 2.0
+    scheduler = make_scheduler(AdaptivePolicy(max_interval=300, poll_budget=budget))
+    for i in range(10):
+        scheduler.add_token("solana", f"token{i}", interval=1)
+    # 10 polls/s of base intervals against a budget of 2
+    assert scheduler.total_rate == pytest.approx(budget)
+    assert all(token.interval == pytest.approx(5) for token in scheduler.tokens.values())
+    assert all(token.base_interval == 1 for token in scheduler.tokens.values())
+
+    # Ticks with moderate activity relax toward base, but only into spare budget
+    scheduler.activity = lambda token_key, result: 0.5
+    tick_all(scheduler, rounds=3)
+    assert scheduler.total_rate <= budget + 1e-9
+
+
+def test_hot_tokens_cannot_push_rate_over_budget():
+    budget = 0.5
+    scheduler = make_scheduler(AdaptivePolicy(min_interval=1, poll_budget=budget),
+                               activity=lambda token_key, result: 5.0)
+    for i in range(5):
+        scheduler.add_token("solana", f"token{i}", interval=20)
+
+    tick_all(scheduler, rounds=10)
+    assert scheduler.total_rate <= budget + 1e-9
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+
+import pytest
+
+from shared_cache import CacheBackend, FileBackend, Lease, MemoryBackend, SharedCache
+
+
+def test_cache_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+
+# ---------- FileBackend ----------
+def test_file_backend_round_trip_and_expiry(tmp_path):
+    backend = FileBackend(tmp_path)
+    backend.set("a", b"value", ttl=60)
+    assert backend.get("a") == b"value"
+
+    backend.set("b", b"value", ttl=0.01)
+    time.sleep(0.02)
+    assert backend.get("b") is None
+    # The expired file is gone, not just ignored
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_file_backend_add_is_set_if_absent(tmp_path):
+    backend = FileBackend(tmp_path)
+    assert backend.add("lock", b"1", ttl=60)
+    assert not backend.add("lock", b"1", ttl=60)
+    backend.delete("lock")
+    assert backend.add("lock", b"1", ttl=60)
+
+
+def test_file_backend_add_takes_over_expired_lock(tmp_path):
+    backend = FileBackend(tmp_path)
+    assert backend.add("lock", b"1", ttl=0.01)
+    time.sleep(0.02)
+    assert backend.add("lock", b"2", ttl=60)
+    assert backend.get("lock") == b"2"
+
+
+def test_file_backend_sweeps_unread_expired_entries(tmp_path):
+    backend = FileBackend(tmp_path, sweep_every=3)
+    backend.set("old-1", b"x", ttl=0.01)
+    backend.set("old-2", b"x", ttl=0.01)
+    time.sleep(0.02)
+    backend.set("fresh", b"x", ttl=60)  # third set triggers the sweep
+    assert os.listdir(tmp_path) == [backend._path("fresh").name]
+
+
+def test_file_backend_sweep_removes_abandoned_temp_files(tmp_path):
+    backend = FileBackend(tmp_path, stale_tmp_age=0)
+    (tmp_path / "deadbeef.1.2.tmp").write_bytes(b"partial")
+    time.sleep(0.01)
+    assert backend.sweep() == 1
+    assert os.listdir(tmp_path) == []
+
+
+def test_file_backend_leaves_lock_being_written_alone(tmp_path):
+    backend = FileBackend(tmp_path)
+    # add() has created the file but not written the expiry yet
+    backend._path("lock").touch()
+    assert backend.get("lock") is None
+    assert backend.sweep() == 0
+    assert backend._path("lock").exists()
+
+
+# ---------- SharedCache ----------
+def test_get_or_compute_caches_the_value():
+    cache = SharedCache(MemoryBackend())
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"price": 1.5}
+
+    assert cache.get_or_compute("k", 60, compute) == {"price": 1.5}
+    assert cache.get_or_compute("k", 60, compute) == {"price": 1.5}
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_get_or_compute_waits_for_the_lock_holder(tmp_path):
+    backend = FileBackend(tmp_path)
+    cache = SharedCache(backend, wait=1.0, poll=0.01)
+    # Another worker holds the lock and publishes the value shortly
+    backend.add(cache._key("lock:k"), b"1", ttl=5)
+
+    def publish():
+        time.sleep(0.05)
+        cache.set("k", [1, 2], 60)
+
+    publisher = threading.Thread(target=publish)
+    publisher.start()
+    assert cache.get_or_compute("k", 60, lambda: pytest.fail("computed while locked")) == [1, 2]
+    publisher.join()
+    assert cache.waited == 1
+
+
+# ---------- Lease ----------
+def make_leases(tmp_path, ttl=60.0):
+    cache = SharedCache(FileBackend(tmp_path))
+    first, second = Lease(cache, "scheduler", ttl), Lease(cache, "scheduler", ttl)
+    second.owner = b"other-worker"
+    return first, second
+
+
+def test_lease_has_one_holder_until_released(tmp_path):
+    first, second = make_leases(tmp_path)
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    assert first.try_acquire()  # renewal
+    first.release()
+    assert second.try_acquire()
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    first, second = make_leases(tmp_path, ttl=0.05)
+    assert first.try_acquire()
+    time.sleep(0.06)
+    assert second.try_acquire()
+    assert not first.try_acquire()
+
+
+def test_lease_callbacks_follow_the_holder(tmp_path):
+    first, second = make_leases(tmp_path, ttl=0.06)
+    events = []
+    first.try_acquire()
+    second.start(lambda: events.append("acquired"), lambda: events.append("lost"))
+    time.sleep(0.05)
+    assert events == []
+
+    first.release()
+    deadline = time.monotonic() + 1
+    while not events and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert events == ["acquired"]
+    second.release()
+
+
+def test_in_process_lease_is_always_held():
+    assert Lease(SharedCache(MemoryBackend()), "scheduler").try_acquire()
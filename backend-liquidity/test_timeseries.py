@@ -0,0 +1,133 @@
+import math
+
+import numpy as np
+import pytest
+
+from timeseries import PriceRing, SeriesStore
+
+TOKEN = "solana-abc"
+
+
+# ---------- SeriesStore ----------
+def test_append_rolls_segments_and_reads_ranges(tmp_path):
+    store = SeriesStore(tmp_path, segment_records=4)
+    for i in range(10):
+        store.append(TOKEN, 100.0 + i, 1.0 + i, 10.0, 1000.0)
+
+    assert len(store.segments(TOKEN)) == 3
+    assert store.read_array(TOKEN)["timestamp"].tolist() == [100.0 + i for i in range(10)]
+    assert store.read_array(TOKEN, start=103, end=106)["price"].tolist() == [4.0, 5.0, 6.0]
+    assert store.last(TOKEN)["price"] == 10.0
+    assert store.tokens() == [TOKEN]
+
+
+def test_reopen_drops_torn_record(tmp_path):
+    store = SeriesStore(tmp_path)
+    store.append(TOKEN, 1.0, 1.0, 1.0, 1.0)
+    segment = next((tmp_path / TOKEN).glob("seg-*.bin"))
+    with open(segment, "ab") as f:
+        f.write(b"\x00" * 5)
+
+    reopened = SeriesStore(tmp_path)
+    reopened.append(TOKEN, 2.0, 2.0, 2.0, 2.0)
+    assert reopened.read_array(TOKEN)["timestamp"].tolist() == [1.0, 2.0]
+
+
+def test_compact_merges_sealed_segments_and_applies_retention(tmp_path):
+    store = SeriesStore(tmp_path, segment_records=2, retention=5)
+    for i in range(7):
+        store.append(TOKEN, float(i), 1.0, 1.0, 1.0)
+
+    dropped = store.compact(TOKEN, now=8.0)
+    assert dropped == 3
+    assert len(store.segments(TOKEN)) == 2
+    assert store.read_array(TOKEN)["timestamp"].tolist() == [3.0, 4.0, 5.0, 6.0]
+
+
+def test_summary(tmp_path):
+    store = SeriesStore(tmp_path)
+    for i, price in enumerate([2.0, 3.0, 1.0, 2.5]):
+        store.append(TOKEN, float(i), price, 10.0 * (i + 1), 500.0 - i)
+    summary = store.summary(TOKEN)
+    assert summary["price"] == {"open": 2.0, "high": 3.0, "low": 1.0, "close": 2.5}
+    assert summary["liquidity"]["last"] == 497.0
+    assert store.summary("solana-missing") is None
+
+
+def test_legacy_segments_are_migrated_to_the_new_layout(tmp_path):
+    old = np.dtype([("timestamp", "<f8"), ("price", "<f8")])
+    new = np.dtype([("timestamp", "<f8"), ("price", "<f8"), ("buys", "<f8")])
+    directory = tmp_path / TOKEN
+    directory.mkdir()
+    np.array([(1.0, 2.0), (3.0, 4.0)], dtype=old).tofile(directory / "seg-00000000.bin")
+
+    store = SeriesStore(tmp_path, dtype=new, legacy_dtype=old)
+    store.append(TOKEN, 5.0, 6.0, 7.0)
+    rows = store.read_array(TOKEN)
+    assert rows.tolist() == [(1.0, 2.0, 0.0), (3.0, 4.0, 0.0), (5.0, 6.0, 7.0)]
+    # Recorded, so the next store does not migrate again
+    assert SeriesStore(tmp_path, dtype=new).read_array(TOKEN).tolist() == rows.tolist()
+
+
+def test_incompatible_layout_is_rejected(tmp_path):
+    SeriesStore(tmp_path).append(TOKEN, 1.0, 1.0, 1.0, 1.0)
+    narrower = np.dtype([("timestamp", "<f8"), ("price", "<f8")])
+    with pytest.raises(ValueError):
+        SeriesStore(tmp_path, dtype=narrower).read_array(TOKEN)
+
+
+# ---------- PriceRing ----------
+def reference_stats(prices, volumes):
+    returns = np.diff(np.log(prices))
+    return {
+        "vwap": float(np.dot(prices, volumes) / np.sum(volumes)),
+        "volatility_per_tick_pct": float(np.std(returns, ddof=1) * 100),
+        "max_drawdown_pct": float((1 - prices / np.maximum.accumulate(prices)).max() * 100)
+    }
+
+
+def test_rolling_stats_match_a_full_recompute_after_wrapping():
+    rng = np.random.default_rng(1)
+    prices = np.exp(np.cumsum(rng.normal(0, 0.02, 50)))
+    volumes = rng.uniform(1, 100, 50)
+    ring = PriceRing(capacity=20)
+    for t, (price, volume) in enumerate(zip(prices, volumes)):
+        ring.append(float(t), float(price), float(volume))
+
+    stats = ring.stats()
+    expected = reference_stats(prices[-20:], volumes[-20:])
+    assert stats["samples"] == 20
+    for name, value in expected.items():
+        assert stats[name] == pytest.approx(value)
+    assert ring.ordered(ring.price).tolist() == prices[-20:].tolist()
+
+
+def test_state_round_trip_and_resize():
+    ring = PriceRing(capacity=8)
+    for t in range(12):
+        ring.append(float(t), 1.0 + t % 3, 5.0)
+
+    restored = PriceRing.from_state(ring.to_state())
+    assert restored.points() == ring.points()
+    assert restored.stats() == pytest.approx(ring.stats())
+
+    smaller = PriceRing.from_state(ring.to_state(), capacity=4)
+    assert [p["timestamp"] for p in smaller.points()] == [8.0, 9.0, 10.0, 11.0]
+    assert smaller.last_timestamp == 11.0
+
+
+def test_empty_ring_round_trip():
+    restored = PriceRing.from_state(PriceRing(capacity=8).to_state())
+    assert len(restored) == 0
+    assert restored.stats() == {"samples": 0}
+    restored.append(1.0, 2.0, 3.0)
+    assert restored.stats()["price"] == 2.0
+    assert len(PriceRing.from_state(PriceRing(capacity=8).to_state(), capacity=4)) == 0
+
+
+def test_zero_prices_contribute_no_returns():
+    ring = PriceRing(capacity=4)
+    for t, price in enumerate([1.0, 0.0, 2.0, 2.2]):
+        ring.append(float(t), price, 1.0)
+    assert ring.n_returns == 1
+    assert ring.return_sum == pytest.approx(math.log(1.1))
@@ -0,0 +1,21 @@
+import pytest
+
+from token_data import CompactTokenData
+
+
+def make_pair(price_usd: str, price_native: str) -> dict:
+    return {"chainId": "solana", "dexId": "raydium", "pairAddress": "pair",
+            "baseToken": {"address": "abc", "name": "Abc", "symbol": "ABC"},
+            "quoteToken": {"address": "sol", "name": "Solana", "symbol": "SOL"},
+            "priceUsd": price_usd, "priceNative": price_native, "liquidity": {"usd": 1000}}
+
+
+@pytest.mark.parametrize("price", ["0.00001234", "0.000000004567", "1.5", "123456.789"])
+def test_prices_round_trip_as_plain_decimals(price):
+    token = CompactTokenData.from_pair(make_pair(price, price))
+    restored = CompactTokenData.from_state(token.to_state())
+    for data in (token, restored, token.to_dict()):
+        assert data["price_usd"] == price
+        assert data["price_native"] == price
+        assert "e" not in data["price_usd"].lower()
+    assert float(token["price_usd"]) == token.price_usd == float(price)
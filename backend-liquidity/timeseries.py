@@ -0,0 +1,441 @@
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Fixed-width little-endian record: 32 bytes per tick
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("price", "<f8"),
+    ("volume", "<f8"),
+    ("liquidity", "<f8")
+])
+
+# Per-token file recording the dtype its segments were written with
+LAYOUT_FILE = "layout.json"
+
+
+class SeriesStore:
+    """Append-only, segment-based per-token time-series store.
+
+    Each token gets a directory of `seg-XXXXXXXX.bin` files holding packed
+    rows of `dtype` (RECORD_DTYPE unless given; the first field is the
+    timestamp). Appends write one record to the active segment; reads
+    memory-map segments and return NumPy views, so a range read copies nothing.
+    Compaction merges sealed segments and drops rows older than the retention.
+
+    Each token directory records its row layout in layout.json. A directory
+    written with another layout is migrated on first use when every old field
+    is still in `dtype` (added fields are zero), and rejected otherwise.
+    Segments from before layouts were recorded are read as `legacy_dtype`.
+    """
+
+    def __init__(self, root: Path, segment_records: int = 65536, max_segments: int = 8,
+                 retention: Optional[float] = None, dtype: np.dtype = RECORD_DTYPE,
+                 legacy_dtype: Optional[np.dtype] = None):
+        self.root = Path(root)
+        self.dtype = np.dtype(dtype)
+        self.legacy_dtype = np.dtype(legacy_dtype) if legacy_dtype is not None else self.dtype
+        self.segment_records = segment_records
+        self.max_segments = max_segments
+        self.retention = retention
+        self._active: Dict[str, Tuple[int, int]] = {}   # token_key -> (segment id, records)
+        self._maps: Dict[Path, np.ndarray] = {}          # sealed segment memmaps
+        self._checked: Set[Path] = set()                 # directories whose layout matches dtype
+        self._lock = threading.RLock()
+
+    # ---------- Layout ----------
+    def _dir(self, token_key: str) -> Path:
+        return self.root / token_key.replace("/", "_")
+
+    @staticmethod
+    def _segment_path(directory: Path, segment_id: int) -> Path:
+        return directory / f"seg-{segment_id:08d}.bin"
+
+    def tokens(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def _segment_ids(self, directory: Path) -> List[int]:
+        if not directory.exists():
+            return []
+        return sorted(int(p.stem[4:]) for p in directory.glob("seg-*.bin"))
+
+    @staticmethod
+    def _write_layout(directory: Path, dtype: np.dtype) -> None:
+        tmp = directory / f"{LAYOUT_FILE}.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps(dtype.descr))
+        os.replace(tmp, directory / LAYOUT_FILE)
+
+    def _check_layout(self, directory: Path) -> None:
+        """Make sure the segments in `directory` hold `dtype` rows, migrating an older layout."""
+        if directory in self._checked or not directory.exists():
+            return
+        layout_path = directory / LAYOUT_FILE
+        migrated = sorted(directory.glob("seg-*.bin.migrated"))
+        if layout_path.exists():
+            layout = np.dtype([tuple(field) for field in json.loads(layout_path.read_text())])
+            # A migration that stopped after recording the new layout: finish swapping segments in
+            for path in migrated:
+                os.replace(path, path.with_suffix(""))
+        else:
+            # Converted segments without a recorded layout are from a migration that never finished
+            for path in migrated:
+                path.unlink()
+            layout = self.legacy_dtype if self._segment_ids(directory) else self.dtype
+
+        if layout != self.dtype:
+            missing = [name for name in layout.names if name not in self.dtype.names]
+            if missing:
+                raise ValueError(f"{directory} holds rows with fields {missing} that {self.dtype} lacks")
+            paths = [self._segment_path(directory, segment_id) for segment_id in self._segment_ids(directory)]
+            for path in paths:
+                count = path.stat().st_size // layout.itemsize
+                old = np.fromfile(path, dtype=layout, count=count)
+                rows = np.zeros(count, dtype=self.dtype)
+                for name in layout.names:
+                    rows[name] = old[name]
+                rows.tofile(path.with_name(path.name + ".migrated"))
+            # Recording the layout commits the migration; the swaps below are redone after a crash
+            self._write_layout(directory, self.dtype)
+            for path in paths:
+                self._maps.pop(path, None)
+                os.replace(path.with_name(path.name + ".migrated"), path)
+        elif not layout_path.exists():
+            self._write_layout(directory, self.dtype)
+        self._checked.add(directory)
+
+    def _open_active(self, token_key: str) -> Tuple[int, int]:
+        state = self._active.get(token_key)
+        if state is not None:
+            return state
+
+        directory = self._dir(token_key)
+        directory.mkdir(parents=True, exist_ok=True)
+        self._check_layout(directory)
+        ids = self._segment_ids(directory)
+        segment_id = ids[-1] if ids else 0
+        path = self._segment_path(directory, segment_id)
+        size = path.stat().st_size if path.exists() else 0
+        # Drop a torn trailing record left by a crash mid-append
+        if size % self.dtype.itemsize:
+            size -= size % self.dtype.itemsize
+            os.truncate(path, size)
+        state = (segment_id, size // self.dtype.itemsize)
+        self._active[token_key] = state
+        return state
+
+    # ---------- Writes ----------
+    def append(self, token_key: str, timestamp: float, *values: float) -> None:
+        """Append one row: timestamp then the remaining dtype fields in order
+        (price, volume, liquidity for RECORD_DTYPE)."""
+        record = np.array([(timestamp, *values)], dtype=self.dtype).tobytes()
+        with self._lock:
+            segment_id, records = self._open_active(token_key)
+            if records >= self.segment_records:
+                segment_id, records = segment_id + 1, 0
+            path = self._segment_path(self._dir(token_key), segment_id)
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, record)
+            finally:
+                os.close(fd)
+            self._active[token_key] = (segment_id, records + 1)
+
+    # ---------- Reads ----------
+    def _map(self, path: Path, sealed: bool) -> np.ndarray:
+        if sealed and path in self._maps:
+            return self._maps[path]
+        count = path.stat().st_size // self.dtype.itemsize
+        if count == 0:
+            return np.empty(0, dtype=self.dtype)
+        mapped = np.memmap(path, dtype=self.dtype, mode="r", shape=(count,))
+        if sealed:
+            self._maps[path] = mapped
+        return mapped
+
+    def segments(self, token_key: str) -> List[np.ndarray]:
+        directory = self._dir(token_key)
+        with self._lock:
+            self._check_layout(directory)
+            ids = self._segment_ids(directory)
+            return [self._map(self._segment_path(directory, segment_id), sealed=i < len(ids) - 1)
+                    for i, segment_id in enumerate(ids)]
+
+    def read(self, token_key: str, start: Optional[float] = None, end: Optional[float] = None) -> List[np.ndarray]:
+        """Return zero-copy views of every segment slice with start <= timestamp < end."""
+        views = []
+        for segment in self.segments(token_key):
+            if not len(segment):
+                continue
+            timestamps = segment["timestamp"]
+            lo = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+            hi = len(segment) if end is None else int(np.searchsorted(timestamps, end, side="left"))
+            if lo < hi:
+                views.append(segment[lo:hi])
+        return views
+
+    def read_array(self, token_key: str, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        views = self.read(token_key, start, end)
+        if len(views) == 1:
+            return views[0]
+        return np.concatenate(views) if views else np.empty(0, dtype=self.dtype)
+
+    def last(self, token_key: str) -> Optional[np.void]:
+        for segment in reversed(self.segments(token_key)):
+            if len(segment):
+                return segment[-1]
+        return None
+
+    # ---------- Compaction ----------
+    def compact(self, token_key: str, now: Optional[float] = None) -> int:
+        """Merge sealed segments into one and apply retention. Returns rows dropped."""
+        directory = self._dir(token_key)
+        with self._lock:
+            self._check_layout(directory)
+            ids = self._segment_ids(directory)
+            sealed = ids[:-1]
+            if not sealed:
+                return 0
+
+            paths = [self._segment_path(directory, segment_id) for segment_id in sealed]
+            merged = np.concatenate([np.fromfile(path, dtype=self.dtype) for path in paths])
+            before = len(merged)
+            if self.retention is not None:
+                cutoff = (now or time.time()) - self.retention
+                merged = merged[merged["timestamp"] >= cutoff]
+
+            target = paths[0]
+            tmp = target.with_suffix(".tmp")
+            merged.tofile(tmp)
+            os.replace(tmp, target)
+            for path in paths:
+                self._maps.pop(path, None)
+            for path in paths[1:]:
+                path.unlink()
+            if not len(merged):
+                target.unlink()
+            return before - len(merged)
+
+    def maybe_compact(self, token_key: str) -> int:
+        # Segment count only changes when an append opens a new segment
+        state = self._active.get(token_key)
+        if state is not None and state[1] != 1:
+            return 0
+        if len(self._segment_ids(self._dir(token_key))) > self.max_segments:
+            return self.compact(token_key)
+        return 0
+
+    # ---------- Export ----------
+    def summary(self, token_key: str, start: Optional[float] = None, end: Optional[float] = None) -> Optional[Dict]:
+        rows = self.read_array(token_key, start, end)
+        if not len(rows):
+            return None
+        prices = rows["price"]
+        return {
+            "from": float(rows["timestamp"][0]),
+            "to": float(rows["timestamp"][-1]),
+            "points": int(len(rows)),
+            "price": {
+                "open": float(prices[0]),
+                "high": float(prices.max()),
+                "low": float(prices.min()),
+                "close": float(prices[-1])
+            },
+            "volume_h1": {"avg": float(rows["volume"].mean()), "max": float(rows["volume"].max())},
+            "liquidity": {
+                "min": float(rows["liquidity"].min()),
+                "max": float(rows["liquidity"].max()),
+                "last": float(rows["liquidity"][-1])
+            }
+        }
+
+
+class PriceRing:
+    """Preallocated ring buffer of (timestamp, price, volume) with rolling stats.
+
+    Sums for log returns, price*volume and volume are maintained incrementally
+    as points enter and leave the window, so VWAP, realized volatility and the
+    volume z-score are O(1) per append; drawdown is one vectorized pass.
+    """
+
+    # Recompute the running sums from the arrays this often to bound float drift
+    RESYNC_EVERY = 4096
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.timestamp = np.zeros(capacity)
+        self.price = np.zeros(capacity)
+        self.volume = np.zeros(capacity)
+        self.log_return = np.zeros(capacity)
+        self.has_return = np.zeros(capacity, dtype=bool)
+        self.size = 0
+        self.head = 0
+        self._appends = 0
+        self._reset_sums()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _reset_sums(self) -> None:
+        self.n_returns = 0
+        self.return_sum = 0.0
+        self.return_sq = 0.0
+        self.pv_sum = 0.0
+        self.volume_sum = 0.0
+        self.volume_sq = 0.0
+
+    def _resync(self) -> None:
+        mask = self.has_return[:self.size] if self.size < self.capacity else self.has_return
+        returns = (self.log_return[:self.size] if self.size < self.capacity else self.log_return)[mask]
+        prices = self.price[:self.size]
+        volumes = self.volume[:self.size]
+        self.n_returns = int(len(returns))
+        self.return_sum = float(returns.sum())
+        self.return_sq = float((returns ** 2).sum())
+        self.pv_sum = float((prices * volumes).sum())
+        self.volume_sum = float(volumes.sum())
+        self.volume_sq = float((volumes ** 2).sum())
+
+    def append(self, timestamp: float, price: float, volume: float) -> None:
+        idx = self.head
+        if self.size == self.capacity:
+            # Evict the oldest point from the running sums
+            if self.has_return[idx]:
+                self.n_returns -= 1
+                self.return_sum -= self.log_return[idx]
+                self.return_sq -= self.log_return[idx] ** 2
+            self.pv_sum -= self.price[idx] * self.volume[idx]
+            self.volume_sum -= self.volume[idx]
+            self.volume_sq -= self.volume[idx] ** 2
+
+        previous = self.price[idx - 1] if self.size else 0.0
+        if self.size and previous > 0 and price > 0:
+            log_return = math.log(price / previous)
+            self.log_return[idx] = log_return
+            self.has_return[idx] = True
+            self.n_returns += 1
+            self.return_sum += log_return
+            self.return_sq += log_return ** 2
+        else:
+            self.log_return[idx] = 0.0
+            self.has_return[idx] = False
+        # The oldest point in a full window has no predecessor inside it
+        if self.size == self.capacity:
+            oldest = (idx + 1) % self.capacity
+            if self.has_return[oldest]:
+                self.has_return[oldest] = False
+                self.n_returns -= 1
+                self.return_sum -= self.log_return[oldest]
+                self.return_sq -= self.log_return[oldest] ** 2
+
+        self.timestamp[idx] = timestamp
+        self.price[idx] = price
+        self.volume[idx] = volume
+        self.pv_sum += price * volume
+        self.volume_sum += volume
+        self.volume_sq += volume ** 2
+
+        self.head = (idx + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self._appends += 1
+        if self._appends % self.RESYNC_EVERY == 0:
+            self._resync()
+
+    @property
+    def last_timestamp(self) -> float:
+        return float(self.timestamp[(self.head - 1) % self.capacity]) if self.size else 0.0
+
+    def to_state(self) -> Dict:
+        """Raw arrays (only the filled prefix until the ring wraps) for checkpoints.
+
+        Log returns are derived from prices, so they are rebuilt on load rather than stored.
+        """
+        n = self.capacity if self.size == self.capacity else self.size
+        return {
+            "capacity": self.capacity, "size": self.size, "head": self.head, "appends": self._appends,
+            "last_timestamp": self.last_timestamp,
+            "timestamp": self.timestamp[:n].tobytes(), "price": self.price[:n].tobytes(),
+            "volume": self.volume[:n].tobytes()
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict, capacity: Optional[int] = None) -> "PriceRing":
+        ring = cls(state["capacity"])
+        n = len(state["price"]) // 8
+        ring.timestamp[:n] = np.frombuffer(state["timestamp"])
+        ring.price[:n] = np.frombuffer(state["price"])
+        ring.volume[:n] = np.frombuffer(state["volume"])
+        # Same rule as append(): a return needs a positive predecessor, and the
+        # first point (or the oldest, once wrapped) has none
+        prices = ring.price[:n]
+        previous = np.roll(prices, 1)
+        valid = (prices > 0) & (previous > 0)
+        if n:
+            valid[state["head"] % ring.capacity if n == ring.capacity else 0] = False
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ring.log_return[:n] = np.where(valid, np.log(prices / previous), 0.0)
+        ring.has_return[:n] = valid
+        ring.size, ring.head, ring._appends = state["size"], state["head"], state["appends"]
+        ring._resync()
+        if capacity is not None and capacity != ring.capacity:
+            # Capacity changed between runs: replay the newest points into a ring of the new size
+            resized = cls(capacity)
+            for t, p, v in zip(ring.ordered(ring.timestamp), ring.ordered(ring.price), ring.ordered(ring.volume)):
+                resized.append(float(t), float(p), float(v))
+            return resized
+        return ring
+
+    def ordered(self, column: np.ndarray) -> np.ndarray:
+        """Column in chronological order (a view unless the ring has wrapped)."""
+        if self.size < self.capacity:
+            return column[:self.size]
+        return np.concatenate((column[self.head:], column[:self.head]))
+
+    def points(self) -> List[Dict]:
+        return [
+            {"timestamp": float(t), "price": float(p), "volume": float(v)}
+            for t, p, v in zip(self.ordered(self.timestamp), self.ordered(self.price), self.ordered(self.volume))
+        ]
+
+    def stats(self) -> Dict:
+        if not self.size:
+            return {"samples": 0}
+
+        last = (self.head - 1) % self.capacity
+        stats = {"samples": self.size, "price": float(self.price[last])}
+
+        # Realized volatility from log returns, scaled to a 6h horizon
+        if self.n_returns >= 2:
+            mean = self.return_sum / self.n_returns
+            variance = max(0.0, (self.return_sq - self.n_returns * mean ** 2) / (self.n_returns - 1))
+            span = self.timestamp[last] - self.timestamp[self.head if self.size == self.capacity else 0]
+            tick = span / (self.size - 1) if self.size > 1 and span > 0 else None
+            stats["volatility_per_tick_pct"] = math.sqrt(variance) * 100
+            stats["realized_volatility_6h_pct"] = (
+                math.sqrt(variance * 21600 / tick) * 100 if tick else None
+            )
+
+        if self.volume_sum > 0:
+            stats["vwap"] = self.pv_sum / self.volume_sum
+
+        mean_volume = self.volume_sum / self.size
+        volume_var = max(0.0, self.volume_sq / self.size - mean_volume ** 2)
+        stats["volume_zscore"] = (
+            (self.volume[last] - mean_volume) / math.sqrt(volume_var) if volume_var > 0 else 0.0
+        )
+
+        prices = self.ordered(self.price)
+        running_max = np.maximum.accumulate(prices)
+        valid = running_max > 0
+        drawdowns = np.zeros_like(prices)
+        drawdowns[valid] = 1 - prices[valid] / running_max[valid]
+        stats["drawdown_pct"] = float(drawdowns[-1] * 100)
+        stats["max_drawdown_pct"] = float(drawdowns.max() * 100)
+        return stats
@@ -0,0 +1,161 @@
+import json
+from array import array
+from collections.abc import Mapping
+from decimal import Decimal
+from typing import Any, Dict, Iterator, Optional
+
+# Offsets into CompactTokenData._num; every numeric field is parsed once into one packed array
+_PRICE_NATIVE, _PRICE_USD = 0, 1
+_VOLUME = {"h24": 2, "h6": 3, "h1": 4, "m5": 5}
+_PRICE_CHANGE = {"m5": 6, "h1": 7, "h6": 8, "h24": 9}
+_LIQUIDITY = {"usd": 10, "base": 11, "quote": 12}
+_FDV, _MARKET_CAP, _PAIR_CREATED_AT = 13, 14, 15
+_TXNS = {"m5": 16, "h1": 18, "h6": 20, "h24": 22}  # buys at offset, sells at offset + 1
+_NUMERIC_FIELDS = 24
+
+KEYS = (
+    "chain_id", "dex_id", "url", "pair_address", "labels", "base_token", "quote_token",
+    "price_native", "price_usd", "txns", "volume", "price_change", "liquidity",
+    "fdv", "market_cap", "pair_created_at", "info", "boosts"
+)
+
+
+def _format_price(value: float) -> str:
+    # Upstream prices are plain decimal strings ("0.00001234"): the shortest repr round-trips
+    # the value, and Decimal writes it out in full where repr() and "g" use exponents below 1e-4
+    return format(Decimal(repr(value)), "f")
+
+
+def _encode(value: Any) -> Optional[bytes]:
+    return None if value is None else json.dumps(value, separators=(",", ":")).encode()
+
+
+class CompactTokenData(Mapping):
+    """Slotted, read-only TokenData.
+
+    Numbers live in one array('d') instead of four nested dicts of boxed
+    floats; `info`/`boosts` are kept as compact JSON bytes and only decoded
+    when read. Item access returns the same shapes as transform_dex_response,
+    so existing consumers and to_dict() see the current JSON layout.
+    """
+
+    __slots__ = ("chain_id", "dex_id", "url", "pair_address", "labels",
+                 "base_address", "base_name", "base_symbol",
+                 "quote_address", "quote_name", "quote_symbol",
+                 "_num", "_info", "_boosts")
+
+    @classmethod
+    def from_pair(cls, pair: Dict) -> "CompactTokenData":
+        self = cls.__new__(cls)
+        base, quote = pair["baseToken"], pair["quoteToken"]
+        self.chain_id = pair.get("chainId", "")
+        self.dex_id = pair.get("dexId", "")
+        self.url = pair.get("url", "")
+        self.pair_address = pair.get("pairAddress", "")
+        self.labels = tuple(pair.get("labels") or ())
+        self.base_address, self.base_name, self.base_symbol = base["address"], base["name"], base["symbol"]
+        self.quote_address, self.quote_name, self.quote_symbol = quote["address"], quote["name"], quote["symbol"]
+
+        num = array("d", bytes(8 * _NUMERIC_FIELDS))
+        num[_PRICE_NATIVE] = float(pair.get("priceNative", "0"))
+        num[_PRICE_USD] = float(pair.get("priceUsd", "0"))
+        for group, offsets in (("volume", _VOLUME), ("priceChange", _PRICE_CHANGE), ("liquidity", _LIQUIDITY)):
+            values = pair.get(group) or {}
+            for key, offset in offsets.items():
+                num[offset] = float(values.get(key, 0))
+        txns = pair.get("txns") or {}
+        for window, offset in _TXNS.items():
+            counts = txns.get(window) or {}
+            num[offset] = counts.get("buys", 0)
+            num[offset + 1] = counts.get("sells", 0)
+        num[_FDV] = float(pair.get("fdv", 0))
+        num[_MARKET_CAP] = float(pair.get("marketCap", 0))
+        num[_PAIR_CREATED_AT] = pair.get("pairCreatedAt", 0)
+        self._num = num
+
+        self._info = _encode(pair.get("info"))
+        self._boosts = _encode(pair.get("boosts"))
+        return self
+
+    # ---------- Checkpoint state ----------
+    def to_state(self) -> tuple:
+        return (self.chain_id, self.dex_id, self.url, self.pair_address, self.labels,
+                self.base_address, self.base_name, self.base_symbol,
+                self.quote_address, self.quote_name, self.quote_symbol,
+                self._num.tobytes(), self._info, self._boosts)
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "CompactTokenData":
+        self = cls.__new__(cls)
+        (self.chain_id, self.dex_id, self.url, self.pair_address, self.labels,
+         self.base_address, self.base_name, self.base_symbol,
+         self.quote_address, self.quote_name, self.quote_symbol,
+         num, self._info, self._boosts) = state
+        self._num = array("d")
+        self._num.frombytes(num)
+        return self
+
+    # ---------- Typed accessors ----------
+    @property
+    def price_usd(self) -> float:
+        return self._num[_PRICE_USD]
+
+    @property
+    def liquidity_usd(self) -> float:
+        return self._num[_LIQUIDITY["usd"]]
+
+    @property
+    def info(self) -> Optional[Dict]:
+        return None if self._info is None else json.loads(self._info)
+
+    @property
+    def boosts(self) -> Optional[Dict]:
+        return None if self._boosts is None else json.loads(self._boosts)
+
+    # ---------- Mapping interface (TokenData shape) ----------
+    def __getitem__(self, key: str) -> Any:
+        num = self._num
+        if key == "price_usd":
+            return _format_price(num[_PRICE_USD])
+        if key == "price_native":
+            return _format_price(num[_PRICE_NATIVE])
+        if key == "liquidity":
+            return {name: num[offset] for name, offset in _LIQUIDITY.items()}
+        if key == "volume":
+            return {name: num[offset] for name, offset in _VOLUME.items()}
+        if key == "price_change":
+            return {name: num[offset] for name, offset in _PRICE_CHANGE.items()}
+        if key == "txns":
+            return {window: {"buys": int(num[offset]), "sells": int(num[offset + 1])}
+                    for window, offset in _TXNS.items()}
+        if key == "base_token":
+            return {"address": self.base_address, "name": self.base_name, "symbol": self.base_symbol}
+        if key == "quote_token":
+            return {"address": self.quote_address, "name": self.quote_name, "symbol": self.quote_symbol}
+        if key == "fdv":
+            return num[_FDV]
+        if key == "market_cap":
+            return num[_MARKET_CAP]
+        if key == "pair_created_at":
+            return int(num[_PAIR_CREATED_AT])
+        if key == "labels":
+            return list(self.labels)
+        if key == "info":
+            return self.info
+        if key == "boosts":
+            return self.boosts
+        if key in ("chain_id", "dex_id", "url", "pair_address"):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(KEYS)
+
+    def __len__(self) -> int:
+        return len(KEYS)
+
+    def to_dict(self) -> Dict:
+        return {key: self[key] for key in KEYS}
+
+    def __repr__(self) -> str:
+        return f"CompactTokenData({self.chain_id}:{self.base_symbol} {self.pair_address})"
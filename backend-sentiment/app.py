@@ -2,14 +2,16 @@ import os
 import json
 import time
 import logging
+import re
+import hashlib
+import threading
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, TypedDict, Any, Union
+from typing import Dict, List, Optional, Tuple, TypedDict, Any, Union
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from textblob import TextBlob
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from anthropic import Anthropic
@@ -17,8 +19,12 @@ from dotenv import load_dotenv
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 import random
+import warnings
 from datetime import datetime, timedelta
 from scrapper import TwitterScraper, SentimentAnalyzer as BaseSentimentAnalyzer
+from sentiment_engine import create_engine
+from ingestion import MessageStore
+from caching import VersionedCache
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "http://localhost:8000"}})
@@ -174,78 +180,112 @@ SENTIMENT_THRESHOLDS = {
 }
 
 CACHE_DURATION = 3600  # 1 hour cache for sentiment data
+SENTIMENT_CACHE_SIZE = int(os.environ.get("SENTIMENT_CACHE_ENTRIES", 256))
+
+GEMINI_CONFIG = {
+    "model": "gemini-1.5-pro",
+    "temperature": 0.2,
+    "max_output_tokens": 500,       # per token; a batched prompt gets this times its size
+    "batch_size": int(os.environ.get("GEMINI_BATCH_SIZE", 5)),       # tokens per multi-token prompt
+    "concurrency": int(os.environ.get("GEMINI_CONCURRENCY", 2))      # Gemini calls in flight at once
+}
+INSIGHT_BATCH_MAX_TOKENS = 50
+
+GEMINI_SAFETY_SETTINGS = {
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+}
+
+EPOCH = pd.Timestamp(0, tz="UTC")
+
+# Scored messages per token and source, ingested incrementally from DATA_DIR
+INGEST_CONFIG = {
+    "store_dir": Path(os.environ.get("MESSAGE_STORE_DIR", DATA_DIR / "store")),
+    "settle_seconds": float(os.environ.get("INGEST_SETTLE_SECONDS", 2))
+}
+
+# Candidate field names per source, in order of preference
+TWITTER_FIELDS = {
+    "text": ["text", "tweet", "content"],
+    "username": ["username", "user", "screen_name"],
+    "timestamp": ["timestamp", "created_at", "date"]
+}
+TELEGRAM_FIELDS = {
+    "text": ["message", "text", "content"],
+    "username": ["username", "user", "sender"],
+    "channel": ["channel", "group", "chat"],
+    "timestamp": ["timestamp", "date", "time"]
+}
 
 # ---------- Data Stores ----------
-sentiment_cache: Dict[str, TokenSentiment] = {}
-ai_insights_cache: Dict[str, AIInsight] = {}
+# TokenSentiment by (lowercased symbol, name), valid while the message stores are at the same versions
+sentiment_cache = VersionedCache(CACHE_DURATION, SENTIMENT_CACHE_SIZE)
+# AIInsight by token, valid for CACHE_DURATION after it was produced and while the
+# sentiment summary it was produced from (its fingerprint) is unchanged
+ai_insights_cache = VersionedCache(CACHE_DURATION, SENTIMENT_CACHE_SIZE)
+# One Gemini model for the process (see get_gemini_model)
+gemini_model = None
+gemini_model_lock = threading.Lock()
+gemini_slots = threading.BoundedSemaphore(GEMINI_CONFIG["concurrency"])
+# One VADER/TextBlob scorer for the process; caches scores by text hash
+sentiment_engine = create_engine()
+message_stores: Dict[Tuple[str, str], MessageStore] = {}
+message_stores_lock = threading.Lock()
 
 # ---------- Core Functions ----------
-def load_twitter_data(token_symbol: str) -> List[Dict]:
-    """Load Twitter data from CSV/JSON files"""
-    try:
-        # Try loading from JSON first
-        json_path = DATA_DIR / f"twitter_{token_symbol.lower()}.json"
-        if (json_path.exists()):
-            logger.info(f"Loading Twitter data from {json_path}")
-            with open(json_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                logger.info(f"Loaded {len(data)} Twitter messages")
-                return data
-        
-        # Fallback to CSV
-        csv_path = DATA_DIR / f"twitter_{token_symbol.lower()}.csv"
-        if (csv_path.exists()):
-            logger.info(f"Loading Twitter data from {csv_path}")
-            df = pd.read_csv(csv_path)
-            data = df.to_dict("records")
-            logger.info(f"Loaded {len(data)} Twitter messages")
-            return data
-        
-        logger.warning(f"No Twitter data found for {token_symbol}")
-        return []
-    except Exception as e:
-        logger.error(f"Error loading Twitter data: {str(e)}")
-        return []
+def coalesce_columns(frame: pd.DataFrame, keys: List[str], default: Any = "") -> pd.Series:
+    """Per row, the value of the first of `keys` that is present"""
+    result = pd.Series(default, index=frame.index, dtype=object)
+    for key in reversed(keys):
+        if key in frame.columns:
+            result = frame[key].astype(object).where(frame[key].notna(), result)
+    return result
 
-def load_telegram_data(token_symbol: str) -> List[Dict]:
-    """Load Telegram data from CSV/JSON files"""
-    try:
-        # Try loading from JSON first
-        json_path = DATA_DIR / f"telegram_{token_symbol.lower()}.json"
-        if json_path.exists():
-            with open(json_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        
-        # Fallback to CSV
-        csv_path = DATA_DIR / f"telegram_{token_symbol.lower()}.csv"
-        if csv_path.exists():
-            df = pd.read_csv(csv_path)
-            return df.to_dict("records")
-        
-        return []
-    except Exception as e:
-        print(f"Error loading Telegram data: {e}")
-        return []
+def _epoch_seconds(column: pd.Series) -> pd.Series:
+    """Parse one timestamp column in bulk; NaN where a value does not parse"""
+    if pd.api.types.is_datetime64_any_dtype(column):
+        parsed = column if column.dt.tz is not None else column.dt.tz_localize("UTC")
+        return (parsed - EPOCH) / pd.Timedelta(seconds=1)
+    if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+        return column.astype(float)
+    
+    # Mixed column: numbers are epoch seconds already, strings are dates
+    is_text = np.fromiter((isinstance(value, str) for value in column), dtype=bool, count=len(column))
+    seconds = pd.to_numeric(column.where(~is_text), errors="coerce").astype(float)
+    if is_text.any():
+        text = column[is_text].astype(object)
+        # One conversion: the format is inferred from the first value and reused for the column,
+        # with repeated strings parsed once (cache=True)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            parsed = pd.to_datetime(text, utc=True, errors="coerce", cache=True)
+        # Rows in another format than the first get a per-value fallback
+        retry = parsed.isna()
+        if retry.any():
+            parsed[retry] = pd.to_datetime(text[retry], utc=True, errors="coerce", format="mixed")
+        seconds[is_text] = (parsed - EPOCH) / pd.Timedelta(seconds=1)
+    return seconds
+
+def parse_timestamps(frame: pd.DataFrame, keys: List[str]) -> np.ndarray:
+    """Epoch seconds from the first of `keys` that parses per row, else the current time"""
+    seconds = pd.Series(np.nan, index=frame.index)
+    for key in keys:
+        missing = seconds.isna()
+        if key not in frame.columns or not missing.any():
+            continue
+        seconds[missing] = _epoch_seconds(frame.loc[missing, key])
+    return seconds.fillna(time.time()).to_numpy(dtype=float)
 
 def calculate_sentiment_score(text: str) -> float:
     """Calculate compound sentiment score using VADER and TextBlob"""
-    try:
-        # Use VADER for sentiment analysis (specialized for social media)
-        analyzer = SentimentIntensityAnalyzer()
-        vader_score = analyzer.polarity_scores(text)
-        
-        # Use TextBlob as secondary sentiment analyzer
-        blob = TextBlob(text)
-        textblob_score = blob.sentiment.polarity
-        
-        # Combined weighted score (VADER 70%, TextBlob 30%)
-        combined_score = (vader_score['compound'] * 0.7) + (textblob_score * 0.3)
-        
-        # Ensure score is between -1 and 1
-        return max(-1.0, min(1.0, combined_score))
-    except Exception as e:
-        print(f"Error calculating sentiment: {e}")
-        return 0.0
+    # Combined weighted score (VADER 70%, TextBlob 30%), between -1 and 1
+    return sentiment_engine.score(text)
+
+def calculate_sentiment_scores(texts: List[str]) -> List[float]:
+    """Batch version of calculate_sentiment_score"""
+    return sentiment_engine.score_batch(texts)
 
 def get_sentiment_label(score: float) -> str:
     """Convert sentiment score to label"""
@@ -278,146 +318,124 @@ def get_market_sentiment_label(score: float) -> str:
     else:
         return "Strongly Bearish"
 
-def process_twitter_data(raw_data: List[Dict]) -> List[SocialMessage]:
+def process_twitter_data(raw_data: Union[pd.DataFrame, List[Dict]]) -> List[SocialMessage]:
     """Process Twitter data into standardized SocialMessage format"""
-    messages = []
+    frame = raw_data if isinstance(raw_data, pd.DataFrame) else pd.DataFrame.from_records(raw_data)
+    if frame.empty:
+        return []
     
-    for item in raw_data:
-        # Extract needed fields (accommodate different possible field names)
-        text = item.get("text", item.get("tweet", item.get("content", "")))
-        username = item.get("username", item.get("user", item.get("screen_name", "")))
-        
-        # Try different timestamp formats
-        timestamp = None
-        for key in ["timestamp", "created_at", "date"]:
-            if key in item:
-                try:
-                    if isinstance(item[key], (int, float)):
-                        timestamp = float(item[key])
-                        break
-                    else:
-                        # Try parsing date strings
-                        dt = pd.to_datetime(item[key])
-                        timestamp = dt.timestamp()
-                        break
-                except:
-                    pass
-        
-        if timestamp is None:
-            timestamp = time.time()  # Use current time as fallback
-        
-        # Calculate sentiment
-        sentiment_score = calculate_sentiment_score(text)
-        
-        messages.append({
+    # Resolve each field's column once (accommodate different possible field names)
+    texts = coalesce_columns(frame, TWITTER_FIELDS["text"]).tolist()
+    usernames = coalesce_columns(frame, TWITTER_FIELDS["username"]).tolist()
+    urls = coalesce_columns(frame, ["url"]).tolist()
+    followers = pd.to_numeric(coalesce_columns(frame, ["followers"], 0), errors="coerce").fillna(0).astype(int).tolist()
+    timestamps = parse_timestamps(frame, TWITTER_FIELDS["timestamp"])
+    scores = calculate_sentiment_scores(texts)
+    
+    # Most recent first
+    return [
+        {
             "source": "twitter",
-            "message": text,
-            "username": username,
-            "timestamp": timestamp,
-            "sentiment_score": sentiment_score,
-            "sentiment_label": get_sentiment_label(sentiment_score),
-            "url": item.get("url", ""),
-            "followers": item.get("followers", 0),
+            "message": texts[i],
+            "username": usernames[i],
+            "timestamp": float(timestamps[i]),
+            "sentiment_score": scores[i],
+            "sentiment_label": get_sentiment_label(scores[i]),
+            "url": urls[i],
+            "followers": followers[i],
             "channel": None
-        })
-    
-    # Sort by timestamp (most recent first)
-    messages.sort(key=lambda x: x["timestamp"], reverse=True)
-    return messages
+        }
+        for i in np.argsort(-timestamps, kind="stable")
+    ]
 
-def process_telegram_data(raw_data: List[Dict]) -> List[SocialMessage]:
+def process_telegram_data(raw_data: Union[pd.DataFrame, List[Dict]]) -> List[SocialMessage]:
     """Process Telegram data into standardized SocialMessage format"""
-    messages = []
+    frame = raw_data if isinstance(raw_data, pd.DataFrame) else pd.DataFrame.from_records(raw_data)
+    if frame.empty:
+        return []
     
-    for item in raw_data:
-        # Extract needed fields
-        text = item.get("message", item.get("text", item.get("content", "")))
-        username = item.get("username", item.get("user", item.get("sender", "")))
-        channel = item.get("channel", item.get("group", item.get("chat", "")))
-        
-        # Try different timestamp formats
-        timestamp = None
-        for key in ["timestamp", "date", "time"]:
-            if key in item:
-                try:
-                    if isinstance(item[key], (int, float)):
-                        timestamp = float(item[key])
-                        break
-                    else:
-                        # Try parsing date strings
-                        dt = pd.to_datetime(item[key])
-                        timestamp = dt.timestamp()
-                        break
-                except:
-                    pass
-        
-        if timestamp is None:
-            timestamp = time.time()  # Use current time as fallback
-        
-        # Calculate sentiment
-        sentiment_score = calculate_sentiment_score(text)
-        
-        messages.append({
+    texts = coalesce_columns(frame, TELEGRAM_FIELDS["text"]).tolist()
+    usernames = coalesce_columns(frame, TELEGRAM_FIELDS["username"]).tolist()
+    channels = coalesce_columns(frame, TELEGRAM_FIELDS["channel"]).tolist()
+    timestamps = parse_timestamps(frame, TELEGRAM_FIELDS["timestamp"])
+    scores = calculate_sentiment_scores(texts)
+    
+    # Most recent first
+    return [
+        {
             "source": "telegram",
-            "message": text,
-            "username": username,
-            "timestamp": timestamp,
-            "sentiment_score": sentiment_score,
-            "sentiment_label": get_sentiment_label(sentiment_score),
+            "message": texts[i],
+            "username": usernames[i],
+            "timestamp": float(timestamps[i]),
+            "sentiment_score": scores[i],
+            "sentiment_label": get_sentiment_label(scores[i]),
             "url": None,
             "followers": None,
-            "channel": channel
-        })
+            "channel": channels[i]
+        }
+        for i in np.argsort(-timestamps, kind="stable")
+    ]
+
+def get_message_store(source: str, token_symbol: str) -> MessageStore:
+    """The persisted store of scored messages for a token and source"""
+    key = (source, token_symbol.lower())
+    with message_stores_lock:
+        store = message_stores.get(key)
+        if store is None:
+            process = process_twitter_data if source == "twitter" else process_telegram_data
+            store = message_stores[key] = MessageStore(source, token_symbol, DATA_DIR, INGEST_CONFIG["store_dir"],
+                                                       process, settle=INGEST_CONFIG["settle_seconds"])
+        return store
+
+def summarize_token_sentiment(token_symbol: str, token_name: Optional[str], twitter_store: MessageStore,
+                              telegram_store: MessageStore) -> TokenSentiment:
+    """Build the TokenSentiment for a token from its message stores"""
+    twitter_messages = twitter_store.messages
+    telegram_messages = telegram_store.messages
+    
+    # Average of the non-zero message scores, kept as running totals by each store
+    twitter_score = twitter_store.mean_score()
+    telegram_score = telegram_store.mean_score()
+    
+    # Weight calculation
+    total_messages = len(twitter_messages) + len(telegram_messages)
+    tw_weight = len(twitter_messages) / total_messages if total_messages > 0 else 0.5
+    tg_weight = len(telegram_messages) / total_messages if total_messages > 0 else 0.5
     
-    # Sort by timestamp (most recent first)
-    messages.sort(key=lambda x: x["timestamp"], reverse=True)
-    return messages
+    # Overall score calculation
+    overall_score = (twitter_score * tw_weight) + (telegram_score * tg_weight)
+    
+    # Create result with meaningful default values
+    return {
+        "token_symbol": token_symbol,
+        "token_name": token_name or token_symbol,
+        "overall_score": max(0.1, overall_score * 10),  # Scale to 1-10
+        "overall_label": get_market_sentiment_label(overall_score),
+        "twitter_score": max(0.1, twitter_score * 10),
+        "telegram_score": max(0.1, telegram_score * 10),
+        "sentiment_trend": "Stable",
+        "messages": twitter_messages + telegram_messages,
+        "last_updated": time.time()
+    }
 
 def analyze_token_sentiment(token_symbol: str, token_name: str = None) -> TokenSentiment:
     """Analyze sentiment for a specific token"""
     logger.info(f"Analyzing sentiment for {token_symbol}")
     
     try:
-        # Load data from files
-        twitter_raw = load_twitter_data(token_symbol)
-        telegram_raw = load_telegram_data(token_symbol)
-        
-        logger.info(f"Loaded {len(twitter_raw)} Twitter and {len(telegram_raw)} Telegram messages")
-        
-        # Process data
-        twitter_messages = process_twitter_data(twitter_raw)
-        telegram_messages = process_telegram_data(telegram_raw)
-        
-        # Calculate sentiment scores with validation
-        twitter_scores = [msg["sentiment_score"] for msg in twitter_messages if msg["sentiment_score"] != 0]
-        telegram_scores = [msg["sentiment_score"] for msg in telegram_messages if msg["sentiment_score"] != 0]
-        
-        # Calculate average scores with error handling
-        twitter_score = sum(twitter_scores) / len(twitter_scores) if twitter_scores else 0
-        telegram_score = sum(telegram_scores) / len(telegram_scores) if telegram_scores else 0
-        
-        # Weight calculation
-        total_messages = len(twitter_messages) + len(telegram_messages)
-        tw_weight = len(twitter_messages) / total_messages if total_messages > 0 else 0.5
-        tg_weight = len(telegram_messages) / total_messages if total_messages > 0 else 0.5
-        
-        # Overall score calculation
-        overall_score = (twitter_score * tw_weight) + (telegram_score * tg_weight)
-        
-        # Create result with meaningful default values
-        result = {
-            "token_symbol": token_symbol,
-            "token_name": token_name or token_symbol,
-            "overall_score": max(0.1, overall_score * 10),  # Scale to 1-10
-            "overall_label": get_market_sentiment_label(overall_score),
-            "twitter_score": max(0.1, twitter_score * 10),
-            "telegram_score": max(0.1, telegram_score * 10),
-            "sentiment_trend": "Stable",
-            "messages": twitter_messages + telegram_messages,
-            "last_updated": time.time()
-        }
+        # Parse and score only the rows appended to the data files since the last call
+        twitter_store = get_message_store("twitter", token_symbol)
+        telegram_store = get_message_store("telegram", token_symbol)
+        new_twitter = twitter_store.refresh()
+        new_telegram = telegram_store.refresh()
+        if new_twitter or new_telegram:
+            logger.info(f"Ingested {new_twitter} new Twitter and {new_telegram} new Telegram messages")
         
-        return result
+        # New messages bump the store versions, so a cached result is never older than the data files
+        versions = (twitter_store.version, telegram_store.version)
+        return sentiment_cache.get_or_compute(
+            (token_symbol.lower(), token_name or token_symbol), versions,
+            lambda: summarize_token_sentiment(token_symbol, token_name, twitter_store, telegram_store))
         
     except Exception as e:
         logger.error(f"Error analyzing sentiment: {str(e)}")
@@ -433,64 +451,27 @@ def analyze_token_sentiment(token_symbol: str, token_name: str = None) -> TokenS
             "last_updated": time.time()
         }
 
-def generate_ai_insights(token_symbol: str, sentiment_data: TokenSentiment, price_data: Optional[Dict] = None) -> AIInsight:
-    try:
-        # Check if Gemini API key is available
-        gemini_key = os.getenv("GEMINI_API_KEY")
-        if not gemini_key:
-            print("Warning: GEMINI_API_KEY not found in environment variables")
-            return {
-                "summary": "AI insights unavailable - Gemini API key not configured",
-                "key_factors": [{"type": "error", "text": "API key missing"}],
-                "risk_factors": [{"type": "error", "text": "API key missing"}],
-                "prediction": "Unavailable - API key not configured"
-            }
+def get_gemini_model():
+    """Configure Gemini and build the model once, on first use"""
+    global gemini_model
+    with gemini_model_lock:
+        if gemini_model is None:
+            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+            gemini_model = genai.GenerativeModel(
+                model_name=GEMINI_CONFIG["model"],
+                generation_config={"temperature": GEMINI_CONFIG["temperature"],
+                                   "max_output_tokens": GEMINI_CONFIG["max_output_tokens"]},
+                safety_settings=GEMINI_SAFETY_SETTINGS
+            )
+        return gemini_model
 
-        # Configure Gemini AI
-        genai.configure(api_key=gemini_key)
-        
-        # Check cache first
-        cache_key = token_symbol.lower()
-        current_time = time.time()
-        
-        if cache_key in ai_insights_cache:
-            cached_insight = ai_insights_cache[cache_key]
-            cache_age = current_time - sentiment_data["last_updated"]
-            
-            if cache_age < CACHE_DURATION:
-                return cached_insight
-        
-        # Prepare data for AI analysis
-        recent_messages = sentiment_data["messages"][:10]  # Top 10 recent messages
-        
-        message_texts = [
-            f"{msg['source'].capitalize()}: '{msg['message']}' ({msg['sentiment_label']})"
-            for msg in recent_messages
-        ]
-        
-        data = {
-            "token": {
-                "symbol": token_symbol,
-                "name": sentiment_data["token_name"],
-                "sentiment_score": sentiment_data["overall_score"],
-                "sentiment_label": sentiment_data["overall_label"],
-                "sentiment_trend": sentiment_data["sentiment_trend"]
-            },
-            "social_data": {
-                "twitter_score": sentiment_data["twitter_score"],
-                "telegram_score": sentiment_data["telegram_score"],
-                "recent_messages": message_texts
-            }
-        }
-        
-        if price_data:
-            data["price_data"] = price_data
-        
-        # Create prompt for Gemini
-        prompt = f"""
-        You are Gemini AI, a crypto market analysis assistant.
-        
-        Analyze the following sentiment data for {token_symbol.upper()}:
+def insight_section(token_symbol: str, sentiment_data: TokenSentiment) -> str:
+    """The part of the Gemini prompt describing one token's sentiment"""
+    message_texts = [
+        f"{msg['source'].capitalize()}: '{msg['message']}' ({msg['sentiment_label']})"
+        for msg in sentiment_data["messages"][:5]
+    ]
+    return f"""Analyze the following sentiment data for {token_symbol.upper()}:
         - Overall sentiment score: {sentiment_data['overall_score']:.1f}/10
         - Sentiment label: {sentiment_data['overall_label']}
         - Sentiment trend: {sentiment_data['sentiment_trend']}
@@ -498,7 +479,25 @@ def generate_ai_insights(token_symbol: str, sentiment_data: TokenSentiment, pric
         - Telegram sentiment score: {sentiment_data['telegram_score']:.1f}/10
         
         Recent messages:
-        {chr(10).join(message_texts[:5])}
+        {chr(10).join(message_texts)}"""
+
+def insight_fingerprint(section: str) -> str:
+    # Everything the prompt says about the token; an unchanged summary reuses the insight
+    return hashlib.blake2b(section.encode("utf-8"), digest_size=16).hexdigest()
+
+def insight_prompt(sections: Dict[str, str]) -> str:
+    """Prompt for one token, or for several answered as one JSON object keyed by symbol"""
+    body = "\n\n        ".join(sections.values())
+    if len(sections) == 1:
+        response_format = """Format your response as JSON with fields: summary, key_factors, risk_factors, prediction."""
+    else:
+        symbols = ", ".join(symbol.upper() for symbol in sections)
+        response_format = f"""Answer for each token separately. Format your response as one JSON object keyed by token symbol ({symbols}),
+        each value with fields: summary, key_factors, risk_factors, prediction."""
+    return f"""
+        You are Gemini AI, a crypto market analysis assistant.
+        
+        {body}
         
         Based on this data, provide:
         1. A concise summary of sentiment analysis (2-3 sentences max)
@@ -506,106 +505,128 @@ def generate_ai_insights(token_symbol: str, sentiment_data: TokenSentiment, pric
         3. 2-3 risk factors or bearish signals to be aware of
         4. A balanced market outlook sentence
         
-        Format your response as JSON with fields: summary, key_factors, risk_factors, prediction.
+        {response_format}
         For key_factors and risk_factors, each item should have "type" (bullish/bearish) and "text" fields.
         Keep responses concise and specific to the social sentiment data provided.
         Whenever any new user come on and enter any coin detail, then you always have to give the different bullet points of the Sentiment Analysis Crypto coins.
         """
+
+def parse_json_response(ai_text: str) -> Optional[Any]:
+    """JSON from a Gemini reply, bare or inside a markdown code block"""
+    try:
+        return json.loads(ai_text)
+    except ValueError:
+        json_match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', ai_text)
+        if json_match:
+            try:
+                return json.loads(json_match.group(1))
+            except ValueError:
+                pass
+    return None
+
+def request_gemini(sections: Dict[str, str]) -> Dict[str, AIInsight]:
+    """One Gemini call for the given tokens; insights by lower-case symbol"""
+    generation_config = {"temperature": GEMINI_CONFIG["temperature"],
+                         "max_output_tokens": GEMINI_CONFIG["max_output_tokens"] * len(sections)}
+    with gemini_slots:
+        response = get_gemini_model().generate_content(insight_prompt(sections), generation_config=generation_config)
+    parsed = parse_json_response(response.text)
+    
+    if len(sections) == 1:
+        parsed = {next(iter(sections)): parsed}
+    elif isinstance(parsed, dict):
+        parsed = {str(symbol).lower(): insight for symbol, insight in parsed.items()}
+    else:
+        parsed = {}
+    
+    # Anything but an object for a token counts as unparsed
+    return {symbol: parsed.get(symbol) if isinstance(parsed.get(symbol), dict) else None for symbol in sections}
+
+UNPARSED_INSIGHT: AIInsight = {
+    "summary": "AI insights processing needed manual parsing",
+    "key_factors": [{"type": "bullish", "text": "Data extraction issue"}],
+    "risk_factors": [{"type": "bearish", "text": "Unable to properly analyze data"}],
+    "prediction": "Please refresh to try again"
+}
+
+def missing_key_insight() -> AIInsight:
+    print("Warning: GEMINI_API_KEY not found in environment variables")
+    return {
+        "summary": "AI insights unavailable - Gemini API key not configured",
+        "key_factors": [{"type": "error", "text": "API key missing"}],
+        "risk_factors": [{"type": "error", "text": "API key missing"}],
+        "prediction": "Unavailable - API key not configured"
+    }
+
+def error_insight(e: Exception) -> AIInsight:
+    print(f"AI insight generation error: {str(e)}")
+    return {
+        "summary": f"Error generating AI insights: {str(e)}",
+        "key_factors": [{"type": "error", "text": f"Error: {str(e)}"}],
+        "risk_factors": [{"type": "error", "text": "Service temporarily unavailable"}],
+        "prediction": "Error occurred during analysis"
+    }
+
+def generate_ai_insights(token_symbol: str, sentiment_data: TokenSentiment, price_data: Optional[Dict] = None) -> AIInsight:
+    try:
+        # Check if Gemini API key is available
+        if not os.getenv("GEMINI_API_KEY"):
+            return missing_key_insight()
         
-        # Set safety settings
-        safety_settings = {
-            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-        }
-        
-        # Call Gemini API
-        model = genai.GenerativeModel(
-            model_name="gemini-1.5-pro",
-            generation_config={"temperature": 0.2, "max_output_tokens": 500},
-            safety_settings=safety_settings
-        )
-        
-        response = model.generate_content(prompt)
-        ai_text = response.text
-        
-        # Extract JSON content
-        try:
-            # Try to parse the direct response
-            insights = json.loads(ai_text)
-        except:
-            # Try to extract JSON if surrounded by markdown code blocks
-            import re
-            json_match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', ai_text)
-            if json_match:
-                try:
-                    insights = json.loads(json_match.group(1))
-                except:
-                    # Fallback to structured format
-                    insights = {
-                        "summary": "Unable to parse AI insights correctly",
-                        "key_factors": [],
-                        "risk_factors": [],
-                        "prediction": ""
-                    }
-            else:
-                # Emergency fallback: create structured response from text
-                insights = {
-                    "summary": "AI insights processing needed manual parsing",
-                    "key_factors": [{"type": "bullish", "text": "Data extraction issue"}],
-                    "risk_factors": [{"type": "bearish", "text": "Unable to properly analyze data"}],
-                    "prediction": "Please refresh to try again"
-                }
-        
-        # Add randomization to make responses more dynamic
-        current_time = datetime.now()
-        random.seed(f"{token_symbol}_{current_time.strftime('%Y%m%d%H%M')}")
-        
-        # Create dynamic templates based on sentiment scores
-        sentiment_templates = {
-            "positive": [
-                f"Strong bullish sentiment detected for {token_symbol.upper()} with increasing social engagement",
-                f"Market participants showing high confidence in {token_symbol.upper()}'s current trajectory",
-                f"Positive momentum building for {token_symbol.upper()} across social channels"
-            ],
-            "negative": [
-                f"Cautious sentiment prevailing for {token_symbol.upper()} with mixed signals",
-                f"Market participants expressing concerns about {token_symbol.upper()}'s short-term outlook",
-                f"Bearish signals detected for {token_symbol.upper()} in social discussions"
-            ],
-            "neutral": [
-                f"Mixed sentiment observed for {token_symbol.upper()} with balanced discussions",
-                f"Market participants showing neutral stance on {token_symbol.upper()}'s direction",
-                f"Consolidating sentiment patterns for {token_symbol.upper()} across platforms"
-            ]
-        }
-        
-        # Select summary based on overall sentiment
-        sentiment_category = "neutral"
-        if sentiment_data["overall_score"] > 6:
-            sentiment_category = "positive"
-        elif sentiment_data["overall_score"] < 4:
-            sentiment_category = "negative"
-            
-        summary = random.choice(sentiment_templates[sentiment_category])
-        
-        # Generate dynamic key factors and risk factors
-        # ... rest of the function remains the same ...
+        symbol = token_symbol.lower()
+        section = insight_section(token_symbol, sentiment_data)
         
-        # Update cache
-        ai_insights_cache[cache_key] = insights
+        def compute() -> Optional[AIInsight]:
+            # Unparseable replies are returned but not cached, so the next request tries again
+            return request_gemini({symbol: section})[symbol]
         
-        return insights
+        insights = ai_insights_cache.get_or_compute(symbol, insight_fingerprint(section), compute)
+        return insights if insights is not None else UNPARSED_INSIGHT
     
     except Exception as e:
-        print(f"AI insight generation error: {str(e)}")
-        return {
-            "summary": f"Error generating AI insights: {str(e)}",
-            "key_factors": [{"type": "error", "text": f"Error: {str(e)}"}],
-            "risk_factors": [{"type": "error", "text": "Service temporarily unavailable"}],
-            "prediction": "Error occurred during analysis"
-        }
+        return error_insight(e)
+
+def generate_ai_insights_batch(tokens: Dict[str, TokenSentiment]) -> Dict[str, AIInsight]:
+    """Insights for many tokens: cached ones as is, the rest GEMINI_CONFIG["batch_size"]
+    tokens per prompt with at most GEMINI_CONFIG["concurrency"] prompts in flight"""
+    if not os.getenv("GEMINI_API_KEY"):
+        return {token_symbol: missing_key_insight() for token_symbol in tokens}
+    
+    results: Dict[str, AIInsight] = {}
+    pending: Dict[str, Tuple[str, str]] = {}  # symbol -> (section, fingerprint)
+    for token_symbol, sentiment_data in tokens.items():
+        symbol = token_symbol.lower()
+        section = insight_section(token_symbol, sentiment_data)
+        fingerprint = insight_fingerprint(section)
+        cached = ai_insights_cache.get(symbol, fingerprint)
+        if cached is not None:
+            results[symbol] = cached
+        else:
+            pending[symbol] = (section, fingerprint)
+    
+    symbols = list(pending)
+    size = max(1, GEMINI_CONFIG["batch_size"])
+    batches = [symbols[start:start + size] for start in range(0, len(symbols), size)]
+    
+    def run(batch: List[str]) -> Tuple[Dict[str, Optional[AIInsight]], Optional[Exception]]:
+        try:
+            return request_gemini({symbol: pending[symbol][0] for symbol in batch}), None
+        except Exception as e:
+            return {}, e
+    
+    if batches:
+        with ThreadPoolExecutor(max_workers=min(len(batches), GEMINI_CONFIG["concurrency"])) as pool:
+            for batch, (insights, error) in zip(batches, pool.map(run, batches)):
+                fallback = error_insight(error) if error is not None else UNPARSED_INSIGHT
+                for symbol in batch:
+                    insight = insights.get(symbol)
+                    if insight is None:
+                        results[symbol] = fallback
+                    else:
+                        ai_insights_cache.set(symbol, pending[symbol][1], insight)
+                        results[symbol] = insight
+    
+    return {token_symbol: results[token_symbol.lower()] for token_symbol in tokens}
 
 def get_technical_trend(token_symbol: str) -> Dict:
     """Get technical analysis trend data"""
@@ -894,6 +915,18 @@ def get_sentiment():
     
     return jsonify(response)
 
+@app.route('/api/insights', methods=['GET'])
+def get_insights():
+    """AI insights for several tokens at once, e.g. ?tokens=bitcoin,ethereum,solana"""
+    token_symbols = [token.strip() for token in request.args.get('tokens', '').split(',') if token.strip()]
+    if not token_symbols:
+        return jsonify({"error": "tokens parameter is required"}), 400
+    if len(token_symbols) > INSIGHT_BATCH_MAX_TOKENS:
+        return jsonify({"error": f"At most {INSIGHT_BATCH_MAX_TOKENS} tokens per request"}), 400
+    
+    sentiments = {token_symbol: analyze_token_sentiment(token_symbol) for token_symbol in token_symbols}
+    return jsonify(generate_ai_insights_batch(sentiments))
+
 @app.route('/api/refresh_data', methods=['POST'])
 def refresh_data():
     """Force refresh of sentiment data"""
@@ -901,9 +934,15 @@ def refresh_data():
         data = request.get_json()
         coin = data.get('token') if data else None
         
-        # Clear all caches
-        sentiment_cache.clear()
-        ai_insights_cache.clear()
+        # Drop cached results for the token only (all tokens when none is given)
+        if coin:
+            sentiment_cache.invalidate(lambda key: key[0] == coin.lower())
+        else:
+            sentiment_cache.clear()
+        if coin:
+            ai_insights_cache.invalidate(lambda key: key == coin.lower())
+        else:
+            ai_insights_cache.clear()
         
         # Use current timestamp as seed for new random data
         random.seed(str(datetime.now()))
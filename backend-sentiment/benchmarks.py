@@ -0,0 +1,139 @@
+import argparse
+import random
+import time
+from typing import Dict, List
+
+import pandas as pd
+from textblob import TextBlob
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from sentiment_engine import SentimentEngine
+
+COINS = ["BTC", "ETH", "SOL", "ADA", "DOGE", "XRP", "DOT", "LINK", "AVAX", "ATOM"]
+OPENERS = ["Just bought more", "Dumping my", "Can't believe", "Loving", "Worried about",
+           "Thinking about", "Huge news for", "Not sure about", "Bullish on", "Bearish on"]
+CLOSERS = ["to the moon!! 🚀", "this looks like a rug pull", "great team, solid fundamentals",
+           "terrible price action today", "holding long term", "volume is insane right now",
+           "scam warning, be careful", "best project in the space", "meh, sideways again",
+           "what a disaster"]
+
+
+# ---------- Helpers ----------
+def legacy_score(text: str) -> float:
+    """calculate_sentiment_score before the engine: a new analyzer and TextBlob per message."""
+    try:
+        analyzer = SentimentIntensityAnalyzer()
+        vader_score = analyzer.polarity_scores(text)
+        textblob_score = TextBlob(text).sentiment.polarity
+        combined_score = (vader_score['compound'] * 0.7) + (textblob_score * 0.3)
+        return max(-1.0, min(1.0, combined_score))
+    except Exception:
+        return 0.0
+
+
+def synthetic_messages(count: int, unique: float, seed: int = 11) -> List[str]:
+    # Social feeds repeat themselves (retweets, forwards, bots); `unique` sets how much
+    rng = random.Random(seed)
+    distinct = [f"{rng.choice(OPENERS)} ${rng.choice(COINS)} #{i} {rng.choice(CLOSERS)}"
+                for i in range(max(1, int(count * unique)))]
+    return [rng.choice(distinct) for _ in range(count)]
+
+
+def legacy_timestamp(item: Dict, keys: List[str]) -> float:
+    """Row-by-row timestamp parsing from process_twitter_data before the columnar rewrite."""
+    for key in keys:
+        if key in item:
+            try:
+                if isinstance(item[key], (int, float)):
+                    return float(item[key])
+                return pd.to_datetime(item[key]).timestamp()
+            except Exception:
+                pass
+    return time.time()
+
+
+def synthetic_export(count: int, seed: int = 5) -> List[Dict]:
+    # Twitter export rows with ISO dates, an occasional epoch and an occasional second date field
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        row = {"text": f"{rng.choice(OPENERS)} ${rng.choice(COINS)}", "username": f"user{i % 997}"}
+        if i % 50 == 0:
+            row["timestamp"] = 1735689600 + i
+        elif i % 50 == 1:
+            row["date"] = f"2025-03-{1 + i % 28:02d} 08:15:00"
+        else:
+            row["created_at"] = f"2025-01-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:{i % 59:02d}Z"
+        rows.append(row)
+    return rows
+
+
+def report(name: str, count: int, elapsed: float) -> None:
+    print(f"{name:<26} messages={count:<9} messages/s={count / elapsed:>11.0f} elapsed={elapsed:>8.2f}s")
+
+
+# ---------- Benchmarks ----------
+def bench_scoring(message_counts: List[int], unique: float, legacy_sample: int, workers: int) -> None:
+    for count in message_counts:
+        texts = synthetic_messages(count, unique)
+
+        # The old path costs the same per message whatever the count; time a sample of it
+        sample = texts[:min(count, legacy_sample)]
+        start = time.perf_counter()
+        legacy = [legacy_score(text) for text in sample]
+        report(f"legacy (n={len(sample)})", count, (time.perf_counter() - start) * count / len(sample))
+
+        engine = SentimentEngine(cache_size=count, workers=workers)
+        start = time.perf_counter()
+        scores = engine.score_batch(texts)
+        report(f"engine cold workers={workers}", count, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        engine.score_batch(texts)
+        report("engine warm cache", count, time.perf_counter() - start)
+        engine.close()
+
+        assert scores[:len(sample)] == legacy, "engine scores differ from the legacy function"
+        print(f"{'':<26} unique={int(count * unique)} hit_rate={engine.stats()['hit_rate']:.2f} parity=ok\n")
+
+
+def bench_timestamps(row_counts: List[int], legacy_sample: int) -> None:
+    import app
+
+    keys = app.TWITTER_FIELDS["timestamp"]
+    for count in row_counts:
+        rows = synthetic_export(count)
+        sample = rows[:min(count, legacy_sample)]
+        start = time.perf_counter()
+        legacy = [legacy_timestamp(row, keys) for row in sample]
+        report(f"per-row (n={len(sample)})", count, (time.perf_counter() - start) * count / len(sample))
+
+        start = time.perf_counter()
+        frame = pd.DataFrame.from_records(rows)
+        seconds = app.parse_timestamps(frame, keys)
+        report("columnar", count, time.perf_counter() - start)
+
+        assert seconds[:len(sample)].tolist() == legacy, "columnar timestamps differ from per-row parsing"
+        print(f"{'':<26} parity=ok\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sentiment service benchmarks on synthetic messages")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scoring = commands.add_parser("scoring", help="per-message vs batched engine sentiment scoring")
+    scoring.add_argument("--messages", type=int, nargs="+", default=[10000, 100000, 1000000])
+    scoring.add_argument("--unique", type=float, default=0.3, help="fraction of distinct message texts")
+    scoring.add_argument("--legacy-sample", type=int, default=2000,
+                         help="messages timed through the legacy function (rate is extrapolated)")
+    scoring.add_argument("--workers", type=int, default=1)
+
+    timestamps = commands.add_parser("timestamps", help="per-row vs columnar timestamp parsing")
+    timestamps.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 500000])
+    timestamps.add_argument("--legacy-sample", type=int, default=20000)
+
+    args = parser.parse_args()
+    if args.command == "scoring":
+        bench_scoring(args.messages, args.unique, args.legacy_sample, args.workers)
+    elif args.command == "timestamps":
+        bench_timestamps(args.rows, args.legacy_sample)
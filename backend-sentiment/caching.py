@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class VersionedCache:
+    """Thread-safe LRU cache whose entries expire after `ttl` seconds or when
+    the version they were computed from changes.
+
+    get_or_compute() is single-flight: concurrent misses for the same key and
+    version run `compute` once and share its result (or its exception).
+    """
+
+    class _Call:
+        __slots__ = ("done", "value", "error")
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.value: Any = None
+            self.error: Optional[BaseException] = None
+
+    def __init__(self, ttl: float, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Hashable, Any]]" = OrderedDict()
+        self._calls: Dict[Tuple[Hashable, Hashable], "VersionedCache._Call"] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Hashable) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            stored_at, stored_version, value = entry
+            if stored_version != version or time.time() - stored_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, version: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, version: Hashable, compute: Callable[[], Any]) -> Any:
+        value = self.get(key, version)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        with self._lock:
+            call = self._calls.get((key, version))
+            leader = call is None
+            if leader:
+                call = self._calls[(key, version)] = VersionedCache._Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = compute()
+            if call.value is not None:
+                self.set(key, version, call.value)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[(key, version)]
+            call.done.set()
+        return call.value
+
+    def invalidate(self, match: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches. Returns how many were dropped."""
+        with self._lock:
+            keys = [key for key in self._data if match(key)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        return len(self._data)
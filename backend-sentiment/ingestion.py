@@ -0,0 +1,256 @@
+import fcntl
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bytes hashed at the start of a source file to tell an append from a rewrite
+HEAD_BYTES = 4096
+
+
+class MessageStore:
+    """Scored messages for one token from one source, ingested incrementally.
+
+    The source is data/<source>_<symbol>.json (a JSON array) or .csv. A
+    watermark records how far the file has been consumed (byte offset for
+    CSV, row count for JSON) along with its size, mtime and a hash of its
+    first bytes. refresh() is a stat() when the file is unchanged; when rows
+    were appended only those are parsed and scored (via `process`) and
+    appended to a persisted JSON Lines store. A file that shrank or whose
+    head changed was rewritten, and is ingested again from the start.
+
+    Every gunicorn worker has its own store for a token, all sharing the same
+    files. refresh() runs under an exclusive lock file and first picks up
+    whatever another worker saved, so each new row is scored and stored once.
+    """
+
+    def __init__(self, source: str, symbol: str, data_dir: Path, store_dir: Path,
+                 process: Callable[[pd.DataFrame], List[Dict]], settle: float = 2.0):
+        self.source = source
+        self.symbol = symbol.lower()
+        self.data_dir = data_dir
+        self.process = process
+        # A CSV's unterminated last line is only taken once the file is this many seconds old
+        self.settle = settle
+        self.messages_path = store_dir / f"{source}_{self.symbol}.jsonl"
+        self.state_path = store_dir / f"{source}_{self.symbol}.state.json"
+        self.lock_path = store_dir / f"{source}_{self.symbol}.lock"
+        self.watermark: Optional[Dict] = None
+        self.messages: List[Dict] = []  # most recent first
+        self.scored = 0                 # messages with a non-zero score
+        self.score_sum = 0.0
+        self.version = 0                # bumped whenever messages change
+        self._lock = threading.Lock()
+        # What this process last read or wrote, to notice saves by other workers
+        self._state_stamp: Optional[Tuple[int, int, int]] = None
+        self._stored_bytes = 0
+        self._generation = 0            # bumped whenever the store file is rewritten
+        store_dir.mkdir(parents=True, exist_ok=True)
+        with self._file_lock():
+            self._sync()
+
+    # ---------- Persistence ----------
+    @contextmanager
+    def _file_lock(self):
+        # Serializes stores for the same token across worker processes
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _sync(self) -> None:
+        """Catch up with the state on disk if another process (or an earlier run) saved it.
+
+        Called with the file lock held. When the store was only appended to
+        since we last saw it, just the new lines are read.
+        """
+        try:
+            stat = os.stat(self.state_path)
+        except FileNotFoundError:
+            return
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp == self._state_stamp:
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            appended = (self._state_stamp is not None and state.get("generation", 0) == self._generation
+                        and state["stored"] >= len(self.messages))
+            skip = len(self.messages) if appended else 0
+            with open(self.messages_path, "rb") as f:
+                # Lines past the recorded count were written by an ingest that never saved its state
+                lines = list(itertools.islice(f, skip, state["stored"]))
+                stored_bytes = f.tell()
+            if skip + len(lines) < state["stored"]:
+                raise ValueError(f"store has {skip + len(lines)} of {state['stored']} messages")
+            new_messages = sorted((json.loads(line) for line in lines), key=lambda m: m["timestamp"], reverse=True)
+        except Exception as e:
+            logger.warning(f"Discarding message store {self.messages_path}: {e}")
+            # Ingested again from the start on the next refresh, which rewrites the store
+            self._reset()
+            self._state_stamp = None
+            return
+        if appended:
+            self.messages = list(heapq.merge(self.messages, new_messages, key=lambda m: -m["timestamp"]))
+        else:
+            self.messages = new_messages
+            logger.info(f"Loaded {len(self.messages)} stored {self.source} messages for {self.symbol}")
+        self.watermark = state["watermark"]
+        self.scored = state["scored"]
+        self.score_sum = state["score_sum"]
+        self.version = state.get("version", 0)
+        self._generation = state.get("generation", 0)
+        self._stored_bytes = stored_bytes
+        self._state_stamp = stamp
+
+    def _save(self, new_messages: List[Dict], truncate: bool) -> None:
+        truncate = truncate or not self.messages_path.exists()
+        with open(self.messages_path, "wb" if truncate else "r+b") as f:
+            # Drops any lines an ingest that died before saving its state left behind
+            f.seek(0 if truncate else self._stored_bytes)
+            f.truncate()
+            f.writelines((json.dumps(message) + "\n").encode("utf-8") for message in new_messages)
+            self._stored_bytes = f.tell()
+        if truncate:
+            self._generation += 1
+        state = {
+            "watermark": self.watermark,
+            "stored": len(self.messages),
+            "scored": self.scored,
+            "score_sum": self.score_sum,
+            "version": self.version,
+            "generation": self._generation
+        }
+        # Per process, so two workers never write the same temp file
+        tmp_path = self.state_path.with_name(f"{self.state_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+        stat = os.stat(self.state_path)
+        self._state_stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    # ---------- Ingestion ----------
+    def _source_file(self) -> Optional[Path]:
+        # JSON first, then CSV (same preference as the loaders)
+        for suffix in (".json", ".csv"):
+            path = self.data_dir / f"{self.source}_{self.symbol}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+    @staticmethod
+    def _head_hash(path: Path, length: int) -> str:
+        with open(path, "rb") as f:
+            return hashlib.blake2b(f.read(length), digest_size=16).hexdigest()
+
+    def _new_watermark(self, path: Path, size: int) -> Dict:
+        # Half the file at most, so appending to a small file leaves the hashed bytes alone
+        head_length = min(HEAD_BYTES, size // 2)
+        return {"path": str(path), "size": 0, "mtime": 0, "offset": 0, "rows": 0, "header": None,
+                "head_length": head_length, "head": self._head_hash(path, head_length)}
+
+    def _read_csv_tail(self, path: Path, watermark: Dict, mtime: float) -> Tuple[pd.DataFrame, int]:
+        with open(path, "rb") as f:
+            if watermark["header"] is None:
+                header = f.readline()
+                watermark["header"] = header.decode("utf-8")
+                watermark["offset"] = len(header)
+            f.seek(watermark["offset"])
+            data = f.read()
+        # A line without its newline may still be being written
+        end = len(data) if time.time() - mtime >= self.settle else data.rfind(b"\n") + 1
+        if end <= 0 or not data[:end].strip():
+            return pd.DataFrame(), watermark["offset"]
+        frame = pd.read_csv(io.BytesIO(watermark["header"].encode("utf-8") + data[:end]))
+        return frame, watermark["offset"] + end
+
+    def _read_json_tail(self, path: Path, watermark: Dict) -> Tuple[Optional[pd.DataFrame], int]:
+        # A JSON array has to be parsed whole, but only the rows past the watermark are processed
+        with open(path, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+        if len(rows) < watermark["rows"]:
+            return None, 0
+        return pd.DataFrame.from_records(rows[watermark["rows"]:]), len(rows)
+
+    def refresh(self) -> int:
+        """Ingest rows appended to the source file since the last call. Returns how many."""
+        with self._lock, self._file_lock():
+            self._sync()
+            path = self._source_file()
+            if path is None:
+                if self.watermark is not None:
+                    self._reset()
+                    self._save([], truncate=True)
+                return 0
+
+            stat = path.stat()
+            current = self.watermark
+            if (current is not None and current["path"] == str(path)
+                    and current["size"] == stat.st_size and current["mtime"] == stat.st_mtime_ns):
+                return 0
+
+            rewritten = (current is None or current["path"] != str(path) or stat.st_size < current["size"]
+                         or self._head_hash(path, current["head_length"]) != current["head"])
+            # Work on a copy so a failed read leaves the store where it was
+            watermark = self._new_watermark(path, stat.st_size) if rewritten else dict(current)
+            try:
+                if path.suffix == ".csv":
+                    frame, watermark["offset"] = self._read_csv_tail(path, watermark, stat.st_mtime)
+                else:
+                    frame, rows = self._read_json_tail(path, watermark)
+                    if frame is None:
+                        # Fewer rows than already ingested: rewritten in place
+                        rewritten = True
+                        watermark = self._new_watermark(path, stat.st_size)
+                        frame, rows = self._read_json_tail(path, watermark)
+                    watermark["rows"] = rows
+                new_messages = self.process(frame) if not frame.empty else []
+            except Exception as e:
+                # e.g. caught mid-write; the next refresh tries again
+                logger.warning(f"Could not ingest {path}: {e}")
+                return 0
+
+            if rewritten:
+                if current is not None:
+                    logger.info(f"{path} was rewritten; ingested it again")
+                self._reset()
+            watermark["size"], watermark["mtime"] = stat.st_size, stat.st_mtime_ns
+            self.watermark = watermark
+            if new_messages:
+                self._merge(new_messages)
+            self._save(new_messages, truncate=rewritten)
+            return len(new_messages)
+
+    def _merge(self, new_messages: List[Dict]) -> None:
+        # Both lists are already most recent first
+        self.messages = list(heapq.merge(self.messages, new_messages, key=lambda m: -m["timestamp"]))
+        for message in new_messages:
+            if message["sentiment_score"] != 0:
+                self.scored += 1
+                self.score_sum += message["sentiment_score"]
+        self.version += 1
+
+    def _reset(self) -> None:
+        self.watermark = None
+        self.messages = []
+        self.scored = 0
+        self.score_sum = 0.0
+        self.version += 1
+
+    def mean_score(self) -> float:
+        """Mean of the non-zero message scores (0 when there are none)"""
+        return self.score_sum / self.scored if self.scored else 0.0
@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from textblob.en import sentiment as pattern_sentiment
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# Combined score weights (VADER is specialized for social media)
+VADER_WEIGHT = 0.7
+TEXTBLOB_WEIGHT = 0.3
+
+
+def text_key(text: str) -> bytes:
+    # 16-byte digest so the cache does not hold on to the message text
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+class SentimentEngine:
+    """Long-lived VADER + TextBlob scorer.
+
+    One analyzer is loaded per process (not per message), scores are cached
+    by text hash in a bounded LRU, and score_batch() fans large batches of
+    uncached texts out to a process pool when `workers` > 1.
+    """
+
+    def __init__(self, cache_size: int = 100000, workers: int = 1,
+                 parallel_threshold: int = 20000, chunk_size: int = 5000):
+        self.vader = SentimentIntensityAnalyzer()
+        self.cache_size = cache_size
+        self.workers = workers
+        self.parallel_threshold = parallel_threshold
+        self.chunk_size = chunk_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[bytes, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def compute(self, text: str) -> float:
+        """Score one text without the cache (same result as the old calculate_sentiment_score)."""
+        try:
+            vader_score = self.vader.polarity_scores(text)["compound"]
+            # TextBlob(text).sentiment.polarity without building a blob per message
+            textblob_score = pattern_sentiment(text)[0]
+            combined_score = (vader_score * VADER_WEIGHT) + (textblob_score * TEXTBLOB_WEIGHT)
+            return max(-1.0, min(1.0, combined_score))
+        except Exception as e:
+            logger.warning(f"Error calculating sentiment: {e}")
+            return 0.0
+
+    def _lookup(self, key: bytes) -> Optional[float]:
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _store(self, scores: Dict[bytes, float]) -> None:
+        with self._lock:
+            self._cache.update(scores)
+            for key in scores:
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def score(self, text: str) -> float:
+        return self.score_batch([text])[0]
+
+    def score_batch(self, texts: Sequence[str]) -> List[float]:
+        """Scores for `texts` in order. Non-string entries (e.g. NaN from a CSV) score 0."""
+        keys: List[Optional[bytes]] = [text_key(text) if isinstance(text, str) else None for text in texts]
+        scores: Dict[bytes, float] = {}
+        pending: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key is None or key in scores or key in pending:
+                continue
+            cached = self._lookup(key)
+            if cached is None:
+                pending[key] = text
+            else:
+                scores[key] = cached
+        with self._lock:
+            self.hits += len(scores)
+            self.misses += len(pending)
+
+        if pending:
+            computed = self._compute_many(list(pending.values()))
+            fresh = dict(zip(pending, computed))
+            self._store(fresh)
+            scores.update(fresh)
+        return [0.0 if key is None else scores[key] for key in keys]
+
+    def _compute_many(self, texts: List[str]) -> List[float]:
+        if self.workers <= 1 or len(texts) < self.parallel_threshold:
+            return [self.compute(text) for text in texts]
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+            pool = self._pool
+        chunks = [texts[start:start + self.chunk_size] for start in range(0, len(texts), self.chunk_size)]
+        return [score for chunk in pool.map(_score_chunk, chunks) for score in chunk]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            cached, hits, misses = len(self._cache), self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "cached": cached,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+
+# ---------- Process pool workers ----------
+_worker_engine: Optional[SentimentEngine] = None
+
+
+def _init_worker() -> None:
+    # One analyzer per worker process, loaded once
+    global _worker_engine
+    _worker_engine = SentimentEngine(cache_size=0)
+
+
+def _score_chunk(texts: List[str]) -> List[float]:
+    return [_worker_engine.compute(text) for text in texts]
+
+
+def create_engine() -> SentimentEngine:
+    return SentimentEngine(
+        cache_size=int(os.environ.get("SENTIMENT_CACHE_SIZE", 100000)),
+        workers=int(os.environ.get("SENTIMENT_WORKERS", 1)),
+        parallel_threshold=int(os.environ.get("SENTIMENT_PARALLEL_THRESHOLD", 20000))
+    )
@@ -0,0 +1,119 @@
+import json
+import time
+
+import pandas as pd
+import pytest
+
+import app
+
+INSIGHT = {"summary": "s", "key_factors": [], "risk_factors": [], "prediction": "p"}
+
+
+class FakeModel:
+    """Gemini stand-in answering each generate_content call with the next queued reply."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.prompts = []
+
+    def generate_content(self, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return type("Response", (), {"text": reply})()
+
+
+def sentiment(symbol: str) -> app.TokenSentiment:
+    return {"token_symbol": symbol, "token_name": symbol, "overall_score": 6.0, "overall_label": "Positive",
+            "twitter_score": 6.0, "telegram_score": 6.0, "sentiment_trend": "stable", "messages": [],
+            "last_updated": 0.0}
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    monkeypatch.setitem(app.GEMINI_CONFIG, "batch_size", 2)
+    app.ai_insights_cache.clear()
+
+    def install(*replies):
+        model = FakeModel(*replies)
+        monkeypatch.setattr(app, "gemini_model", model)
+        return model
+
+    yield install
+    app.ai_insights_cache.clear()
+
+
+@pytest.mark.parametrize("text", [json.dumps(INSIGHT), f"Here you go:\n```json\n{json.dumps(INSIGHT)}\n```",
+                                  f"```\n{json.dumps(INSIGHT)}\n```"])
+def test_parse_json_response(text):
+    assert app.parse_json_response(text) == INSIGHT
+
+
+def test_parse_json_response_rejects_prose():
+    assert app.parse_json_response("Sorry, I can't help with that.") is None
+    assert app.parse_json_response("```json\n{broken\n```") is None
+
+
+def test_request_gemini_maps_a_batched_reply_by_symbol(gemini):
+    gemini(json.dumps({"BTC": INSIGHT, "eth": "not an object"}))
+    insights = app.request_gemini({"btc": "section btc", "eth": "section eth", "sol": "section sol"})
+    assert insights == {"btc": INSIGHT, "eth": None, "sol": None}
+
+
+def test_request_gemini_single_token_reply_is_the_insight(gemini):
+    gemini(json.dumps(INSIGHT))
+    assert app.request_gemini({"btc": "section btc"}) == {"btc": INSIGHT}
+
+
+def test_batch_caches_parsed_insights_and_falls_back_per_token(gemini):
+    model = gemini(json.dumps({"btc": INSIGHT}),     # batch 1: btc parsed, eth missing
+                   RuntimeError("quota"))             # batch 2: sol fails
+    tokens = {"BTC": sentiment("BTC"), "ETH": sentiment("ETH"), "SOL": sentiment("SOL")}
+
+    results = app.generate_ai_insights_batch(tokens)
+    assert len(model.prompts) == 2
+    assert results["BTC"] == INSIGHT
+    assert results["ETH"] == app.UNPARSED_INSIGHT
+    assert "quota" in results["SOL"]["summary"]
+
+    # Only the parsed insight was cached; the others are asked for again in one prompt
+    model = gemini(json.dumps({"eth": INSIGHT, "sol": INSIGHT}))
+    results = app.generate_ai_insights_batch(tokens)
+    assert len(model.prompts) == 1
+    assert "BTC" not in model.prompts[0]
+    assert all(insight == INSIGHT for insight in results.values())
+
+
+# ---------- Timestamps ----------
+JAN_1 = 1704067200.0  # 2024-01-01T00:00:00Z
+
+
+def test_parse_timestamps_iso_column():
+    frame = pd.DataFrame({"timestamp": ["2024-01-01T00:00:00Z", "2024-01-01T00:01:00+00:00",
+                                        "2024-01-01 02:00:00+02:00"]})
+    assert app.parse_timestamps(frame, ["timestamp"]).tolist() == [JAN_1, JAN_1 + 60, JAN_1]
+
+
+def test_parse_timestamps_epoch_column():
+    frame = pd.DataFrame({"timestamp": [JAN_1, JAN_1 + 0.5]})
+    assert app.parse_timestamps(frame, ["timestamp"]).tolist() == [JAN_1, JAN_1 + 0.5]
+    frame = pd.DataFrame({"timestamp": [int(JAN_1), int(JAN_1) + 1]})
+    assert app.parse_timestamps(frame, ["timestamp"]).tolist() == [JAN_1, JAN_1 + 1]
+
+
+def test_parse_timestamps_mixed_strings_and_numbers():
+    frame = pd.DataFrame({"timestamp": pd.Series(["2024-01-01T00:00:00Z", JAN_1 + 60, "Jan 1 2024 00:02 UTC"],
+                                                 dtype=object)})
+    assert app.parse_timestamps(frame, ["timestamp"]).tolist() == [JAN_1, JAN_1 + 60, JAN_1 + 120]
+
+
+def test_parse_timestamps_falls_back_to_the_next_key():
+    frame = pd.DataFrame({"timestamp": ["2024-01-01T00:00:00Z", None, "not a date", None],
+                          "date": [None, "2024-01-01T00:01:00Z", JAN_1 + 120, None]})
+    before = time.time()
+    parsed = app.parse_timestamps(frame, ["timestamp", "date"])
+    assert parsed[:3].tolist() == [JAN_1, JAN_1 + 60, JAN_1 + 120]
+    # Nothing parses: the current time
+    assert before <= parsed[3] <= time.time()
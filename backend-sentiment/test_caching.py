@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from caching import VersionedCache
+
+
+def test_entries_expire_after_ttl():
+    cache = VersionedCache(ttl=0.05)
+    cache.set("btc", 1, "value")
+    assert cache.get("btc", 1) == "value"
+    time.sleep(0.06)
+    assert cache.get("btc", 1) is None
+    assert len(cache) == 0
+
+
+def test_a_new_version_invalidates_the_entry():
+    cache = VersionedCache(ttl=60)
+    cache.set("btc", 1, "old")
+    assert cache.get("btc", 2) is None
+    # The stale entry is dropped, not kept alongside
+    assert cache.get("btc", 1) is None
+
+
+def test_lru_eviction():
+    cache = VersionedCache(ttl=60, max_entries=2)
+    cache.set("a", 1, "a")
+    cache.set("b", 1, "b")
+    cache.get("a", 1)
+    cache.set("c", 1, "c")
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == "a" and cache.get("c", 1) == "c"
+
+
+def test_invalidate_and_clear():
+    cache = VersionedCache(ttl=60)
+    for key in [("btc", "Bitcoin"), ("eth", "Ethereum")]:
+        cache.set(key, 1, key[1])
+    assert cache.invalidate(lambda key: key[0] == "btc") == 1
+    assert cache.get(("eth", "Ethereum"), 1) == "Ethereum"
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_get_or_compute_is_single_flight():
+    cache = VersionedCache(ttl=60)
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait()
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("btc", 1, compute)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    # Let every caller reach the in-flight computation
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["value"] * 5
+    assert cache.get_or_compute("btc", 1, compute) == "value"
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 5}
+
+
+def test_get_or_compute_shares_errors_and_skips_none():
+    cache = VersionedCache(ttl=60)
+
+    def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("btc", 1, fail)
+    assert cache.get_or_compute("btc", 1, lambda: None) is None
+    assert len(cache) == 0
+    assert cache.get_or_compute("btc", 1, lambda: "value") == "value"
@@ -0,0 +1,169 @@
+import json
+import os
+import time
+
+import pytest
+
+from ingestion import MessageStore
+
+
+class Scorer:
+    """process() stand-in: most recent first, like the app's processors, and
+    records how many rows each call was given."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, frame):
+        self.batches.append(len(frame))
+        messages = [{"message": row["text"], "timestamp": float(row["ts"]), "sentiment_score": float(row["score"])}
+                    for row in frame.to_dict("records")]
+        return sorted(messages, key=lambda m: m["timestamp"], reverse=True)
+
+
+def rows(*items):
+    return [{"text": f"msg {ts}", "ts": ts, "score": score} for ts, score in items]
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data))
+    # Make each write visible to the size/mtime check even within one clock tick
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    data_dir, store_dir = tmp_path / "data", tmp_path / "store"
+    data_dir.mkdir()
+    return data_dir, store_dir
+
+
+def test_json_append_processes_only_new_rows(dirs):
+    data_dir, store_dir = dirs
+    source = data_dir / "twitter_btc.json"
+    scorer = Scorer()
+    write_json(source, rows((1, 0.5), (2, 0.0)))
+    store = MessageStore("twitter", "BTC", data_dir, store_dir, scorer)
+
+    assert store.refresh() == 2
+    assert store.refresh() == 0
+    write_json(source, rows((1, 0.5), (2, 0.0), (3, -0.1)))
+    assert store.refresh() == 1
+
+    assert scorer.batches == [2, 1]
+    assert [m["timestamp"] for m in store.messages] == [3.0, 2.0, 1.0]
+    assert store.scored == 2
+    assert store.mean_score() == pytest.approx(0.2)
+
+
+def test_rewritten_source_is_ingested_again(dirs):
+    data_dir, store_dir = dirs
+    source = data_dir / "twitter_btc.json"
+    write_json(source, rows((1, 0.5), (2, 0.3), (3, 0.1)))
+    store = MessageStore("twitter", "btc", data_dir, store_dir, Scorer())
+    store.refresh()
+    version = store.version
+
+    write_json(source, rows((10, -0.5)))
+    assert store.refresh() == 1
+    assert [m["timestamp"] for m in store.messages] == [10.0]
+    assert store.mean_score() == -0.5
+    assert store.version > version
+
+
+def test_reload_restores_store_without_reprocessing(dirs):
+    data_dir, store_dir = dirs
+    source = data_dir / "telegram_eth.json"
+    write_json(source, rows((1, 0.5), (2, 0.25)))
+    MessageStore("telegram", "eth", data_dir, store_dir, Scorer()).refresh()
+
+    scorer = Scorer()
+    reloaded = MessageStore("telegram", "eth", data_dir, store_dir, scorer)
+    assert reloaded.refresh() == 0
+    assert scorer.batches == []
+    assert [m["timestamp"] for m in reloaded.messages] == [2.0, 1.0]
+    assert reloaded.mean_score() == pytest.approx(0.375)
+
+
+def test_reload_ignores_lines_past_the_saved_state(dirs):
+    data_dir, store_dir = dirs
+    write_json(data_dir / "twitter_sol.json", rows((1, 0.5)))
+    store = MessageStore("twitter", "sol", data_dir, store_dir, Scorer())
+    store.refresh()
+    # An ingest that appended messages but died before saving its state
+    with open(store.messages_path, "a") as f:
+        f.write(json.dumps({"message": "x", "timestamp": 9.0, "sentiment_score": 1.0}) + "\n")
+
+    reloaded = MessageStore("twitter", "sol", data_dir, store_dir, Scorer())
+    assert [m["timestamp"] for m in reloaded.messages] == [1.0]
+
+
+def test_csv_waits_for_an_unterminated_last_line(dirs):
+    data_dir, store_dir = dirs
+    source = data_dir / "twitter_ada.csv"
+    source.write_text("text,ts,score\nmsg 1,1,0.5\nmsg 2,2,0.1")
+    store = MessageStore("twitter", "ada", data_dir, store_dir, Scorer(), settle=60)
+    assert store.refresh() == 1
+
+    with open(source, "a") as f:
+        f.write("\nmsg 3,3,0.2\n")
+    assert store.refresh() == 2
+    assert [m["timestamp"] for m in store.messages] == [3.0, 2.0, 1.0]
+
+
+def test_removed_source_empties_the_store(dirs):
+    data_dir, store_dir = dirs
+    source = data_dir / "twitter_dot.json"
+    write_json(source, rows((1, 0.5)))
+    store = MessageStore("twitter", "dot", data_dir, store_dir, Scorer())
+    store.refresh()
+
+    source.unlink()
+    assert store.refresh() == 0
+    assert store.messages == [] and store.watermark is None
+    assert MessageStore("twitter", "dot", data_dir, store_dir, Scorer()).messages == []
+
+
+def test_next_append_drops_lines_past_the_saved_state(dirs):
+    data_dir, store_dir = dirs
+    source = data_dir / "twitter_sol.json"
+    write_json(source, rows((1, 0.5)))
+    store = MessageStore("twitter", "sol", data_dir, store_dir, Scorer())
+    store.refresh()
+    with open(store.messages_path, "a") as f:
+        f.write(json.dumps({"message": "x", "timestamp": 9.0, "sentiment_score": 1.0}) + "\n")
+
+    write_json(source, rows((1, 0.5), (2, 0.1)))
+    assert store.refresh() == 1
+    reloaded = MessageStore("twitter", "sol", data_dir, store_dir, Scorer())
+    assert [m["timestamp"] for m in reloaded.messages] == [2.0, 1.0]
+
+
+def test_workers_sharing_a_store_score_each_row_once(dirs):
+    data_dir, store_dir = dirs
+    source = data_dir / "twitter_btc.json"
+    first, second = Scorer(), Scorer()
+    write_json(source, rows((1, 0.5), (2, 0.25)))
+    worker_a = MessageStore("twitter", "btc", data_dir, store_dir, first)
+    worker_b = MessageStore("twitter", "btc", data_dir, store_dir, second)
+
+    assert worker_a.refresh() == 2
+    # B picks up what A saved instead of scoring the same rows again
+    assert worker_b.refresh() == 0
+    write_json(source, rows((1, 0.5), (2, 0.25), (3, -0.5)))
+    assert worker_b.refresh() == 1
+    assert worker_a.refresh() == 0
+
+    assert first.batches == [2] and second.batches == [1]
+    for store in (worker_a, worker_b):
+        assert [m["timestamp"] for m in store.messages] == [3.0, 2.0, 1.0]
+        assert store.mean_score() == pytest.approx(0.25 / 3)
+    assert worker_a.version == worker_b.version
+    assert len(store.messages_path.read_text().splitlines()) == 3
+
+    # A rewrite by one worker replaces the other's copy too
+    write_json(source, rows((10, 1.0)))
+    assert worker_a.refresh() == 1
+    assert worker_b.refresh() == 0
+    assert [m["timestamp"] for m in worker_b.messages] == [10.0]
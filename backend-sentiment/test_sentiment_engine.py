@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+from sentiment_engine import SentimentEngine
+
+TEXTS = ["to the moon, great project!", "rug pull, terrible scam", "launch is tomorrow",
+         "love this community", "worst dip ever"]
+
+
+@pytest.fixture
+def engine():
+    engine = SentimentEngine(cache_size=100)
+    yield engine
+    engine.close()
+
+
+def test_cache_hits_return_the_computed_scores(engine):
+    first = engine.score_batch(TEXTS)
+    assert first == [engine.compute(text) for text in TEXTS]
+    assert engine.stats()["misses"] == len(TEXTS)
+
+    assert engine.score_batch(TEXTS[::-1]) == first[::-1]
+    assert engine.score(TEXTS[0]) == first[0]
+    stats = engine.stats()
+    assert stats["hits"] == len(TEXTS) + 1 and stats["misses"] == len(TEXTS)
+    assert stats["cached"] == len(TEXTS)
+
+
+def test_duplicates_in_a_batch_are_scored_once(engine):
+    scores = engine.score_batch([TEXTS[0], TEXTS[0], TEXTS[1]])
+    assert scores[0] == scores[1]
+    assert engine.stats()["misses"] == 2
+
+
+def test_non_string_entries_score_zero(engine):
+    scores = engine.score_batch([float("nan"), TEXTS[0], None])
+    assert scores[0] == 0.0 and scores[2] == 0.0
+    assert scores[1] == engine.compute(TEXTS[0])
+    # Nothing was looked up or cached for them
+    assert engine.stats()["misses"] == 1
+
+
+def test_lru_keeps_the_most_recent_texts():
+    engine = SentimentEngine(cache_size=2)
+    engine.score_batch(TEXTS[:3])
+    assert engine.stats()["cached"] == 2
+    engine.score(TEXTS[2])
+    assert engine.stats()["hits"] == 1
+
+
+def test_process_pool_matches_in_process_scoring():
+    engine = SentimentEngine(workers=2, parallel_threshold=3, chunk_size=2)
+    try:
+        assert engine.score_batch(TEXTS) == [engine.compute(text) for text in TEXTS]
+        assert engine._pool is not None
+    finally:
+        engine.close()
+    assert engine._pool is None
+
+
+def test_counters_are_exact_under_concurrency(engine):
+    engine.score_batch(TEXTS)
+
+    def worker():
+        for _ in range(200):
+            engine.score_batch(TEXTS)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert engine.stats()["hits"] == 4 * 200 * len(TEXTS)